@@ -9,6 +9,64 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     MONGO_URI: str = "mongodb://localhost:27017"
     MONGO_DB: str = "pos"
+    # Connection pool / timeouts for the shared Mongo clients
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 60000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: int = 30000
+    # Run checkout (stock, order, idempotency record) in one multi-document
+    # transaction. Requires a replica set or sharded cluster.
+    CHECKOUT_TRANSACTIONS: bool = False
+    CHECKOUT_TXN_MAX_ATTEMPTS: int = 3
+    # Group commit: coalesce concurrent order writes into one bulk write per flush
+    ORDER_GROUP_COMMIT: bool = False
+    ORDER_GROUP_COMMIT_MAX_BATCH: int = 64
+    ORDER_GROUP_COMMIT_MAX_LINGER_MS: float = 5.0
+    # Stock reservations: lifetime of an unconfirmed hold and how often expired ones are swept
+    RESERVATION_TTL_SECONDS: int = 900
+    RESERVATION_SWEEP_INTERVAL_SECONDS: int = 30
+    # Build indexes missing from the registry (mongodb/mongo_index.py) in the background at startup
+    ENSURE_INDEXES_ON_STARTUP: bool = True
+    # bcrypt runs on a pool of PASSWORD_HASH_WORKERS threads (0 = inline on the event loop);
+    # when PASSWORD_HASH_MAX_QUEUE more jobs are already waiting, login/register answer 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 16
+    # bcrypt work factor for new hashes. With PASSWORD_HASH_CALIBRATE_ON_STARTUP the process
+    # instead picks the highest factor (never below PASSWORD_HASH_MIN_ROUNDS) whose verify
+    # fits PASSWORD_HASH_TARGET_MS; stored hashes below it are upgraded on the next login
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_CALIBRATE_ON_STARTUP: bool = False
+    PASSWORD_HASH_TARGET_MS: float = 250.0
+    PASSWORD_HASH_MIN_ROUNDS: int = 10
+    # Authenticated-user cache for get_current_user (per process; TTL bounds staleness across workers)
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    USER_CACHE_MAX_SIZE: int = 10000
+    # Idempotency keys: a "processing" claim older than IDEMPOTENCY_LEASE_SECONDS is taken
+    # over by the next request with the key (its owner is presumed dead); completed
+    # responses are kept IDEMPOTENCY_TTL_HOURS and recent ones also cached in process
+    IDEMPOTENCY_LEASE_SECONDS: float = 30.0
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_CACHE_TTL_SECONDS: float = 300.0
+    IDEMPOTENCY_CACHE_MAX_SIZE: int = 10000
+    # Self-contained access tokens: login also signs username/name/role plus a claims version,
+    # and routes depending on get_current_principal skip the user lookup. Bump
+    # JWT_CLAIMS_VERSION to make every outstanding token fall back to the database.
+    JWT_SELF_CONTAINED: bool = False
+    JWT_CLAIMS_VERSION: int = 1
+    # Documents read from our own collections are built with BaseModel.FromDb (no
+    # validators). Verify mode validates them fully and logs any difference
+    TRUSTED_READS_VERIFY: bool = False
+    # GET /products/, /categories/ and /orders/ write JSON straight from the stored
+    # documents, without building models (utils/util_raw_json.py)
+    RAW_LIST_RESPONSES: bool = False
+    # Slow-query log: commands at or over SLOW_QUERY_MS are logged and a sample explained;
+    # /debug/slow-queries ranks commands by total time over the last SLOW_QUERY_WINDOW_SECONDS
+    SLOW_QUERY_MS: float = 100.0
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_WINDOW_SECONDS: int = 300
 
     model_config = ConfigDict(env_file=".env")
 
@@ -1,10 +1,16 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Any, Callable, Optional
 
 import bcrypt
 from jose import jwt, JWTError
 
 from core.config import settings
+from utils.util_metrics import Counter, Gauge, Histogram
 
 
 def _truncate_password(pw: str) -> str:
@@ -19,20 +25,149 @@ def _truncate_password(pw: str) -> str:
     return pw
 
 
+# bcrypt work factor for new hashes; calibrate_hash_rounds may raise it at startup
+_hash_rounds = settings.PASSWORD_HASH_ROUNDS
+
+PASSWORD_HASH_ROUNDS = Gauge("pos_password_hash_rounds", "bcrypt work factor used for new hashes", fn=lambda: _hash_rounds)
+PASSWORD_VERIFY_CPU = Histogram(
+    "pos_password_verify_cpu_seconds",
+    "CPU time of one bcrypt verify (login), by the stored hash's work factor",
+    ["rounds"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0),
+)
+
+
+def hash_rounds() -> int:
+    return _hash_rounds
+
+
+def set_hash_rounds(rounds: int) -> None:
+    global _hash_rounds
+    if not 4 <= rounds <= 31:
+        raise ValueError("bcrypt rounds must be between 4 and 31")
+    _hash_rounds = rounds
+
+
+def hash_cost(hashed: str) -> Optional[int]:
+    """Work factor of a stored `$2b$12$...` hash, None if it isn't bcrypt."""
+    parts = hashed.split("$") if hashed else []
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True when a stored hash is cheaper than the current work factor."""
+    cost = hash_cost(hashed)
+    return cost is not None and cost < _hash_rounds
+
+
 def hash_password(password: str) -> str:
     pw = _truncate_password(password)
-    hashed = bcrypt.hashpw(pw.encode("utf-8"), bcrypt.gensalt())
+    hashed = bcrypt.hashpw(pw.encode("utf-8"), bcrypt.gensalt(rounds=_hash_rounds))
     return hashed.decode("utf-8")
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     plain = _truncate_password(plain)
-    return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+    started = time.thread_time()
+    try:
+        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+    finally:
+        PASSWORD_VERIFY_CPU.observe(time.thread_time() - started, rounds=str(hash_cost(hashed)))
+
+
+def calibrate_hash_rounds(target_ms: float, min_rounds: int, max_rounds: int = 16, samples: int = 3) -> int:
+    """
+    Highest work factor in [min_rounds, max_rounds] whose verify takes at most
+    `target_ms` on this machine. Each extra round doubles the cost, so only
+    min_rounds is timed and higher factors are extrapolated; never returns
+    less than min_rounds. Blocks for a few hundred ms: call it off the loop.
+    """
+    pw = b"calibration-password"
+    hashed = bcrypt.hashpw(pw, bcrypt.gensalt(rounds=min_rounds))
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.checkpw(pw, hashed)
+        timings.append(time.perf_counter() - started)
+    cost_ms = statistics.median(timings) * 1000
+    rounds = min_rounds
+    while rounds < max_rounds and cost_ms * 2 <= target_ms:
+        rounds += 1
+        cost_ms *= 2
+    return rounds
+
+
+class PasswordHashBusy(Exception):
+    """The bcrypt pool's queue is full; callers should shed the request (503)."""
+
+
+# bcrypt releases the GIL while hashing, so a small thread pool takes it off the
+# event loop without a process pool's pickling and startup costs
+_hash_pool: Optional[ThreadPoolExecutor] = None
+_hash_pending = 0
+_hash_lock = threading.Lock()
+
+PASSWORD_HASH_PENDING = Gauge(
+    "pos_password_hash_pending", "bcrypt jobs running or queued on the hash pool", fn=lambda: _hash_pending
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "pos_password_hash_rejected_total", "bcrypt jobs refused because the hash pool queue was full"
+)
+
+
+def _release_hash_slot(_: Any = None) -> None:
+    global _hash_pending
+    with _hash_lock:
+        _hash_pending -= 1
+
+
+async def _run_hash(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a bcrypt call on the hash pool. At most PASSWORD_HASH_WORKERS run at
+    once and PASSWORD_HASH_MAX_QUEUE more may wait; beyond that PasswordHashBusy
+    is raised immediately. PASSWORD_HASH_WORKERS=0 runs inline (blocking the loop).
+    """
+    global _hash_pool, _hash_pending
+    workers = settings.PASSWORD_HASH_WORKERS
+    if workers <= 0:
+        return fn(*args)
+    with _hash_lock:
+        if _hash_pending >= workers + settings.PASSWORD_HASH_MAX_QUEUE:
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHashBusy("Password hashing queue is full")
+        _hash_pending += 1
+        if _hash_pool is None:
+            _hash_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+    try:
+        job = _hash_pool.submit(fn, *args)
+    except BaseException:
+        _release_hash_slot()
+        raise
+    # the slot is freed when bcrypt finishes, even if the awaiting request was cancelled
+    job.add_done_callback(_release_hash_slot)
+    return await asyncio.wrap_future(job)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_hash(verify_password, plain, hashed)
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
 
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+def create_access_token(subject: str, expires_delta: Optional[timedelta] = None, claims: Optional[dict] = None) -> str:
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode = {"sub": subject, "exp": expire}
+    to_encode = {**(claims or {}), "sub": subject, "exp": expire}
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
@@ -1,9 +1,12 @@
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
 
+from loguru import logger
 from pymongo import WriteConcern
+from pymongo.errors import PyMongoError
+from pymongo.read_concern import ReadConcern
 
 from core.config import settings
-from mongodb.mongo_client import get_mgdb
+from mongodb.mongo_client import get_mgdb, get_sync_client
 
 
 
@@ -15,6 +18,74 @@ async def start_session():
     return await _db().client.start_session()
 
 
+# Counters for run_in_transaction, read by the contention benchmark: commits,
+# transactions that finally gave up (aborts) and attempts retried (retries)
+TXN_STATS = {"commits": 0, "aborts": 0, "retries": 0}
+
+
+async def run_in_transaction(
+    callback: Callable[[Any], Awaitable[Any]],
+    max_attempts: Optional[int] = None,
+):
+    """
+    Run `callback(session)` inside a multi-document transaction.
+
+    The whole transaction is retried on TransientTransactionError and the
+    commit is retried on UnknownTransactionCommitResult, each bounded by
+    `max_attempts` (settings.CHECKOUT_TXN_MAX_ATTEMPTS by default). Any other
+    error aborts the transaction and is re-raised.
+    """
+    max_attempts = max_attempts or settings.CHECKOUT_TXN_MAX_ATTEMPTS
+    async with await start_session() as session:
+        attempt = 0
+        while True:
+            attempt += 1
+            session.start_transaction(
+                read_concern=ReadConcern("snapshot"),
+                write_concern=WriteConcern(w="majority"),
+            )
+            try:
+                result = await callback(session)
+            except PyMongoError as err:
+                await _abort(session)
+                if err.has_error_label("TransientTransactionError") and attempt < max_attempts:
+                    TXN_STATS["retries"] += 1
+                    logger.warning(f"Transient transaction error, retrying ({attempt}/{max_attempts}): {err}")
+                    continue
+                TXN_STATS["aborts"] += 1
+                raise
+            except BaseException:
+                await _abort(session)
+                TXN_STATS["aborts"] += 1
+                raise
+
+            commit_attempt = 0
+            while True:
+                commit_attempt += 1
+                try:
+                    await session.commit_transaction()
+                    TXN_STATS["commits"] += 1
+                    return result
+                except PyMongoError as err:
+                    if err.has_error_label("UnknownTransactionCommitResult") and commit_attempt < max_attempts:
+                        TXN_STATS["retries"] += 1
+                        continue
+                    if err.has_error_label("TransientTransactionError") and attempt < max_attempts:
+                        TXN_STATS["retries"] += 1
+                        break
+                    TXN_STATS["aborts"] += 1
+                    raise
+
+
+async def _abort(session) -> None:
+    # counted by the caller: an attempt that is retried is not an abort
+    if session.in_transaction:
+        try:
+            await session.abort_transaction()
+        except PyMongoError:
+            pass
+
+
 def get_collection(name: str):
     return _db().get_collection(name)
 
@@ -22,7 +93,4 @@ def get_collection(name: str):
 def get_database():
     """Return a synchronous pymongo database for use in tests or admin scripts.
     Production async code should use `get_collection`/motor APIs instead."""
-    from pymongo import MongoClient
-    from core.config import settings
-    client = MongoClient(settings.MONGO_URI)
-    return client.get_database(settings.MONGO_DB)
+    return get_sync_client().get_database(settings.MONGO_DB)
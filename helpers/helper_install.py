@@ -1,79 +1,136 @@
 from datetime import datetime, timezone
-from typing import Any, List
+from typing import Any, List, Mapping
 from fastapi.encoders import jsonable_encoder
-from bson import SON
 from loguru import logger
-from mongodb.mongo_index import MongoIndex, IndexUser
-from mongodb.mongo_client import MGDB
-from mongodb.mongo_collection import tb_user
+from pymongo.errors import PyMongoError
+from mongodb.mongo_index import (
+    MongoIndex,
+    IndexUser,
+    IndexCategory,
+    IndexProduct,
+    IndexInventory,
+    IndexOrder,
+    IndexReservation,
+    IndexIdempotency,
+)
+from mongodb.mongo_collection import tb
 from mongodb.mongo_collection_name import CollectionNames
 
 class MongoIndexInit:
-    def __init__(self, coll, collName: str, indexes: list[MongoIndex]) -> None:
-        self.coll = coll
+    def __init__(self, collName: CollectionNames, indexes: list[MongoIndex]) -> None:
         self.collName = collName
         self.indexes = indexes
 
+    @property
+    def coll(self):
+        return tb(self.collName)
+
 ListMongoIndexInit: list[MongoIndexInit] = [
-    MongoIndexInit(tb_user, CollectionNames.tb_user.value, indexes=[i.value for i in IndexUser])
+    MongoIndexInit(CollectionNames.tb_user, indexes=[i.value for i in IndexUser]),
+    MongoIndexInit(CollectionNames.tb_category, indexes=[i.value for i in IndexCategory]),
+    MongoIndexInit(CollectionNames.tb_product, indexes=[i.value for i in IndexProduct]),
+    MongoIndexInit(CollectionNames.tb_inventory, indexes=[i.value for i in IndexInventory]),
+    MongoIndexInit(CollectionNames.tb_order, indexes=[i.value for i in IndexOrder]),
+    MongoIndexInit(CollectionNames.tb_reservation, indexes=[i.value for i in IndexReservation]),
+    MongoIndexInit(CollectionNames.tb_idempotency, indexes=[i.value for i in IndexIdempotency]),
 ]
 
+def _key(key: Mapping[str, Any] | list[tuple[str, Any]]) -> tuple[tuple[str, Any], ...]:
+    # list_indexes may hand back 1.0 / -1.0 for directions
+    items = key.items() if isinstance(key, Mapping) else key
+    return tuple((f, int(v) if isinstance(v, (int, float)) else v) for f, v in items)
+
+def _options(options: Mapping[str, Any]) -> dict[str, Any]:
+    return {
+        k: int(v) if k == "expireAfterSeconds" else v
+        for k, v in options.items()
+        # `is`, not `in`: expireAfterSeconds=0 == False but is a real TTL
+        if k in MongoIndex.SPEC_OPTIONS and v is not None and v is not False
+    }
+
 class InstallHelper:
 
     @staticmethod
-    async def start_install(
-    ) -> dict[str, Any]:
+    async def start_install(build: bool = True) -> dict[str, Any]:
+        """
+        Compare every collection's declared indexes with what the server has,
+        build the missing ones (unless `build` is False) and log any drift.
+        """
         log: dict[str, Any] = {}
-        list_collection = await MGDB.list_collection_names()
         start_time = datetime.now(timezone.utc)
         try:
-            log = await InstallHelper.create_indexes(list_collection, log, start_time)
-
+            log = await InstallHelper.create_indexes(log, start_time, build)
         except Exception as err:
             logger.exception(str(err), err)
             log["error"] = str(err)
         return jsonable_encoder(log)
 
     @staticmethod
-    def collection_has_indexes(indexes: List[SON | Any], index_name: str) -> bool:
-        for ind in indexes:
-            if not isinstance(ind, SON):
-                continue
-            if not ind.has_key("name"):
-                continue
-            ind_name = ind.get("name")
-            if ind_name == index_name:
-                return True
-        return False
+    def diff_indexes(declared: List[MongoIndex], existing: List[Mapping[str, Any]]) -> dict[str, Any]:
+        """
+        Match declared indexes to existing ones by key pattern (names may differ,
+        e.g. indexes made by the old create_indexes script).
+        - missing: declared, no index with that key pattern
+        - mismatched: same key pattern, different unique/ttl/partial options
+        - undeclared: on the server but not in the registry
+        """
+        by_key = {_key(ex["key"]): ex for ex in existing if ex.get("name") != "_id_"}
+        diff: dict[str, Any] = {"present": [], "missing": [], "mismatched": [], "undeclared": []}
+        for idx in declared:
+            ex = by_key.pop(_key(idx.key_spec()), None)
+            if ex is None:
+                diff["missing"].append(idx)
+            elif _options(ex) != idx.options():
+                diff["mismatched"].append({
+                    "name": ex["name"],
+                    "declared": {"name": idx.index_name, **idx.options()},
+                    "actual": _options(ex),
+                })
+            else:
+                diff["present"].append(ex["name"])
+        diff["undeclared"] = [ex["name"] for ex in by_key.values()]
+        return diff
 
     @staticmethod
-    async def do_create_index(m: MongoIndexInit, list_collection: List[str], log: dict[str, Any], start_time: datetime) -> dict[str, Any]:
+    async def do_create_index(m: MongoIndexInit, build: bool) -> dict[str, Any]:
         sub_log: dict[str, Any] = {}
-        if not m.collName in list_collection:
-            await MGDB.create_collection(m.collName)
-            sub_log[m.collName + "_collection"] = "created"
-        else:
-            sub_log[m.collName + "_collection"] = "already exists"
+        coll = m.coll
+        # an unknown collection simply lists no indexes; create_indexes creates it
+        existing: List[Any] = await coll.list_indexes().to_list(None) # type: ignore
+        diff = InstallHelper.diff_indexes(m.indexes, existing)
 
-        indexes_cursor = m.coll.list_indexes()
-        indexes: List[Any] = await indexes_cursor.to_list(None) # type: ignore
-        for idx in m.indexes:
-            index_name = idx.index_name
-            if not InstallHelper.collection_has_indexes(indexes, index_name):
-                await m.coll.create_index(
-                    [(i.field, i.sort) for i in idx.keys],
-                    name=index_name,
-                    **idx.kwargs
-                )
-                sub_log[m.collName + "_" + index_name] = "created"
+        sub_log["present"] = diff["present"]
+        if diff["missing"]:
+            names = [idx.index_name for idx in diff["missing"]]
+            if build:
+                try:
+                    await coll.create_indexes([idx.to_model() for idx in diff["missing"]])
+                    sub_log["created"] = names
+                except PyMongoError as err:
+                    logger.error(f"Index build on {m.collName.value} failed: {err}")
+                    sub_log["missing"] = names
+                    sub_log["error"] = str(err)
             else:
-                sub_log[m.collName + "_" + index_name] = "already exists"
-
+                sub_log["missing"] = names
+        if diff["mismatched"]:
+            sub_log["mismatched"] = diff["mismatched"]
+            logger.warning(f"Index drift on {m.collName.value}: options differ {diff['mismatched']}")
+        if diff["undeclared"]:
+            sub_log["undeclared"] = diff["undeclared"]
+            logger.warning(f"Index drift on {m.collName.value}: undeclared {diff['undeclared']}")
         return sub_log
 
     @staticmethod
-    async def create_indexes(list_collection: List[str], log: dict[str, Any], start_time: datetime) -> dict[str, Any]:
+    async def create_indexes(log: dict[str, Any], start_time: datetime, build: bool = True) -> dict[str, Any]:
         for index_init in ListMongoIndexInit:
-            ret_index = await InstallHelper.do_create_index(index_init, list_collection, log, start_time)
-            log["setup_" + index_init.collName] = ret_index
-        return log
\ No newline at end of file
+            ret_index = await InstallHelper.do_create_index(index_init, build)
+            log["setup_" + index_init.collName.value] = ret_index
+        log["elapsed_seconds"] = (datetime.now(timezone.utc) - start_time).total_seconds()
+        return log
+
+    @staticmethod
+    def has_drift(log: Mapping[str, Any]) -> bool:
+        return any(
+            isinstance(sub, Mapping) and any(k in sub for k in ("missing", "mismatched", "undeclared", "error"))
+            for sub in log.values()
+        ) or "error" in log
@@ -1,16 +1,77 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from loguru import logger
 from fastapi.security import OAuth2PasswordBearer
 
 from routers.auth import router as auth_router
-from routers.users import router as users_router
+from routers.users import router as users_router, get_current_user, get_current_user_fresh, get_current_principal
 from routers.categories import router as categories_router
 from routers.products import router as products_router
 from routers.inventory import router as inventory_router
 from routers.orders import router as orders_router
+from routers.debug import router as debug_router
+from mongodb.mongo_client import get_client, close_clients
+from core.config import settings
+from core.security import calibrate_hash_rounds, set_hash_rounds, shutdown_hash_pool
+from repositories.repository_order import RepositoryOrder
+from repositories.repository_reservation import RepositoryReservation
+from helpers.helper_install import InstallHelper
+from utils.util_metrics import render_prometheus
+from utils.util_request_context import RequestContextMiddleware, time_auth_dependencies
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+
+async def sweep_reservations():
+    while True:
+        await asyncio.sleep(settings.RESERVATION_SWEEP_INTERVAL_SECONDS)
+        try:
+            expired = await RepositoryReservation.expire_stale()
+            if expired:
+                logger.info(f"Released {expired} expired stock reservation(s)")
+        except Exception as err:
+            logger.warning(f"Reservation sweep failed: {err}")
+
+
+async def ensure_indexes():
+    log = await InstallHelper.start_install()
+    if InstallHelper.has_drift(log):
+        logger.warning(f"Index registry drift: {log}")
+    else:
+        logger.info(f"Indexes up to date ({log.get('elapsed_seconds', 0):.2f}s)")
+
+
+async def calibrate_password_hashing():
+    rounds = await asyncio.to_thread(
+        calibrate_hash_rounds, settings.PASSWORD_HASH_TARGET_MS, settings.PASSWORD_HASH_MIN_ROUNDS
+    )
+    set_hash_rounds(rounds)
+    logger.info(f"bcrypt work factor {rounds} (target verify {settings.PASSWORD_HASH_TARGET_MS:g}ms)")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the pooled client on the serving loop up front; every request reuses it
+    get_client()
+    if settings.PASSWORD_HASH_CALIBRATE_ON_STARTUP:
+        await calibrate_password_hashing()
+    sweeper = asyncio.create_task(sweep_reservations())
+    # Index builds run server-side; don't hold startup on them
+    indexer = asyncio.create_task(ensure_indexes()) if settings.ENSURE_INDEXES_ON_STARTUP else None
+    yield
+    sweeper.cancel()
+    if indexer is not None and not indexer.done():
+        indexer.cancel()
+    await RepositoryOrder.close_group_commit()
+    close_clients()
+    shutdown_hash_pool()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="POS Backend",
     description="POS APIs",
     swagger_ui_init_oauth={
@@ -24,8 +85,17 @@ app.include_router(categories_router)
 app.include_router(products_router)
 app.include_router(inventory_router)
 app.include_router(orders_router)
+app.include_router(debug_router)
+
+app.add_middleware(RequestContextMiddleware)
+time_auth_dependencies(app, get_current_user, get_current_user_fresh, get_current_principal)
 
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from utils.models.model_data_type import BaseModel
+from utils.models.model_data_type import BaseModel, ObjectId
 
 
 class Token(BaseModel):
@@ -9,3 +9,14 @@ class Token(BaseModel):
 class TokenPayload(BaseModel):
     sub: str | None = None
     exp: int | None = None
+
+
+class Principal(BaseModel):
+    """
+    The caller as authorization sees it: built from the claims of a
+    self-contained token, or from the user document when the token has none.
+    """
+    id: ObjectId
+    username: str
+    name: str | None = None
+    role: str
@@ -0,0 +1,10 @@
+from pydantic import Field
+from utils.models.model_data_type import BaseModel, ObjectId
+
+
+class IdempotencyClaim(BaseModel):
+    """Outcome of RepositoryIdempotency.claim for one key."""
+    state: str = Field(default=..., title="claimed | done | processing")
+    claim: ObjectId | None = Field(default=None, title="Claim token; pass it back to complete or release the key")
+    response: dict | None = Field(default=None, title="Stored response body when state is done")
+    reclaimed: bool = Field(default=False, title="Claimed from a processing record whose lease had run out")
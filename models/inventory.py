@@ -1,13 +1,42 @@
-from pydantic import Field
-from utils.models.model_data_type import BaseModel, Decimal128, ObjectId
+from pydantic import Field, ConfigDict, field_validator
+from utils.models.model_data_type import BaseModel, Fixed, ObjectId
 from datetime import datetime
+from typing import List
 
 
 class InventoryItem(BaseModel):
     store_id: ObjectId = Field(default=..., title="Store ID")
     product_id: ObjectId = Field(default=..., title="Product ID")
-    qty: Decimal128 = Field(default=...)
-    reserved_qty: Decimal128 = Field(default=0)
+    qty: Fixed = Field(default=..., title="Sellable quantity (excludes reserved stock)")
+    reserved_qty: Fixed = Field(default=Fixed(0), title="Quantity held by open reservations")
     version: int = Field(default=1)
     updated_at: datetime | None = None
     created_at: datetime | None = None
+
+
+class ReservationLine(BaseModel):
+    product_id: ObjectId
+    qty: Fixed
+
+    @field_validator("qty")
+    @classmethod
+    def qty_positive(cls, v: Fixed) -> Fixed:
+        if v <= 0:
+            raise ValueError("Quantity must be greater than zero")
+        return v
+
+
+class ReservationRequest(BaseModel):
+    items: List[ReservationLine]
+
+
+class ReservationInDb(ReservationRequest):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: ObjectId = Field(default=..., serialization_alias="id", alias="_id")
+    store_id: ObjectId
+    user_id: ObjectId | None = None
+    state: str = Field(default="held", title="held | committed | released | expired")
+    expires_at: datetime
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
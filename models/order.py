@@ -1,13 +1,20 @@
-from pydantic import Field, ConfigDict
-from utils.models.model_data_type import BaseModel, Decimal128, ObjectId
+from pydantic import Field, ConfigDict, field_validator
+from utils.models.model_data_type import BaseModel, Fixed, ObjectId
 from datetime import datetime
 from typing import List
 
 
 class OrderLine(BaseModel):
     product_id: ObjectId
-    qty: Decimal128
-    price: Decimal128
+    qty: Fixed
+    price: Fixed
+
+    @field_validator("qty")
+    @classmethod
+    def qty_positive(cls, v: Fixed) -> Fixed:
+        if v <= 0:
+            raise ValueError("Quantity must be greater than zero")
+        return v
 
 
 class OrderRequest(BaseModel):
@@ -15,15 +22,43 @@ class OrderRequest(BaseModel):
     user_id: ObjectId
     items: List[OrderLine]
     idempotency_key: str | None = None
+    reservation_id: ObjectId | None = Field(default=None, title="Reservation to convert (from /stores/{store_id}/inventory/reserve)")
 
 
 class OrderInDb(OrderRequest):
     model_config = ConfigDict(populate_by_name=True)
     
     id: ObjectId = Field(default=..., serialization_alias="id", alias="_id")
-    subtotal: Decimal128 | None = None
-    tax: Decimal128 | None = None
-    total: Decimal128 | None = None
+    subtotal: Fixed | None = None
+    tax: Fixed | None = None
+    total: Fixed | None = None
     status: str = Field(default="created")
     created_at: datetime | None = None
     updated_at: datetime | None = None
+
+
+class OrderSummary(BaseModel):
+    """
+    An order as the list screens show it (GET /orders/?fields=summary). Its
+    Projection() only reads fields of index_store_id_created_at_id_summary, so
+    a store's listing is answered from the index alone.
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: ObjectId = Field(default=..., serialization_alias="id", alias="_id")
+    store_id: ObjectId
+    status: str = Field(default="created")
+    total: Fixed | None = None
+    created_at: datetime | None = None
+
+
+class OrderBatchRequest(BaseModel):
+    orders: List[OrderRequest] = Field(default=..., min_length=1, max_length=500)
+
+
+class OrderBatchResult(BaseModel):
+    index: int
+    idempotency_key: str | None = None
+    status: str = Field(default=..., title="created | duplicate | failed")
+    order: OrderInDb | None = None
+    error: str | None = None
@@ -1,11 +1,90 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import WriteConcern
+import asyncio
+import weakref
 from typing import Optional
 
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, WriteConcern
+
+from core.config import settings
+from mongodb.mongo_monitoring import slow_query_listener, pool_metrics_listener, heartbeat_metrics_listener
+
+
+# One motor client per event loop. Motor binds a client to the loop it first
+# runs on, so test harnesses that spin a fresh loop per test get their own
+# client while the app (single loop) reuses one pool for every request.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncIOMotorClient]" = weakref.WeakKeyDictionary()
+# Client used when no loop is running yet (module import time, scripts)
+_detached_client: Optional[AsyncIOMotorClient] = None
+_sync_client: Optional[MongoClient] = None
+
+
+def client_options() -> dict:
+    """Pool, timeout and monitoring options shared by the async and sync clients."""
+    return {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "event_listeners": [slow_query_listener, pool_metrics_listener, heartbeat_metrics_listener],
+    }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_client(uri: str | None = None) -> AsyncIOMotorClient:
+    """Return the shared motor client for the current event loop, creating it on first use."""
+    global _detached_client
+    loop = _running_loop()
+    if loop is None:
+        if _detached_client is None:
+            _detached_client = AsyncIOMotorClient(uri or settings.MONGO_URI, **client_options())
+        return _detached_client
+
+    client = _clients.get(loop)
+    if client is None:
+        client = AsyncIOMotorClient(uri or settings.MONGO_URI, **client_options())
+        _clients[loop] = client
+    return client
+
+
+def get_sync_client() -> MongoClient:
+    """Return the process-wide synchronous pymongo client (tests, admin scripts)."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = MongoClient(settings.MONGO_URI, **client_options())
+    return _sync_client
+
+
+def all_clients() -> list:
+    """Every live client (per-loop, detached and sync), for scrape-time metrics."""
+    clients: list = list(_clients.values())
+    if _detached_client is not None:
+        clients.append(_detached_client)
+    if _sync_client is not None:
+        clients.append(_sync_client)
+    return clients
+
 
-def get_client(uri: str = "mongodb://localhost:27017/") -> AsyncIOMotorClient:
-    # Create a new client per call to avoid event-loop binding issues in test harnesses
-    return AsyncIOMotorClient(uri)
+def close_clients() -> None:
+    """Close every pooled client. Called from the app lifespan on shutdown."""
+    global _detached_client, _sync_client
+    for client in list(_clients.values()):
+        client.close()
+    _clients.clear()
+    if _detached_client is not None:
+        _detached_client.close()
+        _detached_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
 
 
 def get_mgdb(db_name: str = "pos"):
@@ -18,4 +97,4 @@ def get_mgdb(db_name: str = "pos"):
 
 async def mongo_start_default_session():
     client = get_client()
-    return await client.start_session()
\ No newline at end of file
+    return await client.start_session()
@@ -1,5 +1,8 @@
-from mongodb.mongo_client import MGDB
+from db.mongo import get_collection
 from mongodb.mongo_collection_name import CollectionNames
 from utils.util_mongodb import TMongoCollection
 
-tb_user: TMongoCollection = MGDB.get_collection(CollectionNames.tb_user.value)
\ No newline at end of file
+
+def tb(name: CollectionNames) -> TMongoCollection:
+    # resolved per call: the client (and so the collection) belongs to the running loop
+    return get_collection(name.value)
@@ -1,4 +1,10 @@
 from enum import Enum
 
 class CollectionNames(str, Enum):
-    tb_user = 'users'
\ No newline at end of file
+    tb_user = 'users'
+    tb_category = 'categories'
+    tb_product = 'products'
+    tb_inventory = 'inventory'
+    tb_order = 'orders'
+    tb_reservation = 'reservations'
+    tb_idempotency = 'idempotency'
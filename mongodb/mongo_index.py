@@ -9,30 +9,155 @@ class MongoIndexKey:
         self.sort = sort
 
 class MongoIndex:
+    # create_index options that change what the index is; anything else (e.g. background) is ignored when diffing
+    SPEC_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression", "collation")
+
     def __init__(self, index_name: str, keys: list[MongoIndexKey], **kwargs: Any) -> None:
         self.index_name = index_name
         self.keys = keys
         self.kwargs = kwargs
 
+    def key_spec(self) -> list[tuple[str, Any]]:
+        return [(i.field, i.sort) for i in self.keys]
+
+    def options(self) -> dict[str, Any]:
+        # `is`, not `in`: expireAfterSeconds=0 == False but is a real TTL
+        return {k: v for k, v in self.kwargs.items() if k in self.SPEC_OPTIONS and v is not None and v is not False}
+
+    def to_model(self) -> pymongo.IndexModel:
+        return pymongo.IndexModel(self.key_spec(), name=self.index_name, **self.kwargs)
+
 class IndexUser(Enum):
-    isDeleted_name = MongoIndex(
-        "index_isDeleted_name",
+    username = MongoIndex(
+        "index_username",
+        [
+            MongoIndexKey("username", pymongo.ASCENDING)
+        ],
+        unique=True
+    )
+    email = MongoIndex(
+        "index_email",
+        [
+            MongoIndexKey("email", pymongo.ASCENDING)
+        ],
+        unique=True
+    )
+
+class IndexCategory(Enum):
+    name = MongoIndex(
+        "index_name",
         [
-            MongoIndexKey("isDeleted", pymongo.ASCENDING),
             MongoIndexKey("name", pymongo.ASCENDING)
+        ],
+        unique=True
+    )
+    # combo list: {active} sorted by display_name
+    active_display_name = MongoIndex(
+        "index_active_display_name",
+        [
+            MongoIndexKey("active", pymongo.ASCENDING),
+            MongoIndexKey("display_name", pymongo.ASCENDING)
         ]
     )
-    isDeleted_username = MongoIndex(
-        "index_isDeleted_username",
+    # list_categories(active_only=True), keyset on _id
+    active_id = MongoIndex(
+        "index_active_id",
         [
-            MongoIndexKey("isDeleted", pymongo.ASCENDING),
-            MongoIndexKey("username", pymongo.ASCENDING)
+            MongoIndexKey("active", pymongo.ASCENDING),
+            MongoIndexKey("_id", pymongo.ASCENDING)
         ]
     )
-    isDeleted_email = MongoIndex(
-        "index_isDeleted_email",
+
+class IndexProduct(Enum):
+    sku = MongoIndex(
+        "index_sku",
+        [
+            MongoIndexKey("sku", pymongo.ASCENDING)
+        ],
+        unique=True
+    )
+    # delete_category counts products still referencing the category
+    category_id = MongoIndex(
+        "index_category_id",
         [
-            MongoIndexKey("isDeleted", pymongo.ASCENDING),
-            MongoIndexKey("email", pymongo.ASCENDING)
+            MongoIndexKey("category_id", pymongo.ASCENDING)
         ]
-    )
\ No newline at end of file
+    )
+
+class IndexInventory(Enum):
+    store_id_product_id = MongoIndex(
+        "index_store_id_product_id",
+        [
+            MongoIndexKey("store_id", pymongo.ASCENDING),
+            MongoIndexKey("product_id", pymongo.ASCENDING)
+        ],
+        unique=True
+    )
+
+class IndexOrder(Enum):
+    idempotency_key = MongoIndex(
+        "index_idempotency_key",
+        [
+            MongoIndexKey("idempotency_key", pymongo.ASCENDING)
+        ]
+    )
+    # list_orders sorts newest first with an _id tie-break; one index per filter it accepts
+    created_at_id = MongoIndex(
+        "index_created_at_id",
+        [
+            MongoIndexKey("created_at", pymongo.DESCENDING),
+            MongoIndexKey("_id", pymongo.DESCENDING)
+        ]
+    )
+    # also carries the rest of OrderSummary, so a store's summary listing is a covered query
+    store_id_created_at_id_summary = MongoIndex(
+        "index_store_id_created_at_id_summary",
+        [
+            MongoIndexKey("store_id", pymongo.ASCENDING),
+            MongoIndexKey("created_at", pymongo.DESCENDING),
+            MongoIndexKey("_id", pymongo.DESCENDING),
+            MongoIndexKey("status", pymongo.ASCENDING),
+            MongoIndexKey("total", pymongo.ASCENDING)
+        ]
+    )
+    user_id_created_at_id = MongoIndex(
+        "index_user_id_created_at_id",
+        [
+            MongoIndexKey("user_id", pymongo.ASCENDING),
+            MongoIndexKey("created_at", pymongo.DESCENDING),
+            MongoIndexKey("_id", pymongo.DESCENDING)
+        ]
+    )
+    status_created_at_id = MongoIndex(
+        "index_status_created_at_id",
+        [
+            MongoIndexKey("status", pymongo.ASCENDING),
+            MongoIndexKey("created_at", pymongo.DESCENDING),
+            MongoIndexKey("_id", pymongo.DESCENDING)
+        ]
+    )
+
+class IndexReservation(Enum):
+    state_expires_at = MongoIndex(
+        "index_state_expires_at",
+        [
+            MongoIndexKey("state", pymongo.ASCENDING),
+            MongoIndexKey("expires_at", pymongo.ASCENDING)
+        ]
+    )
+
+class IndexIdempotency(Enum):
+    key = MongoIndex(
+        "index_key",
+        [
+            MongoIndexKey("key", pymongo.ASCENDING)
+        ],
+        unique=True
+    )
+    expires_at = MongoIndex(
+        "index_expires_at",
+        [
+            MongoIndexKey("expires_at", pymongo.ASCENDING)
+        ],
+        expireAfterSeconds=0
+    )
@@ -0,0 +1,320 @@
+"""
+Driver monitoring.
+
+Commands: every command is timed and attributed to the route and repository
+method that issued it (utils/util_request_context). Commands over
+SLOW_QUERY_MS are written to the slow log, and a sample of them is explained
+on a background thread. `SlowQueryListener.top` feeds /debug/slow-queries
+with a rolling top-N by total time.
+
+Pool and server monitoring: checkout wait, open/checked-out connections,
+connection creation and heartbeat RTT, exported on /metrics to size
+MONGO_MAX_POOL_SIZE from data.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pymongo import monitoring
+
+from core.config import settings
+from utils.util_metrics import Counter, Gauge, Histogram
+from utils.util_request_context import current_repository_method, current_route, current_timings
+
+# commands that are driver housekeeping rather than application queries
+IGNORED_COMMANDS = frozenset({
+    "hello", "ismaster", "isMaster", "ping", "endSessions", "buildInfo", "saslStart",
+    "saslContinue", "getMore", "killCursors", "explain", "abortTransaction", "commitTransaction",
+})
+EXPLAINABLE = frozenset({"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"})
+# fields the driver adds to a command that explain rejects or doesn't need
+_EXPLAIN_STRIP = frozenset({
+    "lsid", "$clusterTime", "$db", "txnNumber", "startTransaction", "autocommit",
+    "readConcern", "writeConcern", "$readPreference", "bypassDocumentValidation",
+})
+
+StatKey = Tuple[str, str, str, str]  # route, repository method, command, collection
+BUCKET_SECONDS = 10
+
+
+class _Stat:
+    __slots__ = ("count", "total_ms", "max_ms", "slow")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow = 0
+
+    def add(self, ms: float, slow: bool) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.slow += slow
+
+    def merge(self, other: "_Stat") -> None:
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.slow += other.slow
+
+
+def _explain_summary(explained: dict) -> Dict[str, Any]:
+    planner = explained.get("queryPlanner") or {}
+    if not planner:
+        # aggregate explain keeps the planner under its first stage
+        for stage in explained.get("stages", []):
+            planner = stage.get("$cursor", {}).get("queryPlanner") or planner
+    stages: List[str] = []
+
+    def walk(plan: Any) -> None:
+        if isinstance(plan, dict):
+            if "stage" in plan:
+                stages.append(f"{plan['stage']}({plan['indexName']})" if "indexName" in plan else plan["stage"])
+            for v in plan.values():
+                walk(v)
+        elif isinstance(plan, list):
+            for v in plan:
+                walk(v)
+
+    walk(planner.get("winningPlan"))
+    return {"plan": " > ".join(stages), "collscan": any(s == "COLLSCAN" for s in stages)}
+
+
+class SlowQueryListener(monitoring.CommandListener):
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[Any, int], Tuple[str, str, str, dict, Any]] = {}
+        # (bucket start, stats) for the rolling window
+        self._buckets: Deque[Tuple[int, Dict[StatKey, _Stat]]] = deque()
+        self._explains: Dict[StatKey, Dict[str, Any]] = {}
+        self._explainer: Optional[ThreadPoolExecutor] = None
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        method = current_repository_method()
+        self._inflight[(event.connection_id, event.request_id)] = (
+            current_route() or "-",
+            method or "-",
+            collection if isinstance(collection, str) else "",
+            event.command if event.command_name in EXPLAINABLE else {},
+            # Server-Timing `mongo` counts commands issued from repository calls
+            current_timings() if method else None,
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, None)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, str(event.failure.get("errmsg", "")) if isinstance(event.failure, dict) else "failed")
+
+    def _finish(self, event: Any, error: Optional[str]) -> None:
+        entry = self._inflight.pop((event.connection_id, event.request_id), None)
+        if entry is None:
+            return
+        route, method, collection, command, timings = entry
+        ms = event.duration_micros / 1000
+        if timings is not None:
+            timings.mongo += ms / 1000
+        slow = ms >= settings.SLOW_QUERY_MS
+        key = (route, method, event.command_name, collection)
+        bucket = int(time.monotonic()) // BUCKET_SECONDS * BUCKET_SECONDS
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != bucket:
+                self._buckets.append((bucket, {}))
+                self._expire(bucket)
+            stats = self._buckets[-1][1]
+            stat = stats.get(key)
+            if stat is None:
+                stat = stats[key] = _Stat()
+            stat.add(ms, slow)
+        if not slow:
+            return
+
+        logger.bind(
+            slow_query=True,
+            route=route,
+            repository=method,
+            command=event.command_name,
+            collection=collection,
+            database=event.database_name,
+            duration_ms=round(ms, 2),
+            error=error,
+        ).warning(f"slow mongo command {event.command_name} {collection} {ms:.1f}ms ({method}, {route})")
+        if command and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+            self._submit_explain(key, event.database_name, command)
+
+    def _expire(self, now_bucket: int) -> None:
+        horizon = now_bucket - settings.SLOW_QUERY_WINDOW_SECONDS
+        while self._buckets and self._buckets[0][0] <= horizon:
+            self._buckets.popleft()
+
+    def _submit_explain(self, key: StatKey, database: str, command: dict) -> None:
+        if self._explainer is None:
+            # one thread: explains are best-effort and must not compete with the app for the pool
+            self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        cmd = {k: v for k, v in command.items() if k not in _EXPLAIN_STRIP}
+        self._explainer.submit(self._explain, key, database, cmd)
+
+    def _explain(self, key: StatKey, database: str, command: dict) -> None:
+        from mongodb.mongo_client import get_sync_client
+        try:
+            explained = get_sync_client()[database].command({"explain": command, "verbosity": "queryPlanner"})
+        except Exception as err:
+            logger.debug(f"slow query explain failed: {err}")
+            return
+        summary = _explain_summary(explained)
+        logger.bind(
+            slow_query=True, route=key[0], repository=key[1], command=key[2], collection=key[3], **summary
+        ).warning(f"slow mongo command plan {key[2]} {key[3]}: {summary['plan']} ({key[1]})")
+        with self._lock:
+            self._explains[key] = {**summary, "at": time.time()}
+
+    def top(self, n: int = 20) -> List[Dict[str, Any]]:
+        """Commands with the most total time over the rolling window."""
+        merged: Dict[StatKey, _Stat] = {}
+        with self._lock:
+            self._expire(int(time.monotonic()) // BUCKET_SECONDS * BUCKET_SECONDS)
+            for _, stats in self._buckets:
+                for key, stat in stats.items():
+                    merged.setdefault(key, _Stat()).merge(stat)
+            explains = dict(self._explains)
+        ranked = sorted(merged.items(), key=lambda kv: kv[1].total_ms, reverse=True)[:n]
+        return [
+            {
+                "route": key[0],
+                "repository": key[1],
+                "command": key[2],
+                "collection": key[3],
+                "count": stat.count,
+                "slow": stat.slow,
+                "total_ms": round(stat.total_ms, 2),
+                "avg_ms": round(stat.total_ms / stat.count, 2),
+                "max_ms": round(stat.max_ms, 2),
+                "explain": explains.get(key),
+            }
+            for key, stat in ranked
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._explains.clear()
+
+
+slow_query_listener = SlowQueryListener()
+
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "pos_mongo_pool_checkout_wait_seconds",
+    "Time from requesting a pooled connection to getting one (or failing)",
+    ["address", "outcome"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+POOL_CHECKOUT_FAILED = Counter(
+    "pos_mongo_pool_checkout_failed_total",
+    "Connection checkouts that failed, by reason (timeout = pool exhausted for waitQueueTimeoutMS)",
+    ["address", "reason"],
+)
+POOL_CONNECTIONS = Gauge("pos_mongo_pool_connections", "Open pooled connections", ["address"])
+POOL_CHECKED_OUT = Gauge("pos_mongo_pool_checked_out", "Connections currently checked out of the pool", ["address"])
+POOL_MAX_SIZE = Gauge("pos_mongo_pool_max_size", "maxPoolSize of each client pool", ["address"])
+POOL_CONNECTIONS_CREATED = Counter(
+    "pos_mongo_pool_connections_created_total", "Connections opened by the pool (rate() gives churn)", ["address"]
+)
+POOL_CLEARED = Counter("pos_mongo_pool_cleared_total", "Pool clears after network errors or failovers", ["address"])
+HEARTBEAT_RTT = Histogram(
+    "pos_mongo_heartbeat_seconds",
+    "Round trip of non-awaited server heartbeats",
+    ["address"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+HEARTBEAT_FAILED = Counter("pos_mongo_heartbeat_failed_total", "Failed server heartbeats", ["address"])
+
+
+def _address(address: Any) -> str:
+    return f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+
+
+def _server_rtt() -> Dict[Tuple[str, ...], float]:
+    # With the streaming protocol RTT is measured by a separate monitor that emits no events,
+    # so read the averaged RTT off the topology at scrape time.
+    from mongodb.mongo_client import all_clients
+    rtt: Dict[Tuple[str, ...], float] = {}
+    for client in all_clients():
+        for address, sd in client.topology_description.server_descriptions().items():
+            if sd.round_trip_time is not None:
+                rtt[(_address(address),)] = sd.round_trip_time
+    return rtt
+
+
+SERVER_RTT = Gauge("pos_mongo_server_rtt_seconds", "Driver's moving-average round trip time per server", ["address"], fn=_server_rtt)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        max_size = event.options.get("maxPoolSize")
+        if max_size:
+            POOL_MAX_SIZE.set(max_size, address=_address(event.address))
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        POOL_CLEARED.inc(address=_address(event.address))
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        address = _address(event.address)
+        POOL_CONNECTIONS.inc(address=address)
+        POOL_CONNECTIONS_CREATED.inc(address=address)
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        POOL_CONNECTIONS.dec(address=_address(event.address))
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        address = _address(event.address)
+        POOL_CHECKOUT_WAIT.observe(event.duration, address=address, outcome="failed")
+        POOL_CHECKOUT_FAILED.inc(address=address, reason=str(event.reason))
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        address = _address(event.address)
+        POOL_CHECKOUT_WAIT.observe(event.duration, address=address, outcome="ok")
+        POOL_CHECKED_OUT.inc(address=address)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        POOL_CHECKED_OUT.dec(address=_address(event.address))
+
+
+class HeartbeatMetricsListener(monitoring.ServerHeartbeatListener):
+
+    def started(self, event: monitoring.ServerHeartbeatStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.ServerHeartbeatSucceededEvent) -> None:
+        # awaited (streaming) heartbeats block server-side until something changes; not an RTT
+        if not event.awaited:
+            HEARTBEAT_RTT.observe(event.duration, address=_address(event.connection_id))
+
+    def failed(self, event: monitoring.ServerHeartbeatFailedEvent) -> None:
+        HEARTBEAT_FAILED.inc(address=_address(event.connection_id))
+
+
+pool_metrics_listener = PoolMetricsListener()
+heartbeat_metrics_listener = HeartbeatMetricsListener()
@@ -0,0 +1,213 @@
+"""
+Registry of the query shapes each repository method sends, audited against
+the index registry by scripts/audit_query_plans.py. Filters are built from a
+sample dict of seeded values (store_id, product_id, ...). Writes are declared
+by their filter: an update or delete selects documents with the same plan as
+a find on that filter, and explaining the find leaves the data untouched.
+
+When a repository query changes, change its shape here too.
+"""
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Callable, Mapping
+
+import pymongo
+
+from models.order import OrderInDb, OrderSummary
+from mongodb.mongo_collection_name import CollectionNames
+from utils.util_pagination import EncodeCursor, KeysetQuery, QuerySortingOrder
+from utils.models.model_data_type import ObjectId
+
+Sample = Mapping[str, Any]
+
+
+class MongoQueryShape:
+    def __init__(
+        self,
+        method: str,
+        collName: CollectionNames,
+        query: Callable[[Sample], dict[str, Any]],
+        op: str = "find",
+        sort: list[tuple[str, int]] | None = None,
+        projection: dict[str, Any] | None = None,
+        limit: int = 0,
+        covered: bool = False,
+    ) -> None:
+        self.method = method
+        self.collName = collName
+        self.query = query
+        self.op = op  # "find" or "count"
+        self.sort = sort
+        self.projection = projection
+        self.limit = limit
+        # expected to be answered from the index alone (no document fetched)
+        self.covered = covered
+
+    def explain_command(self, sample: Sample) -> dict[str, Any]:
+        if self.op == "count":
+            # count_documents runs as an aggregate $match + $group
+            return {
+                "aggregate": self.collName.value,
+                "pipeline": [{"$match": self.query(sample)}, {"$group": {"_id": 1, "n": {"$sum": 1}}}],
+                "cursor": {},
+            }
+        cmd: dict[str, Any] = {"find": self.collName.value, "filter": self.query(sample)}
+        if self.sort:
+            cmd["sort"] = dict(self.sort)
+        if self.projection:
+            cmd["projection"] = self.projection
+        if self.limit:
+            cmd["limit"] = self.limit
+        return cmd
+
+
+_DESC = [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+
+
+def _after(s: Sample) -> dict[str, Any]:
+    """Keyset filter for the page after the sample order (list_orders with a cursor)."""
+    cursor = EncodeCursor("created_at", QuerySortingOrder.Descending, s["order_created_at"], s["order_id"])
+    return KeysetQuery({"store_id": s["store_id"]}, "created_at", QuerySortingOrder.Descending, cursor)[0]
+
+
+_ORDER_FULL = OrderInDb.Projection()
+_ORDER_SUMMARY = OrderSummary.Projection()
+
+
+class QueryShapeUser(Enum):
+    create_user_username = MongoQueryShape("RepositoryUser.create_user", CollectionNames.tb_user, lambda s: {"username": s["username"]}, op="count")
+    create_user_email = MongoQueryShape("RepositoryUser.create_user", CollectionNames.tb_user, lambda s: {"email": s["email"]}, op="count")
+    get_by_username = MongoQueryShape("RepositoryUser.get_by_username", CollectionNames.tb_user, lambda s: {"username": s["username"]}, limit=1)
+    get_by_email = MongoQueryShape("RepositoryUser.get_by_email", CollectionNames.tb_user, lambda s: {"email": s["email"]}, limit=1)
+    get_by_id = MongoQueryShape("RepositoryUser.get_by_id", CollectionNames.tb_user, lambda s: {"_id": s["user_id"]}, limit=1)
+
+
+class QueryShapeCategory(Enum):
+    get_by_name = MongoQueryShape("RepositoryCategory.get_by_name", CollectionNames.tb_category, lambda s: {"name": s["category_name"]}, limit=1)
+    get_by_id = MongoQueryShape("RepositoryCategory.get_by_id", CollectionNames.tb_category, lambda s: {"_id": s["category_id"]}, limit=1)
+    list_categories = MongoQueryShape(
+        "RepositoryCategory.list_categories", CollectionNames.tb_category, lambda s: {},
+        sort=[("_id", pymongo.ASCENDING)], limit=100,
+    )
+    list_categories_active = MongoQueryShape(
+        "RepositoryCategory.list_categories", CollectionNames.tb_category, lambda s: {"active": True},
+        sort=[("_id", pymongo.ASCENDING)], limit=100,
+    )
+    get_combo_list = MongoQueryShape(
+        "RepositoryCategory.get_combo_list", CollectionNames.tb_category, lambda s: {"active": True},
+        sort=[("display_name", pymongo.ASCENDING)], projection={"_id": 1, "name": 1, "display_name": 1},
+    )
+    update_category_name_check = MongoQueryShape(
+        "RepositoryCategory.update_category", CollectionNames.tb_category,
+        lambda s: {"name": s["category_name"], "_id": {"$ne": s["category_id"]}}, limit=1,
+    )
+    delete_category_products = MongoQueryShape(
+        "RepositoryCategory.delete_category", CollectionNames.tb_product, lambda s: {"category_id": s["category_id"]}, op="count",
+    )
+
+
+class QueryShapeProduct(Enum):
+    create_product_sku = MongoQueryShape("RepositoryProduct.create_product", CollectionNames.tb_product, lambda s: {"sku": s["sku"]}, op="count")
+    get_by_sku = MongoQueryShape("RepositoryProduct.get_by_sku", CollectionNames.tb_product, lambda s: {"sku": s["sku"]}, limit=1)
+    list_products = MongoQueryShape(
+        "RepositoryProduct.list_products", CollectionNames.tb_product, lambda s: {},
+        sort=[("_id", pymongo.ASCENDING)], limit=20,
+    )
+
+
+class QueryShapeInventory(Enum):
+    get_item = MongoQueryShape(
+        "RepositoryInventory.get_item", CollectionNames.tb_inventory,
+        lambda s: {"store_id": s["store_id"], "product_id": s["product_id"]}, limit=1,
+    )
+    decrement_guard = MongoQueryShape(
+        "RepositoryInventory.decrement_many", CollectionNames.tb_inventory,
+        lambda s: {"store_id": s["store_id"], "product_id": s["product_id"]}, limit=1,
+    )
+    decrement_stocked = MongoQueryShape(
+        "RepositoryInventory.decrement_many", CollectionNames.tb_inventory,
+        lambda s: {"store_id": s["store_id"], "product_id": {"$in": s["product_ids"]}},
+        projection={"product_id": 1, "_id": 0},
+    )
+    consume_hold = MongoQueryShape(
+        "RepositoryInventory.consume_hold", CollectionNames.tb_inventory,
+        lambda s: {"store_id": s["store_id"], "product_id": s["product_id"], f"holds.{s['reservation_id']}": {"$exists": True}}, limit=1,
+    )
+
+
+class QueryShapeOrder(Enum):
+    get_by_id = MongoQueryShape("RepositoryOrder.get_by_id", CollectionNames.tb_order, lambda s: {"_id": s["order_id"]}, limit=1)
+    get_by_idempotency = MongoQueryShape(
+        "RepositoryOrder.get_by_idempotency", CollectionNames.tb_order, lambda s: {"idempotency_key": s["idempotency_key"]}, limit=1,
+    )
+    get_many_by_idempotency = MongoQueryShape(
+        "RepositoryOrder.get_many_by_idempotency", CollectionNames.tb_order, lambda s: {"idempotency_key": {"$in": s["idempotency_keys"]}},
+    )
+    list_orders = MongoQueryShape(
+        "RepositoryOrder.list_orders", CollectionNames.tb_order, lambda s: {}, sort=_DESC, projection=_ORDER_FULL, limit=20,
+    )
+    list_orders_store = MongoQueryShape(
+        "RepositoryOrder.list_orders", CollectionNames.tb_order, lambda s: {"store_id": s["store_id"]}, sort=_DESC,
+        projection=_ORDER_FULL, limit=20,
+    )
+    list_orders_user = MongoQueryShape(
+        "RepositoryOrder.list_orders", CollectionNames.tb_order, lambda s: {"user_id": s["user_id"]}, sort=_DESC,
+        projection=_ORDER_FULL, limit=20,
+    )
+    list_orders_status = MongoQueryShape(
+        "RepositoryOrder.list_orders", CollectionNames.tb_order, lambda s: {"status": "confirmed"}, sort=_DESC,
+        projection=_ORDER_FULL, limit=20,
+    )
+    list_orders_store_cursor = MongoQueryShape(
+        "RepositoryOrder.list_orders", CollectionNames.tb_order, _after, sort=_DESC, projection=_ORDER_FULL, limit=20,
+    )
+    # fields=summary
+    list_orders_summary = MongoQueryShape(
+        "RepositoryOrder.list_orders", CollectionNames.tb_order, lambda s: {}, sort=_DESC, projection=_ORDER_SUMMARY, limit=20,
+    )
+    list_orders_store_summary = MongoQueryShape(
+        "RepositoryOrder.list_orders", CollectionNames.tb_order, lambda s: {"store_id": s["store_id"]}, sort=_DESC,
+        projection=_ORDER_SUMMARY, limit=20, covered=True,
+    )
+    list_orders_store_cursor_summary = MongoQueryShape(
+        "RepositoryOrder.list_orders", CollectionNames.tb_order, _after, sort=_DESC, projection=_ORDER_SUMMARY, limit=20,
+        covered=True,
+    )
+
+
+class QueryShapeReservation(Enum):
+    claim = MongoQueryShape(
+        "RepositoryReservation._claim", CollectionNames.tb_reservation,
+        lambda s: {"_id": s["reservation_id"], "store_id": s["store_id"], "state": "held"}, limit=1,
+    )
+    expire_stale = MongoQueryShape(
+        "RepositoryReservation.expire_stale", CollectionNames.tb_reservation,
+        lambda s: {"expires_at": {"$lte": datetime.now(timezone.utc)}, "state": "held"}, limit=1,
+    )
+
+
+class QueryShapeIdempotency(Enum):
+    get = MongoQueryShape("RepositoryIdempotency.get", CollectionNames.tb_idempotency, lambda s: {"key": s["idempotency_key"]}, limit=1)
+    # claim's findAndModify upsert selects on the key alone; set_response updates by it too
+    claim = MongoQueryShape("RepositoryIdempotency.claim", CollectionNames.tb_idempotency, lambda s: {"key": s["idempotency_key"]}, limit=1)
+    # claim_many's upserts select like claim; then it reads back who holds the keys
+    claim_many = MongoQueryShape(
+        "RepositoryIdempotency.claim_many", CollectionNames.tb_idempotency,
+        lambda s: {"key": {"$in": s["idempotency_keys"]}}, projection={"key": 1, "claim": 1, "reclaimed": 1},
+    )
+    # release_many deletes by key and token, one key at a time
+    release_many = MongoQueryShape(
+        "RepositoryIdempotency.release_many", CollectionNames.tb_idempotency,
+        lambda s: {"key": s["idempotency_key"], "claim": ObjectId(), "state": "processing"}, limit=1,
+    )
+
+
+ListMongoQueryShape: list[type[Enum]] = [
+    QueryShapeUser,
+    QueryShapeCategory,
+    QueryShapeProduct,
+    QueryShapeInventory,
+    QueryShapeOrder,
+    QueryShapeReservation,
+    QueryShapeIdempotency,
+]
@@ -1,11 +1,16 @@
-from datetime import datetime, timezone
 from typing import Optional, List
 
+from pymongo import ReturnDocument
+
 from db.mongo import get_collection
 from models.category import CategoryRequest, CategoryInDb, CategoryCombo
 from utils.models.model_data_type import ObjectId
+from utils.util_pagination import KeysetQuery, QuerySortingOrder
+from utils.util_request_context import track_repository
+from utils.util_mongodb import mongo_now
 
 
+@track_repository
 class RepositoryCategory:
     @staticmethod
     async def create_category(request: CategoryRequest) -> CategoryInDb:
@@ -25,19 +30,24 @@ class RepositoryCategory:
         request_dict["name"] = request.name.lower()
         request_dict["sku_prefix"] = request.sku_prefix.upper()
         request_dict["active"] = True
-        request_dict["created_at"] = datetime.now(timezone.utc)
-        request_dict["updated_at"] = datetime.now(timezone.utc)
+        request_dict["created_at"] = mongo_now()
+        request_dict["updated_at"] = mongo_now()
         
         res = await categories.insert_one(request_dict)
-        created = await categories.find_one({"_id": res.inserted_id})
-        return CategoryInDb.model_validate(created)
+        return CategoryInDb.model_validate({**request_dict, "_id": res.inserted_id})
     
     @staticmethod
-    async def list_categories(skip: int = 0, limit: int = 100, active_only: bool = False) -> List[CategoryInDb]:
+    async def list_categories(
+        skip: int = 0, limit: int = 100, active_only: bool = False, cursor: Optional[str] = None, raw: bool = False
+    ) -> List[CategoryInDb]:
+        """The page as CategoryInDb models, or with `raw` as the stored documents."""
         categories = get_collection("categories")
         query = {"active": True} if active_only else {}
-        cursor = categories.find(query, projection=CategoryInDb.Projection()).skip(skip).limit(limit)
-        return [CategoryInDb.model_validate(x) async for x in cursor]
+        query, sort = KeysetQuery(query, "_id", QuerySortingOrder.Ascending, cursor, skip)
+        found = categories.find(query, projection=CategoryInDb.Projection(), sort=sort).skip(skip).limit(limit)
+        if raw:
+            return await found.to_list(limit)
+        return [CategoryInDb.FromDb(x) async for x in found]
     
     @staticmethod
     async def get_combo_list(active_only: bool = True) -> List[CategoryCombo]:
@@ -73,7 +83,7 @@ class RepositoryCategory:
         cat = await categories.find_one({"_id": oid})
         if not cat:
             return None
-        return CategoryInDb.model_validate(cat)
+        return CategoryInDb.FromDb(cat)
     
     @staticmethod
     async def get_by_name(name: str) -> Optional[CategoryInDb]:
@@ -81,7 +91,7 @@ class RepositoryCategory:
         cat = await categories.find_one({"name": name.lower()})
         if not cat:
             return None
-        return CategoryInDb.model_validate(cat)
+        return CategoryInDb.FromDb(cat)
     
     @staticmethod
     async def update_category(category_id: str, request: CategoryRequest) -> CategoryInDb:
@@ -92,11 +102,6 @@ class RepositoryCategory:
         except:
             raise ValueError("Invalid category ID")
         
-        # Check if exists
-        existing = await categories.find_one({"_id": oid})
-        if not existing:
-            raise ValueError("Category not found")
-        
         # Check for duplicate name (excluding current category)
         name_check = await categories.find_one({
             "name": request.name.lower(),
@@ -113,11 +118,16 @@ class RepositoryCategory:
         update_dict = request.model_dump()
         update_dict["name"] = request.name.lower()
         update_dict["sku_prefix"] = request.sku_prefix.upper()
-        update_dict["updated_at"] = datetime.now(timezone.utc)
+        update_dict["updated_at"] = mongo_now()
         
-        await categories.update_one({"_id": oid}, {"$set": update_dict})
-        updated = await categories.find_one({"_id": oid})
-        return CategoryInDb.model_validate(updated)
+        updated = await categories.find_one_and_update(
+            {"_id": oid},
+            {"$set": update_dict},
+            return_document=ReturnDocument.AFTER
+        )
+        if not updated:
+            raise ValueError("Category not found")
+        return CategoryInDb.FromDb(updated)
     
     @staticmethod
     async def delete_category(category_id: str) -> bool:
@@ -146,7 +156,7 @@ class RepositoryCategory:
         # Soft delete
         result = await categories.update_one(
             {"_id": oid},
-            {"$set": {"active": False, "updated_at": datetime.now(timezone.utc)}}
+            {"$set": {"active": False, "updated_at": mongo_now()}}
         )
         
         return result.modified_count > 0
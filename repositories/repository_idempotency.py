@@ -1,9 +1,57 @@
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Optional, List
 
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from core.config import settings
 from db.mongo import get_collection
+from models.idempotency import IdempotencyClaim
+from utils.models.model_data_type import ObjectId
+from utils.util_request_context import track_repository
+from utils.util_ttl_cache import TTLCache
+
+# Completed responses by key: replays of recent keys are answered without Mongo.
+# Only "done" entries are cached, and those never change until they expire.
+_response_cache: TTLCache[dict] = TTLCache(
+    "idempotency", settings.IDEMPOTENCY_CACHE_MAX_SIZE, settings.IDEMPOTENCY_CACHE_TTL_SECONDS
+)
+
+
+class IdempotencyLeaseLost(Exception):
+    """Our claim on a key was taken over after its lease ran out."""
+
+
+def _claim_pipeline(token: ObjectId, endpoint: str, user_id: str, now: datetime) -> list:
+    """
+    Update pipeline for an upsert on {"key": key} that stamps `token` as the
+    claim only when the record is new or a "processing" claim whose lease has
+    run out; otherwise the record is rewritten unchanged.
+    """
+    claimable = {"$or": [
+        {"$eq": [{"$ifNull": ["$state", None]}, None]},
+        # a missing lease_until compares below any date, so lease-less claims are reclaimable
+        {"$and": [{"$eq": ["$state", "processing"]}, {"$lt": ["$lease_until", now]}]},
+    ]}
 
+    def take(value, field: str) -> dict:
+        return {"$cond": [claimable, {"$literal": value}, f"${field}"]}
 
+    return [{"$set": {
+        "claim": take(token, "claim"),
+        "endpoint": take(endpoint, "endpoint"),
+        "user_id": take(user_id, "user_id"),
+        "created_at": take(now, "created_at"),
+        "lease_until": take(now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS), "lease_until"),
+        # an abandoned claim still expires with the TTL index
+        "expires_at": take(now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS), "expires_at"),
+        "state": take("processing", "state"),
+        # $set stages see the document as it was, so this is the previous state
+        "reclaimed": {"$cond": [claimable, {"$eq": ["$state", "processing"]}, "$reclaimed"]},
+    }}]
+
+
+@track_repository
 class RepositoryIdempotency:
     @staticmethod
     async def get(key: str):
@@ -11,20 +59,133 @@ class RepositoryIdempotency:
         return await coll.find_one({"key": key})
 
     @staticmethod
-    async def create_processing(key: str, endpoint: str, user_id: str):
+    async def claim(key: str, endpoint: str, user_id: str) -> IdempotencyClaim:
+        """
+        Claim `key` or learn its outcome in one findAndModify: an upsert whose
+        pipeline only takes the record over when it is new or a "processing"
+        claim whose lease has run out. `state` is "claimed" (the caller does the
+        work, then calls set_response or release with `claim`), "done" (the
+        stored response body) or "processing" (someone else holds the lease).
+        A claim taken over from a lapsed lease comes back with `reclaimed`: the
+        previous owner may have placed its order before it stopped.
+        """
+        cached = _response_cache.get(key)
+        if cached is not None:
+            return IdempotencyClaim(state="done", response=cached)
+
+        coll = get_collection("idempotency")
+        token = ObjectId()
+        pipeline = _claim_pipeline(token, endpoint, user_id, datetime.now(timezone.utc))
+        for attempt in range(2):
+            try:
+                doc = await coll.find_one_and_update(
+                    {"key": key}, pipeline, upsert=True, return_document=ReturnDocument.AFTER
+                )
+                break
+            except DuplicateKeyError:
+                # lost a concurrent insert of the same key; the retry sees its record
+                if attempt:
+                    raise
+        if doc.get("claim") == token:
+            return IdempotencyClaim(state="claimed", claim=token, reclaimed=bool(doc.get("reclaimed")))
+        if doc.get("state") == "done":
+            if doc.get("response") is not None:
+                _response_cache.set(key, doc["response"])
+            return IdempotencyClaim(state="done", response=doc.get("response"))
+        return IdempotencyClaim(state="processing")
+
+    @staticmethod
+    async def set_response(
+        key: str, response: dict, ttl_hours: int | None = None, session=None, claim: ObjectId | None = None
+    ) -> None:
+        """
+        Store the response for `key`. With `claim`, only while that claim still
+        holds the key: raises IdempotencyLeaseLost if another request took it over.
+        """
+        coll = get_collection("idempotency")
+        expire_at = datetime.now(timezone.utc) + timedelta(hours=ttl_hours or settings.IDEMPOTENCY_TTL_HOURS)
+        query: dict = {"key": key}
+        if claim is not None:
+            query["claim"] = claim
+        res = await coll.update_one(
+            query,
+            {"$set": {"state": "done", "response": response, "expires_at": expire_at}, "$unset": {"lease_until": ""}},
+            session=session
+        )
+        if claim is not None and res.matched_count == 0:
+            raise IdempotencyLeaseLost(f"Idempotency key {key} was taken over")
+        if session is None:
+            _response_cache.set(key, response)
+
+    @staticmethod
+    async def release(key: str, claim: ObjectId) -> None:
+        """Drop our own processing claim after a failure so the client can retry at once."""
+        coll = get_collection("idempotency")
+        await coll.delete_one({"key": key, "claim": claim, "state": "processing"})
+
+    @staticmethod
+    async def claim_many(keys: List[str], endpoint: str, user_id: str) -> dict[str, IdempotencyClaim]:
+        """
+        `claim` for many keys: one unordered bulk_write of the same pipeline
+        upserts, each with its own token, then one read of who holds each key.
+        Returns the claims won, by key; complete or release them with
+        set_response_many / release_many, which are fenced on the tokens.
+        """
+        if not keys:
+            return {}
         coll = get_collection("idempotency")
         now = datetime.now(timezone.utc)
-        doc = {"key": key, "endpoint": endpoint, "user_id": user_id, "state": "processing", "created_at": now}
-        try:
-            await coll.insert_one(doc)
-            return doc
-        except Exception:
-            # duplicate key or other error
-            return None
+        tokens = {k: ObjectId() for k in keys}
+        ops = [UpdateOne({"key": k}, _claim_pipeline(t, endpoint, user_id, now), upsert=True) for k, t in tokens.items()]
+        for attempt in range(2):
+            try:
+                await coll.bulk_write(ops, ordered=False)
+                break
+            except BulkWriteError as e:
+                errors = e.details["writeErrors"]
+                if attempt or any(err.get("code") != 11000 for err in errors):
+                    raise
+                # lost concurrent inserts of the same keys; the retry sees their records
+                ops = [ops[err["index"]] for err in errors]
+        claims = {}
+        async for doc in coll.find({"key": {"$in": keys}}, {"key": 1, "claim": 1, "reclaimed": 1}):
+            token = tokens.get(doc["key"])
+            if token is not None and doc.get("claim") == token:
+                claims[doc["key"]] = IdempotencyClaim(state="claimed", claim=token, reclaimed=bool(doc.get("reclaimed")))
+        return claims
 
     @staticmethod
-    async def set_response(key: str, response: dict, ttl_hours: int = 24):
+    async def set_response_many(
+        responses: dict[str, dict], claims: dict[str, IdempotencyClaim], ttl_hours: int | None = None
+    ) -> None:
+        """set_response for many keys, each only while its claim from claim_many still holds it."""
+        responses = {k: r for k, r in responses.items() if k in claims}
+        if not responses:
+            return
         coll = get_collection("idempotency")
-        expire_at = datetime.now(timezone.utc) + timedelta(hours=ttl_hours)
-        await coll.update_one({"key": key}, {"$set": {"state": "done", "response": response, "expires_at": expire_at}})
-        return await coll.find_one({"key": key})
+        expire_at = datetime.now(timezone.utc) + timedelta(hours=ttl_hours or settings.IDEMPOTENCY_TTL_HOURS)
+        res = await coll.bulk_write(
+            [
+                UpdateOne(
+                    {"key": k, "claim": claims[k].claim},
+                    {"$set": {"state": "done", "response": r, "expires_at": expire_at}, "$unset": {"lease_until": ""}},
+                )
+                for k, r in responses.items()
+            ],
+            ordered=False,
+        )
+        # a claim taken over in the meantime was not written; only cache when none was
+        if res.matched_count == len(responses):
+            for k, r in responses.items():
+                _response_cache.set(k, r)
+
+    @staticmethod
+    async def release_many(claims: dict[str, IdempotencyClaim]) -> None:
+        """`release` for many claims from claim_many, so the client can retry those entries."""
+        if not claims:
+            return
+        coll = get_collection("idempotency")
+        await coll.bulk_write(
+            [DeleteOne({"key": k, "claim": c.claim, "state": "processing"}) for k, c in claims.items()],
+            ordered=False,
+        )
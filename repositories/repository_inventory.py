@@ -1,11 +1,25 @@
-from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, List, Sequence
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 from db.mongo import get_collection
 from models.inventory import InventoryItem
-from utils.models.model_data_type import ObjectId, Decimal128
+from utils.models.model_data_type import ObjectId, Fixed
+from models.order import OrderLine
+from models.inventory import ReservationLine
+from utils.util_request_context import track_repository
+from utils.util_mongodb import mongo_now
+
+# decrement_many's guard: evaluated only when stock is short, it fails the write
+# (ObjectId -> decimal is not a valid conversion) and stops the ordered batch.
+# A field path, so the server cannot fold it to an error at parse time.
+_GUARD_MISS = {"$toDecimal": "$product_id"}
+_CONVERSION_FAILURE = 241
+_ZERO = Fixed(0).to_bson()
 
 
+@track_repository
 class RepositoryInventory:
     @staticmethod
     async def get_item(store_id: ObjectId, product_id: ObjectId) -> Optional[InventoryItem]:
@@ -16,18 +30,16 @@ class RepositoryInventory:
         return InventoryItem.model_validate(doc)
 
     @staticmethod
-    async def adjust_qty(store_id: ObjectId, product_id: ObjectId, delta: Decimal128) -> InventoryItem:
+    async def adjust_qty(store_id: ObjectId, product_id: ObjectId, delta: Fixed) -> InventoryItem:
         coll = get_collection("inventory")
-        now = datetime.now(timezone.utc)
-        # convert to Decimal for comparisons
-        from decimal import Decimal
-        delta_dec = Decimal(str(delta))
+        now = mongo_now()
+        delta_bson = delta.to_bson()
         # Try to update atomic: if no doc exists and delta positive, insert; else update
-        if delta_dec >= Decimal(0):
+        if delta.units >= 0:
             res = await coll.find_one_and_update(
                 {"store_id": store_id, "product_id": product_id},
                 {
-                    "$inc": {"qty": delta, "version": 1},
+                    "$inc": {"qty": delta_bson, "version": 1},
                     "$set": {"updated_at": now}
                 },
                 upsert=True,
@@ -35,16 +47,10 @@ class RepositoryInventory:
             )
         else:
             # For decrement, ensure sufficient qty
-            neg = -delta_dec
-            try:
-                from bson.decimal128 import Decimal128 as BsonDecimal128
-                neg_bson = BsonDecimal128(str(neg))
-            except Exception:
-                neg_bson = neg
             res = await coll.find_one_and_update(
-                {"store_id": store_id, "product_id": product_id, "qty": {"$gte": neg_bson}},
+                {"store_id": store_id, "product_id": product_id, "qty": {"$gte": (-delta).to_bson()}},
                 {
-                    "$inc": {"qty": delta, "version": 1},
+                    "$inc": {"qty": delta_bson, "version": 1},
                     "$set": {"updated_at": now}
                 },
                 return_document=True
@@ -60,3 +66,134 @@ class RepositoryInventory:
         if not doc:
             return None
         return InventoryItem.model_validate(doc)
+
+    @staticmethod
+    def merge_lines(lines: Sequence[OrderLine | ReservationLine]) -> List[ReservationLine]:
+        """Sum quantities per product, keeping first-seen order."""
+        totals: dict[ObjectId, Fixed] = {}
+        for item in lines:
+            totals[item.product_id] = totals.get(item.product_id, Fixed(0)) + item.qty
+        return [ReservationLine(product_id=pid, qty=qty) for pid, qty in totals.items()]
+
+    @staticmethod
+    async def decrement_many(
+        store_id: ObjectId,
+        lines: Sequence[OrderLine | ReservationLine],
+        session=None,
+        hold: Optional[ObjectId] = None,
+    ) -> None:
+        """
+        Decrement stock for every order line in one ordered bulk_write.
+
+        Each line is a pipeline update on the (store_id, product_id) doc, never
+        an upsert. When `qty < line.qty` the pipeline evaluates a failing
+        conversion (_GUARD_MISS) instead of going negative, so the ordered batch
+        stops at that line with a write error and every earlier line is known to
+        have been applied. A line whose product has no inventory doc matches
+        nothing; a short matched_count is resolved with one lookup of which
+        products have a doc. The lines applied are put back with a compensating
+        `$inc` and ValueError is raised for the first failing product.
+
+        Inside a transaction (`session` given) nothing is compensated: the
+        caller aborts and the server discards every write.
+
+        With `hold` (a reservation id) the stock is moved from qty into
+        reserved_qty and tagged under `holds.<hold>` instead of being consumed;
+        lines must then be merged per product.
+        """
+        if not lines:
+            return
+        # a non-positive qty would pass the `qty >= line.qty` guard and add stock
+        if any(item.qty <= 0 for item in lines):
+            raise ValueError("Quantity must be greater than zero")
+        coll = get_collection("inventory")
+        ops = []
+        for item in lines:
+            qty_bson = item.qty.to_bson()
+            stage = {"qty": {"$cond": [{"$gte": ["$qty", qty_bson]}, {"$subtract": ["$qty", qty_bson]}, _GUARD_MISS]}}
+            if hold is not None:
+                stage["reserved_qty"] = {"$add": [{"$ifNull": ["$reserved_qty", _ZERO]}, qty_bson]}
+                stage[f"holds.{hold}"] = qty_bson
+            ops.append(UpdateOne({"store_id": store_id, "product_id": item.product_id}, [{"$set": stage}]))
+
+        failed_index: Optional[int] = None
+        error: Optional[BulkWriteError] = None
+        try:
+            res = await coll.bulk_write(ops, ordered=True, session=session)
+            matched = res.matched_count
+        except BulkWriteError as e:
+            error = e
+            failed_index = e.details["writeErrors"][0]["index"]
+            matched = e.details.get("nMatched", 0)
+
+        stop = failed_index if failed_index is not None else len(lines)
+        applied = list(range(stop))
+        if matched < stop:
+            # some lines before `stop` had no inventory doc to match
+            found = coll.find(
+                {"store_id": store_id, "product_id": {"$in": [lines[i].product_id for i in applied]}},
+                {"product_id": 1, "_id": 0},
+                session=session,
+            )
+            stocked = {doc["product_id"] async for doc in found}
+            applied = [i for i in applied if lines[i].product_id in stocked]
+        if failed_index is None and len(applied) == len(lines):
+            return
+
+        if session is None and applied:
+            await RepositoryInventory._compensate(store_id, [lines[i] for i in applied], hold=hold)
+        if error is not None and error.details["writeErrors"][0].get("code") != _CONVERSION_FAILURE:
+            raise error
+        applied_set = set(applied)
+        missed = next(i for i in range(len(lines)) if i not in applied_set)
+        raise ValueError(f"Insufficient stock for product {lines[missed].product_id}")
+
+    @staticmethod
+    async def _compensate(
+        store_id: ObjectId,
+        applied: Sequence[OrderLine | ReservationLine],
+        hold: Optional[ObjectId] = None,
+        session=None,
+    ) -> None:
+        """
+        Undo decrements from a failed decrement_many.
+        With `hold`, held stock tagged under that reservation goes back to qty (release).
+        """
+        if not applied:
+            return
+        coll = get_collection("inventory")
+        ops = []
+        for item in applied:
+            if hold is None:
+                ops.append(UpdateOne(
+                    {"store_id": store_id, "product_id": item.product_id},
+                    {"$inc": {"qty": item.qty.to_bson()}},
+                ))
+            else:
+                ops.append(UpdateOne(
+                    {"store_id": store_id, "product_id": item.product_id, f"holds.{hold}": {"$exists": True}},
+                    {
+                        "$inc": {"qty": item.qty.to_bson(), "reserved_qty": (-item.qty).to_bson()},
+                        "$unset": {f"holds.{hold}": ""},
+                    },
+                ))
+        await coll.bulk_write(ops, ordered=False, session=session)
+
+    @staticmethod
+    async def consume_hold(store_id: ObjectId, hold: ObjectId, lines: Sequence[ReservationLine], session=None) -> None:
+        """Turn held stock into sold stock: drop it from reserved_qty and clear the hold tag."""
+        coll = get_collection("inventory")
+        await coll.bulk_write(
+            [
+                UpdateOne(
+                    {"store_id": store_id, "product_id": item.product_id, f"holds.{hold}": {"$exists": True}},
+                    {
+                        "$inc": {"reserved_qty": (-item.qty).to_bson()},
+                        "$unset": {f"holds.{hold}": ""},
+                    },
+                )
+                for item in lines
+            ],
+            ordered=False,
+            session=session,
+        )
@@ -1,50 +1,277 @@
-from datetime import datetime, timezone
-from typing import Optional, List
+import asyncio
+import weakref
+from typing import Optional, List, Tuple
 
-from db.mongo import get_collection
-from models.order import OrderRequest, OrderInDb, OrderLine
-from utils.models.model_data_type import ObjectId, Decimal128
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 
+from core.config import settings
+from db.mongo import get_collection, run_in_transaction
+from models.inventory import ReservationLine
+from models.order import OrderRequest, OrderInDb, OrderLine, OrderBatchResult, OrderSummary
+from repositories.repository_inventory import RepositoryInventory
+from repositories.repository_reservation import RepositoryReservation
+from utils.models.model_data_type import ObjectId, Fixed
+from utils.util_group_commit import GroupCommitQueue
+from utils.util_pagination import KeysetQuery, QuerySortingOrder
+from utils.util_request_context import track_repository
+from utils.util_mongodb import mongo_now
 
+# list order: newest first, tie-broken on _id so keyset cursors are stable
+ORDER_SORT = ("created_at", QuerySortingOrder.Descending)
+
+# one group-commit queue per event loop, created on first grouped checkout
+_order_queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, GroupCommitQueue]" = weakref.WeakKeyDictionary()
+
+
+def checkout_response(order: OrderInDb) -> dict:
+    """Body of a successful POST /orders/; also what an idempotent replay returns."""
+    return {"ok": True, "order": order.model_dump(mode="json")}
+
+
+@track_repository
 class RepositoryOrder:
     @staticmethod
-    async def create_order(request: OrderRequest, idempotency_key: str | None = None) -> OrderInDb:
-        orders = get_collection("orders")
-        inventories = get_collection("inventory")
-
-        # compute subtotal
-        from decimal import Decimal
-        subtotal_dec = Decimal(0)
+    def _build_order_doc(request: OrderRequest, idempotency_key: str | None = None) -> dict:
+        # compute subtotal: each line rounded to cents (Fixed), summed as ints
+        subtotal = Fixed(0)
         for it in request.items:
-            subtotal_dec += Decimal(str(it.qty)) * Decimal(str(it.price))
+            subtotal += it.qty * it.price
 
-        total_dec = subtotal_dec  # tax calculations omitted for brevity
+        total = subtotal  # tax calculations omitted for brevity
 
         order_doc = request.model_dump()
         # store as BSON Decimal128 for DB
-        from bson.decimal128 import Decimal128 as BsonDecimal128
-        order_doc["subtotal"] = BsonDecimal128(str(subtotal_dec))
-        order_doc["total"] = BsonDecimal128(str(total_dec))
+        order_doc["subtotal"] = subtotal.to_bson()
+        order_doc["total"] = total.to_bson()
         order_doc["status"] = "created"
-        order_doc["created_at"] = datetime.now(timezone.utc)
+        order_doc["created_at"] = mongo_now()
         order_doc["idempotency_key"] = idempotency_key
+        return order_doc
+
+    @staticmethod
+    async def create_order(request: OrderRequest, idempotency_key: str | None = None, session=None) -> OrderInDb:
+        orders = get_collection("orders")
+        order_doc = RepositoryOrder._build_order_doc(request, idempotency_key)
+
+        # Decrement inventory for all lines in one round trip. Outside a transaction,
+        # lines already applied are rolled back if any guard misses. With a
+        # reservation the stock is already held; only the hold is consumed.
+        if request.reservation_id:
+            await RepositoryReservation.commit(request.store_id, request.reservation_id, request.items, session=session)
+        else:
+            await RepositoryInventory.decrement_many(request.store_id, request.items, session=session)
+        try:
+            r = await orders.insert_one(order_doc, session=session)
+        except Exception:
+            if session is None:
+                if request.reservation_id:
+                    await RepositoryReservation.undo_commit(request.store_id, request.reservation_id, request.items)
+                else:
+                    await RepositoryInventory._compensate(request.store_id, request.items)
+            raise
+        return OrderInDb.model_validate({**order_doc, "_id": r.inserted_id})
+
+    @staticmethod
+    async def create_order_in_transaction(
+        request: OrderRequest, idempotency_key: str | None = None, claim: ObjectId | None = None
+    ) -> OrderInDb:
+        """
+        Transactional checkout (settings.CHECKOUT_TRANSACTIONS): inventory decrements,
+        order insert and the idempotency record commit or abort together. With
+        `claim`, the transaction aborts (IdempotencyLeaseLost) if that claim no
+        longer holds the key.
+        """
+        from repositories.repository_idempotency import RepositoryIdempotency
+
+        async def checkout(session) -> OrderInDb:
+            order = await RepositoryOrder.create_order(request, idempotency_key, session=session)
+            if idempotency_key:
+                await RepositoryIdempotency.set_response(
+                    idempotency_key, checkout_response(order), session=session, claim=claim
+                )
+            return order
+
+        return await run_in_transaction(checkout)
+
+    @staticmethod
+    async def _commit_group(entries: List[Tuple[OrderRequest, str | None]]) -> List[OrderInDb | Exception]:
+        """
+        Place a group of unreserved orders with shared writes: one guarded decrement
+        per store (lines merged per product) and one insert_many. If a store's merged
+        decrement cannot be met, its orders are decremented one by one in order.
+        Returns, per entry, the created order or the exception for that entry.
+        """
+        orders = get_collection("orders")
+        outcomes: List[OrderInDb | Exception | None] = [None] * len(entries)
+
+        by_store: dict[ObjectId, List[int]] = {}
+        for i, (req, _) in enumerate(entries):
+            by_store.setdefault(req.store_id, []).append(i)
+        stocked: List[int] = []
+        # decrements that went through, undone if the group fails for any other reason
+        decremented: List[Tuple[ObjectId, List[OrderLine | ReservationLine]]] = []
+        failed_insert: dict[int, str] = {}
+        try:
+            for store_id, idx in by_store.items():
+                merged = RepositoryInventory.merge_lines([line for i in idx for line in entries[i][0].items])
+                try:
+                    await RepositoryInventory.decrement_many(store_id, merged)
+                    decremented.append((store_id, merged))
+                    stocked.extend(idx)
+                    continue
+                except ValueError:
+                    pass
+                for i in idx:
+                    try:
+                        await RepositoryInventory.decrement_many(store_id, entries[i][0].items)
+                        decremented.append((store_id, entries[i][0].items))
+                        stocked.append(i)
+                    except ValueError as e:
+                        outcomes[i] = e
+
+            stocked.sort()
+            docs = []
+            for i in stocked:
+                doc = RepositoryOrder._build_order_doc(*entries[i])
+                doc["_id"] = ObjectId()
+                docs.append(doc)
+            if docs:
+                try:
+                    await orders.insert_many(docs, ordered=False)
+                except BulkWriteError as e:
+                    failed_insert = {err["index"]: err.get("errmsg", "Order insert failed") for err in e.details["writeErrors"]}
+        except BaseException:
+            # network error, timeout, server error or cancellation: every caller
+            # fails, so no stock may stay taken for them
+            for store_id, lines in decremented:
+                await RepositoryInventory._compensate(store_id, lines)
+            raise
+        for pos, (i, doc) in enumerate(zip(stocked, docs)):
+            req = entries[i][0]
+            if pos in failed_insert:
+                await RepositoryInventory._compensate(req.store_id, req.items)
+                outcomes[i] = RuntimeError(failed_insert[pos])
+            else:
+                outcomes[i] = OrderInDb.model_validate(doc)
+        return outcomes
 
-        # Decrement inventory items with safety checks (no transactions currently)
-        from decimal import Decimal
-        from bson.decimal128 import Decimal128 as BsonDecimal128
-        for item in request.items:
-            qty_dec = Decimal(str(item.qty))
-            q_bson = BsonDecimal128(str(qty_dec))
-            inc_bson = BsonDecimal128(str(-qty_dec))
-            res = await inventories.update_one(
-                {"store_id": request.store_id, "product_id": item.product_id, "qty": {"$gte": q_bson}},
-                {"$inc": {"qty": inc_bson}},
+    @staticmethod
+    async def create_order_grouped(request: OrderRequest, idempotency_key: str | None = None) -> OrderInDb:
+        """
+        Group-commit checkout (settings.ORDER_GROUP_COMMIT): the order joins the
+        writes of every other order submitted within ORDER_GROUP_COMMIT_MAX_LINGER_MS.
+        """
+        loop = asyncio.get_running_loop()
+        queue = _order_queues.get(loop)
+        if queue is None:
+            queue = GroupCommitQueue(
+                "orders",
+                RepositoryOrder._commit_group,
+                max_batch=settings.ORDER_GROUP_COMMIT_MAX_BATCH,
+                max_linger_ms=settings.ORDER_GROUP_COMMIT_MAX_LINGER_MS,
+            )
+            _order_queues[loop] = queue
+        return await queue.submit((request, idempotency_key))
+
+    @staticmethod
+    async def close_group_commit() -> None:
+        """Shutdown: fail grouped checkouts still waiting on this loop's queue, before the client closes."""
+        queue = _order_queues.pop(asyncio.get_running_loop(), None)
+        if queue is not None:
+            await queue.close()
+
+    @staticmethod
+    async def create_orders_batch(requests: List[OrderRequest], user_id: str) -> List[OrderBatchResult]:
+        """
+        Ingest orders replayed by an offline terminal, in replay order.
+
+        Every entry keeps single-order semantics (idempotency key honoured, stock
+        guarded, all-or-nothing per order) but the round trips are shared: one
+        `$in` lookup for known keys, one bulk upsert claiming the rest, one
+        aggregated guarded decrement per store, one insert_many for the orders and
+        one bulk update for the idempotency responses. If a store's aggregated
+        decrement cannot be satisfied, that store falls back to per-order
+        decrements so earlier orders keep their stock and later ones fail.
+        """
+        from repositories.repository_idempotency import RepositoryIdempotency
+        results: List[Optional[OrderBatchResult]] = [None] * len(requests)
+
+        keys = [r.idempotency_key for r in requests if r.idempotency_key]
+        existing = await RepositoryOrder.get_many_by_idempotency(keys)
+        first_with_key: dict[str, int] = {}
+        repeats: dict[int, int] = {}
+        to_claim: List[str] = []
+        for i, req in enumerate(requests):
+            key = req.idempotency_key
+            if key in existing:
+                results[i] = OrderBatchResult(index=i, idempotency_key=key, status="duplicate", order=existing[key])
+            elif key and key in first_with_key:
+                repeats[i] = first_with_key[key]
+            elif key:
+                first_with_key[key] = i
+                to_claim.append(key)
+
+        claimed = await RepositoryIdempotency.claim_many(to_claim, "/orders/batch", user_id)
+        try:
+            # a key taken over from a lapsed lease may have had its order placed since the lookup
+            replayed = await RepositoryOrder.get_many_by_idempotency([k for k, c in claimed.items() if c.reclaimed])
+            pending: List[int] = []
+            for i, req in enumerate(requests):
+                if results[i] is not None or i in repeats:
+                    continue
+                if req.idempotency_key in replayed:
+                    results[i] = OrderBatchResult(index=i, idempotency_key=req.idempotency_key, status="duplicate", order=replayed[req.idempotency_key])
+                    continue
+                if req.idempotency_key and req.idempotency_key not in claimed:
+                    results[i] = OrderBatchResult(index=i, idempotency_key=req.idempotency_key, status="failed", error="Idempotency key is being processed")
+                else:
+                    pending.append(i)
+
+            # Reserved orders go through the regular path; the rest share the bulk writes
+            plain: List[int] = []
+            for i in pending:
+                req = requests[i]
+                if req.reservation_id:
+                    try:
+                        order = await RepositoryOrder.create_order(req, req.idempotency_key)
+                        results[i] = OrderBatchResult(index=i, idempotency_key=req.idempotency_key, status="created", order=order)
+                    except ValueError as e:
+                        results[i] = OrderBatchResult(index=i, idempotency_key=req.idempotency_key, status="failed", error=str(e))
+                else:
+                    plain.append(i)
+
+            outcomes = await RepositoryOrder._commit_group([(requests[i], requests[i].idempotency_key) for i in plain])
+            for i, outcome in zip(plain, outcomes):
+                key = requests[i].idempotency_key
+                if isinstance(outcome, Exception):
+                    results[i] = OrderBatchResult(index=i, idempotency_key=key, status="failed", error=str(outcome))
+                else:
+                    results[i] = OrderBatchResult(index=i, idempotency_key=key, status="created", order=outcome)
+
+            # a key repeated inside the batch replays the outcome of its first entry
+            for i, first in repeats.items():
+                r = results[first]
+                results[i] = r.model_copy(update={"index": i, "status": "duplicate" if r.status != "failed" else "failed"})
+
+            await RepositoryIdempotency.set_response_many(
+                {
+                    r.idempotency_key: checkout_response(r.order)
+                    for r in results if r.status != "failed" and r.idempotency_key in claimed
+                },
+                claimed,
             )
-            if res.matched_count == 0:
-                raise ValueError(f"Insufficient stock for product {item.product_id}")
-        r = await orders.insert_one(order_doc)
-        created = await orders.find_one({"_id": r.inserted_id})
-        return OrderInDb.model_validate(created)
+        except BaseException:
+            # stock is already restored by whatever failed (create_order, _commit_group);
+            # orders that were placed are found by key on retry, so every claim can go
+            await RepositoryIdempotency.release_many(claimed)
+            raise
+
+        await RepositoryIdempotency.release_many({
+            r.idempotency_key: claimed[r.idempotency_key] for r in results
+            if r.status == "failed" and r.idempotency_key in claimed
+        })
+        return results
 
     @staticmethod
     async def get_by_id(oid: ObjectId) -> Optional[OrderInDb]:
@@ -52,7 +279,7 @@ class RepositoryOrder:
         doc = await orders.find_one({"_id": oid})
         if not doc:
             return None
-        return OrderInDb.model_validate(doc)
+        return OrderInDb.FromDb(doc)
 
     @staticmethod
     async def get_by_idempotency(key: str) -> Optional[OrderInDb]:
@@ -60,7 +287,15 @@ class RepositoryOrder:
         doc = await orders.find_one({"idempotency_key": key})
         if not doc:
             return None
-        return OrderInDb.model_validate(doc)
+        return OrderInDb.FromDb(doc)
+
+    @staticmethod
+    async def get_many_by_idempotency(keys: List[str]) -> dict[str, OrderInDb]:
+        if not keys:
+            return {}
+        orders = get_collection("orders")
+        cursor = orders.find({"idempotency_key": {"$in": keys}})
+        return {doc["idempotency_key"]: OrderInDb.FromDb(doc) async for doc in cursor}
 
     @staticmethod
     async def list_orders(
@@ -68,8 +303,17 @@ class RepositoryOrder:
         user_id: Optional[ObjectId] = None,
         status: Optional[str] = None,
         skip: int = 0,
-        limit: int = 20
-    ) -> List[OrderInDb]:
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        raw: bool = False,
+        summary: bool = False
+    ) -> List[OrderInDb] | List[OrderSummary]:
+        """
+        The page as OrderInDb models, or OrderSummary ones with `summary` (only
+        their fields are read; a store's summary page is a covered query). With
+        `raw`, the stored documents of the same projection.
+        """
+        model = OrderSummary if summary else OrderInDb
         orders = get_collection("orders")
         
         query = {}
@@ -80,10 +324,13 @@ class RepositoryOrder:
         if status:
             query["status"] = status
         
-        cursor = orders.find(query).sort("created_at", -1).skip(skip).limit(limit)
+        query, sort = KeysetQuery(query, ORDER_SORT[0], ORDER_SORT[1], cursor, skip)
+        found = orders.find(query, projection=model.Projection(), sort=sort).skip(skip).limit(limit)
+        if raw:
+            return await found.to_list(limit)
         results = []
-        async for doc in cursor:
-            results.append(OrderInDb.model_validate(doc))
+        async for doc in found:
+            results.append(model.FromDb(doc))
         return results
 
     @staticmethod
@@ -94,13 +341,11 @@ class RepositoryOrder:
         if status not in valid_statuses:
             raise ValueError(f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
         
-        result = await orders.update_one(
+        updated = await orders.find_one_and_update(
             {"_id": oid},
-            {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}}
+            {"$set": {"status": status, "updated_at": mongo_now()}},
+            return_document=ReturnDocument.AFTER
         )
-        
-        if result.matched_count == 0:
+        if not updated:
             return None
-        
-        updated = await orders.find_one({"_id": oid})
-        return OrderInDb.model_validate(updated)
+        return OrderInDb.FromDb(updated)
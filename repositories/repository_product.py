@@ -1,13 +1,18 @@
-from datetime import datetime, timezone
 from typing import Optional
 
+from pymongo import ReturnDocument
+
 from db.mongo import get_collection
 from models.product import ProductRequest, ProductInDb
 from utils.util_sku import SKUGenerator
 from repositories.repository_category import RepositoryCategory
 from utils.models.model_data_type import ObjectId
+from utils.util_pagination import KeysetQuery, QuerySortingOrder
+from utils.util_request_context import track_repository
+from utils.util_mongodb import mongo_now
 
 
+@track_repository
 class RepositoryProduct:
     @staticmethod
     async def create_product(request: ProductRequest) -> ProductInDb:
@@ -31,12 +36,10 @@ class RepositoryProduct:
         doc["sku"] = sku
         # Convert category_id to ObjectId for MongoDB
         doc["category_id"] = ObjectId(request.category_id)
-        doc["created_at"] = datetime.now(timezone.utc)
+        doc["created_at"] = mongo_now()
         res = await products.insert_one(doc)
-        created = await products.find_one({"_id": res.inserted_id})
-        # Convert ObjectId back to string for validation
-        created["category_id"] = str(created["category_id"])
-        return ProductInDb.model_validate(created)
+        # Validate from the doc we built; category_id back to string for the model
+        return ProductInDb.model_validate({**doc, "_id": res.inserted_id, "category_id": request.category_id})
     
     @staticmethod
     async def regenerate_sku(sku: str) -> ProductInDb:
@@ -52,32 +55,36 @@ class RepositoryProduct:
         category_id = existing.get("category_id")
         new_sku = await SKUGenerator.generate_unique(category_id)
         
-        # Update product with new SKU and timestamp
-        await products.update_one(
-            {"sku": sku},
+        # Update product with new SKU and timestamp, returning the updated product
+        updated = await products.find_one_and_update(
+            {"_id": existing["_id"]},
             {
                 "$set": {
                     "sku": new_sku,
-                    "updated_at": datetime.now(timezone.utc)
+                    "updated_at": mongo_now()
                 }
-            }
+            },
+            return_document=ReturnDocument.AFTER
         )
-        
-        # Return updated product
-        updated = await products.find_one({"sku": new_sku})
+        if not updated:
+            raise ValueError("Product not found")
         # Convert ObjectId back to string for validation
         updated["category_id"] = str(updated["category_id"])
-        return ProductInDb.model_validate(updated)
+        return ProductInDb.FromDb(updated)
 
     @staticmethod
-    async def list_products(skip: int = 0, limit: int = 20):
+    async def list_products(skip: int = 0, limit: int = 20, cursor: Optional[str] = None, raw: bool = False):
+        """The page as ProductInDb models, or with `raw` as the stored documents."""
         products = get_collection("products")
-        cursor = products.find({}, projection=ProductInDb.Projection()).skip(skip).limit(limit)
+        query, sort = KeysetQuery({}, "_id", QuerySortingOrder.Ascending, cursor, skip)
+        found = products.find(query, projection=ProductInDb.Projection(), sort=sort).skip(skip).limit(limit)
+        if raw:
+            return await found.to_list(limit)
         result = []
-        async for x in cursor:
+        async for x in found:
             # Convert ObjectId back to string for validation
             x["category_id"] = str(x["category_id"])
-            result.append(ProductInDb.model_validate(x))
+            result.append(ProductInDb.FromDb(x))
         return result
 
     @staticmethod
@@ -88,4 +95,4 @@ class RepositoryProduct:
             return None
         # Convert ObjectId back to string for validation
         p["category_id"] = str(p["category_id"])
-        return ProductInDb.model_validate(p)
+        return ProductInDb.FromDb(p)
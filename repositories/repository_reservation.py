@@ -0,0 +1,128 @@
+from datetime import datetime, timezone, timedelta
+from typing import Optional, List, Sequence
+
+from pymongo import ReturnDocument
+
+from core.config import settings
+from db.mongo import get_collection
+from models.inventory import ReservationLine, ReservationInDb
+from models.order import OrderLine
+from repositories.repository_inventory import RepositoryInventory
+from utils.models.model_data_type import ObjectId
+from utils.util_request_context import track_repository
+from utils.util_mongodb import mongo_now
+
+
+@track_repository
+class RepositoryReservation:
+    """
+    Two-phase stock reservation. `reserve` moves stock from qty to reserved_qty
+    on each inventory doc (tagged under holds.<reservation id>); an order placed
+    with the reservation id consumes the hold, `release` or the expiry sweep
+    give it back.
+    """
+
+    @staticmethod
+    async def reserve(store_id: ObjectId, lines: List[ReservationLine], user_id: ObjectId | None = None) -> ReservationInDb:
+        if not lines:
+            raise ValueError("Reservation must contain at least one item")
+        coll = get_collection("reservations")
+        rid = ObjectId()
+        items = RepositoryInventory.merge_lines(lines)
+
+        # the reservation is written before any stock moves, so a hold can never
+        # exist without a reservation the expiry sweep will find and release
+        now = mongo_now()
+        doc = {
+            "_id": rid,
+            "store_id": store_id,
+            "user_id": user_id,
+            "items": [i.model_dump() for i in items],
+            "state": "held",
+            "expires_at": now + timedelta(seconds=settings.RESERVATION_TTL_SECONDS),
+            "created_at": now,
+        }
+        await coll.insert_one(doc)
+        try:
+            await RepositoryInventory.decrement_many(store_id, items, hold=rid)
+        except Exception:
+            # decrement_many has put back what it applied. (If we are cancelled
+            # instead, the doc stays and the sweep releases whatever was held.)
+            await coll.delete_one({"_id": rid})
+            raise
+        return ReservationInDb.model_validate(doc)
+
+    @staticmethod
+    async def get_by_id(rid: ObjectId) -> Optional[ReservationInDb]:
+        coll = get_collection("reservations")
+        doc = await coll.find_one({"_id": rid})
+        if not doc:
+            return None
+        return ReservationInDb.model_validate(doc)
+
+    @staticmethod
+    async def _claim(query: dict, state: str, session=None) -> Optional[ReservationInDb]:
+        """Atomically move a held reservation to `state`; None if it was not held."""
+        coll = get_collection("reservations")
+        now = mongo_now()
+        doc = await coll.find_one_and_update(
+            {**query, "state": "held"},
+            {"$set": {"state": state, "updated_at": now}},
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if not doc:
+            return None
+        return ReservationInDb.model_validate(doc)
+
+    @staticmethod
+    async def release(store_id: ObjectId, rid: ObjectId) -> ReservationInDb:
+        reservation = await RepositoryReservation._claim({"_id": rid, "store_id": store_id}, "released")
+        if not reservation:
+            raise KeyError("Reservation not found or no longer held")
+        await RepositoryInventory._compensate(store_id, reservation.items, hold=rid)
+        return reservation
+
+    @staticmethod
+    async def commit(store_id: ObjectId, rid: ObjectId, lines: Sequence[OrderLine], session=None) -> ReservationInDb:
+        """
+        Convert a held reservation into sold stock for an order. The order's lines
+        must match the reservation per product; on mismatch the hold is kept.
+        """
+        coll = get_collection("reservations")
+        reservation = await RepositoryReservation._claim(
+            {"_id": rid, "store_id": store_id, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            "committed",
+            session=session,
+        )
+        if not reservation:
+            raise ValueError("Reservation not found or expired")
+
+        held = {i.product_id: i.qty for i in reservation.items}
+        ordered = {i.product_id: i.qty for i in RepositoryInventory.merge_lines(lines)}
+        if held != ordered:
+            await coll.update_one({"_id": rid}, {"$set": {"state": "held"}}, session=session)
+            raise ValueError("Order items do not match reservation")
+
+        await RepositoryInventory.consume_hold(store_id, rid, reservation.items, session=session)
+        return reservation
+
+    @staticmethod
+    async def undo_commit(store_id: ObjectId, rid: ObjectId, lines: Sequence[OrderLine]) -> None:
+        """Order insert failed after commit: return the consumed stock and close the reservation."""
+        coll = get_collection("reservations")
+        await RepositoryInventory._compensate(store_id, RepositoryInventory.merge_lines(lines))
+        await coll.update_one({"_id": rid}, {"$set": {"state": "released", "updated_at": mongo_now()}})
+
+    @staticmethod
+    async def expire_stale() -> int:
+        """Release every held reservation past its expires_at. Returns how many were expired."""
+        expired = 0
+        while True:
+            reservation = await RepositoryReservation._claim(
+                {"expires_at": {"$lte": datetime.now(timezone.utc)}}, "expired"
+            )
+            if not reservation:
+                return expired
+            await RepositoryInventory._compensate(reservation.store_id, reservation.items, hold=reservation.id)
+            expired += 1
@@ -1,12 +1,20 @@
-from datetime import datetime, timezone
 from typing import Optional
 
 from utils.models.model_data_type import ObjectId
 from db.mongo import get_collection
 from models.model_user import UserRequest, UserInDb
-from core.security import hash_password
+from core.config import settings
+from core.security import PasswordHashBusy, hash_password_async, needs_rehash
+from utils.util_request_context import track_repository
+from utils.util_ttl_cache import TTLCache
+from utils.util_mongodb import mongo_now
 
+# Resolved users behind get_current_user, keyed by str(_id). Any method that
+# changes a stored user must call RepositoryUser.invalidate for it.
+_user_cache: TTLCache[UserInDb] = TTLCache("user", settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
 
+
+@track_repository
 class RepositoryUser:
     @staticmethod
     async def create_user(
@@ -22,12 +30,11 @@ class RepositoryUser:
 
         doc = request.model_dump()
         if doc.get("password"):
-            doc["password"] = hash_password(doc["password"])
-        doc["created_at"] = datetime.now(timezone.utc)
+            doc["password"] = await hash_password_async(doc["password"])
+        doc["created_at"] = mongo_now()
         doc["created_by"] = created_by
         res = await users.insert_one(doc)
-        created = await users.find_one({"_id": res.inserted_id})
-        return UserInDb.model_validate(created)
+        return UserInDb.model_validate({**doc, "_id": res.inserted_id})
 
     @staticmethod
     async def get_by_username(username: str) -> Optional[UserInDb]:
@@ -35,7 +42,7 @@ class RepositoryUser:
         u = await users.find_one({"username": username})
         if not u:
             return None
-        return UserInDb.model_validate(u)
+        return UserInDb.FromDb(u)
 
     @staticmethod
     async def get_by_email(email: str) -> Optional[UserInDb]:
@@ -43,7 +50,7 @@ class RepositoryUser:
         u = await users.find_one({"email": email})
         if not u:
             return None
-        return UserInDb.model_validate(u)
+        return UserInDb.FromDb(u)
 
     @staticmethod
     async def get_by_id(uid: ObjectId | str) -> Optional[UserInDb]:
@@ -57,5 +64,34 @@ class RepositoryUser:
         u = await users.find_one({"_id": uid})
         if not u:
             return None
-        return UserInDb.model_validate(u)
-        
\ No newline at end of file
+        return UserInDb.FromDb(u)
+        
+
+    @staticmethod
+    async def get_by_id_cached(uid: ObjectId | str) -> Optional[UserInDb]:
+        """get_by_id through the authenticated-user cache; concurrent misses share one find."""
+        return await _user_cache.get_or_load(str(uid), lambda: RepositoryUser.get_by_id(uid))
+
+    @staticmethod
+    def invalidate(uid: ObjectId | str) -> None:
+        _user_cache.invalidate(str(uid))
+
+    @staticmethod
+    async def rehash_password(uid: ObjectId, plain: str, old_hash: str) -> bool:
+        """
+        Re-hash a just-verified password at the current work factor. Only
+        replaces `old_hash`, so a password changed in the meantime is kept;
+        skipped while the hash pool is shedding load (the next login retries).
+        """
+        if not needs_rehash(old_hash):
+            return False
+        try:
+            new_hash = await hash_password_async(plain)
+        except PasswordHashBusy:
+            return False
+        res = await get_collection("users").update_one(
+            {"_id": uid, "password": old_hash},
+            {"$set": {"password": new_hash, "updated_at": mongo_now()}},
+        )
+        RepositoryUser.invalidate(str(uid))
+        return res.modified_count == 1
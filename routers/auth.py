@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
 from repositories.repository_user import RepositoryUser
-from core.security import verify_password, create_access_token
+from core.security import verify_password_async, create_access_token, needs_rehash, PasswordHashBusy
 from models.auth import Token
+from routers.users import access_token_claims
 from utils.models.model_data_type import BaseModel
 from utils.error_handler import handle_repo_errors
 
@@ -11,6 +12,14 @@ from utils.error_handler import handle_repo_errors
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def _hash_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent logins, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -18,6 +27,7 @@ class LoginRequest(BaseModel):
 
 @router.post("/login", response_model=Token)
 async def login(
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
     json_data: LoginRequest | None = None
 ):
@@ -37,9 +47,16 @@ async def login(
     user = await RepositoryUser.get_by_username(username)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    if not verify_password(password, user.password):
+    try:
+        valid = await verify_password_async(password, user.password)
+    except PasswordHashBusy:
+        raise _hash_busy()
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    token = create_access_token(str(user.id))
+    if needs_rehash(user.password):
+        # upgrade to the current work factor after the response is sent
+        background_tasks.add_task(RepositoryUser.rehash_password, user.id, password, user.password)
+    token = create_access_token(str(user.id), claims=access_token_claims(user))
     return {"access_token": token, "token_type": "bearer"}
 
 
@@ -54,5 +71,8 @@ class RegisterRequest(BaseModel):
 @router.post("/register", response_model=dict)
 @handle_repo_errors
 async def register(payload: RegisterRequest):
-    r = await RepositoryUser.create_user(payload, None)
+    try:
+        r = await RepositoryUser.create_user(payload, None)
+    except PasswordHashBusy:
+        raise _hash_busy()
     return {"id": str(r.id), "username": r.username}
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List
+from typing import List, Optional
 
 from repositories.repository_category import RepositoryCategory
 from models.category import CategoryRequest, CategoryInDb, CategoryCombo
-from routers.users import get_current_user
+from routers.users import get_current_principal, get_current_user_fresh
 from utils.error_handler import handle_repo_errors
+from utils.util_pagination import NextCursor, QuerySortingOrder
+from utils.util_response import FastJSONResponse, RawJSONResponse, negotiate, raw_reads
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
@@ -23,7 +25,7 @@ async def get_categories_combo(active_only: bool = Query(True, description="Show
 # CRUD endpoints
 @router.post("/", response_model=CategoryInDb)
 @handle_repo_errors
-async def create_category(payload: CategoryRequest, _=Depends(get_current_user)):
+async def create_category(payload: CategoryRequest, _=Depends(get_current_principal)):
     """
     Create a new category
     The category name must be unique
@@ -32,15 +34,28 @@ async def create_category(payload: CategoryRequest, _=Depends(get_current_user))
     return cat
 
 
-@router.get("/", response_model=List[CategoryInDb])
+@router.get("/", response_model=List[CategoryInDb], response_class=FastJSONResponse)
 @handle_repo_errors
 async def list_categories(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    active_only: bool = Query(False, description="Show only active categories")
+    active_only: bool = Query(False, description="Show only active categories"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
 ):
-    """List all categories with pagination"""
-    return await RepositoryCategory.list_categories(skip=skip, limit=limit, active_only=active_only)
+    """
+    List all categories with pagination
+    Offset mode uses skip/limit; a full page also returns X-Next-Cursor, pass it
+    back as `cursor` to continue in keyset mode (cost independent of depth)
+    """
+    raw = raw_reads()
+    categories = await RepositoryCategory.list_categories(
+        skip=skip, limit=limit, active_only=active_only, cursor=cursor, raw=raw
+    )
+    next_cursor = NextCursor(categories, limit, "_id", QuerySortingOrder.Ascending)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if raw:
+        return RawJSONResponse(CategoryInDb, categories, headers=headers)
+    return negotiate(categories, headers=headers)
 
 
 @router.get("/{category_id}", response_model=CategoryInDb)
@@ -54,7 +69,7 @@ async def get_category(category_id: str):
 
 @router.put("/{category_id}", response_model=CategoryInDb)
 @handle_repo_errors
-async def update_category(category_id: str, payload: CategoryRequest, _=Depends(get_current_user)):
+async def update_category(category_id: str, payload: CategoryRequest, _=Depends(get_current_user_fresh)):
     """Update category details"""
     cat = await RepositoryCategory.update_category(category_id, payload)
     return cat
@@ -62,7 +77,7 @@ async def update_category(category_id: str, payload: CategoryRequest, _=Depends(
 
 @router.delete("/{category_id}")
 @handle_repo_errors
-async def delete_category(category_id: str, _=Depends(get_current_user)):
+async def delete_category(category_id: str, _=Depends(get_current_user_fresh)):
     """
     Soft delete a category (sets active to false)
     Cannot delete if category is used by any products
@@ -0,0 +1,44 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from mongodb.mongo_monitoring import slow_query_listener
+from routers.users import require_role
+from utils.util_profiler import ProfilerBusy, memory_diff, sample_stacks
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/slow-queries")
+async def slow_queries(
+    top: int = Query(20, ge=1, le=200),
+    _=Depends(require_role("admin", fresh=True)),
+):
+    """
+    Mongo commands ranked by total time over the rolling window, attributed to
+    route and repository method; `explain` holds the last sampled plan, if any
+    """
+    return {"ok": True, "items": slow_query_listener.top(top)}
+
+
+@router.get("/profile")
+async def profile(
+    seconds: float = Query(5.0, gt=0, le=60),
+    hz: int = Query(100, ge=1, le=1000, description="Stack samples per second (cpu mode)"),
+    mode: Literal["cpu", "memory"] = Query("cpu"),
+    top: int = Query(50, ge=1, le=500, description="Allocation sites to return (memory mode)"),
+    _=Depends(require_role("admin", fresh=True)),
+):
+    """
+    Profile this worker for `seconds`.
+    - cpu: samples every thread's stack (event loop included) and returns
+      collapsed stacks as text/plain, one `frame;frame;... count` per line
+    - memory: tracemalloc snapshot diff over the window, largest growth first
+    """
+    try:
+        if mode == "memory":
+            return {"ok": True, **await memory_diff(seconds, top=top)}
+        return PlainTextResponse(await sample_stacks(seconds, hz))
+    except ProfilerBusy as err:
+        raise HTTPException(status_code=409, detail=str(err))
@@ -3,22 +3,45 @@ from fastapi.security import OAuth2PasswordBearer
 from typing import Any
 
 from repositories.repository_inventory import RepositoryInventory
-from routers.users import get_current_user
-from utils.models.model_data_type import BaseModel, ObjectId, Decimal128
+from repositories.repository_reservation import RepositoryReservation
+from routers.users import get_current_principal, get_current_user_fresh
+from models.inventory import ReservationRequest
+from utils.models.model_data_type import BaseModel, ObjectId, Fixed
 from utils.error_handler import handle_repo_errors
+from utils.util_msgpack import MsgpackRoute
+from utils.util_response import FastJSONResponse, negotiate
 
-router = APIRouter(prefix="/stores/{store_id}/inventory", tags=["inventory"])
+router = APIRouter(prefix="/stores/{store_id}/inventory", tags=["inventory"], route_class=MsgpackRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
 class AdjustRequest(BaseModel):
-    product_id: str
-    delta: Decimal128
+    product_id: ObjectId
+    delta: Fixed
 
 
-@router.post("/adjust")
+@router.post("/adjust", response_class=FastJSONResponse)
 @handle_repo_errors
-async def adjust_inventory(store_id: str, payload: AdjustRequest, _=Depends(get_current_user)):
-    item = await RepositoryInventory.adjust_qty(ObjectId(store_id), ObjectId(payload.product_id), payload.delta)
-    return {"ok": True, "item": item.model_dump(mode="json")}
+async def adjust_inventory(store_id: str, payload: AdjustRequest, _=Depends(get_current_user_fresh)):
+    item = await RepositoryInventory.adjust_qty(ObjectId(store_id), payload.product_id, payload.delta)
+    return negotiate({"ok": True, "item": item}, by_alias=False)
+
+
+@router.post("/reserve", response_class=FastJSONResponse)
+@handle_repo_errors
+async def reserve_inventory(store_id: str, payload: ReservationRequest, user=Depends(get_current_principal)):
+    """
+    Hold stock for a basket being built. Pass the returned reservation id as
+    `reservation_id` when placing the order; unconfirmed holds expire.
+    """
+    reservation = await RepositoryReservation.reserve(ObjectId(store_id), payload.items, user.id)
+    return negotiate({"ok": True, "reservation": reservation}, by_alias=False)
+
+
+@router.post("/reservations/{reservation_id}/release", response_class=FastJSONResponse)
+@handle_repo_errors
+async def release_reservation(store_id: str, reservation_id: str, _=Depends(get_current_principal)):
+    """Give held stock back (basket abandoned)"""
+    reservation = await RepositoryReservation.release(ObjectId(store_id), ObjectId(reservation_id))
+    return negotiate({"ok": True, "reservation": reservation}, by_alias=False)
@@ -1,53 +1,103 @@
-from fastapi import APIRouter, Depends, Header, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from fastapi.security import OAuth2PasswordBearer
-from typing import Optional, List
+from typing import List, Literal, Optional, Union
 
-from repositories.repository_order import RepositoryOrder
-from repositories.repository_idempotency import RepositoryIdempotency
-from routers.users import get_current_user
-from models.order import OrderRequest, OrderInDb
+from core.config import settings
+from repositories.repository_order import RepositoryOrder, ORDER_SORT, checkout_response
+from repositories.repository_idempotency import IdempotencyLeaseLost, RepositoryIdempotency
+from routers.users import get_current_principal, get_current_user_fresh
+from models.order import OrderRequest, OrderInDb, OrderBatchRequest, OrderSummary
 from utils.models.model_data_type import BaseModel, ObjectId
 from utils.error_handler import handle_repo_errors
+from utils.util_pagination import NextCursor
+from utils.util_msgpack import MsgpackRoute, is_msgpack
+from utils.util_request_context import current_request_header
+from utils.util_response import FastJSONResponse, RawJSONResponse, negotiate, raw_reads
 
-router = APIRouter(prefix="/orders", tags=["orders"])
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=MsgpackRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-@router.post("/")
+def _replay(stored: dict):
+    """A stored checkout response (JSON-shaped); msgpack clients get it re-typed."""
+    if is_msgpack(current_request_header("accept")):
+        return negotiate({**stored, "order": OrderInDb.model_validate(stored["order"])}, by_alias=False)
+    return negotiate(stored)
+
+
+@router.post("/", response_class=FastJSONResponse)
 @handle_repo_errors
-async def create_order(payload: OrderRequest, idempotency_key: Optional[str] = Header(None), user=Depends(get_current_user)):
-    # If idempotency key provided, try to return existing order
+async def create_order(payload: OrderRequest, idempotency_key: Optional[str] = Header(None), user=Depends(get_current_principal)):
+    claim = None
     if idempotency_key:
-        existing = await RepositoryOrder.get_by_idempotency(idempotency_key)
-        if existing:
-            return {"ok": True, "order": existing.model_dump(mode="json")}
-        # try to create processing lock
-        created = await RepositoryIdempotency.create_processing(idempotency_key, "/orders", str(user.id))
-        if not created:
-            # concurrent op, return existing if any
+        # one round trip: take the key, or replay the response stored under it
+        result = await RepositoryIdempotency.claim(idempotency_key, "/orders", str(user.id))
+        if result.state == "done":
+            if result.response is not None and "order" in result.response:
+                return _replay(result.response)
+            # recorded before full responses were stored: rebuild it from the order
             existing = await RepositoryOrder.get_by_idempotency(idempotency_key)
             if existing:
-                return {"ok": True, "order": existing.model_dump(mode="json")}
-            from fastapi import HTTPException
+                return negotiate({"ok": True, "order": existing}, by_alias=False)
+        if result.state != "claimed":
             raise HTTPException(status_code=409, detail="Idempotency key is being processed")
-    order = await RepositoryOrder.create_order(payload, idempotency_key)
-    if idempotency_key:
-        await RepositoryIdempotency.set_response(idempotency_key, {"order_id": str(order.id)})
-    return {"ok": True, "order": order.model_dump(mode="json")}
+        claim = result.claim
+        if result.reclaimed:
+            # the previous owner's lease ran out, but it may have placed the order
+            # (e.g. cancelled, or set_response failed) before it stopped
+            existing = await RepositoryOrder.get_by_idempotency(idempotency_key)
+            if existing:
+                response = checkout_response(existing)
+                await RepositoryIdempotency.set_response(idempotency_key, response, claim=claim)
+                return _replay(response)
+    try:
+        if settings.CHECKOUT_TRANSACTIONS:
+            order = await RepositoryOrder.create_order_in_transaction(payload, idempotency_key, claim)
+        elif settings.ORDER_GROUP_COMMIT and not payload.reservation_id:
+            order = await RepositoryOrder.create_order_grouped(payload, idempotency_key)
+        else:
+            order = await RepositoryOrder.create_order(payload, idempotency_key)
+    except IdempotencyLeaseLost:
+        # the transaction rolled back; whoever took the key over completes it
+        raise HTTPException(status_code=409, detail="Idempotency key is being processed")
+    except Exception:
+        if claim is not None:
+            await RepositoryIdempotency.release(idempotency_key, claim)
+        raise
+    if idempotency_key and not settings.CHECKOUT_TRANSACTIONS:
+        response = checkout_response(order)
+        try:
+            await RepositoryIdempotency.set_response(idempotency_key, response, claim=claim)
+        except IdempotencyLeaseLost:
+            # our order stands; the new owner's response is left as it is
+            pass
+        return _replay(response)
+    return negotiate({"ok": True, "order": order}, by_alias=False)
+
+
+@router.post("/batch", response_class=FastJSONResponse)
+@handle_repo_errors
+async def create_orders_batch(payload: OrderBatchRequest, user=Depends(get_current_principal)):
+    """
+    Replay orders captured by an offline terminal. Each entry carries its own
+    `idempotency_key` and gets its own result (created, duplicate or failed).
+    """
+    results = await RepositoryOrder.create_orders_batch(payload.orders, str(user.id))
+    return negotiate({"ok": True, "results": results}, by_alias=False)
 
 
-@router.get("/{order_id}", response_model=OrderInDb)
+@router.get("/{order_id}", response_model=OrderInDb, response_class=FastJSONResponse)
 @handle_repo_errors
-async def get_order(order_id: str, _=Depends(get_current_user)):
+async def get_order(order_id: str, _=Depends(get_current_principal)):
     order = await RepositoryOrder.get_by_id(ObjectId(order_id))
     if not order:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    return negotiate(order)
 
 
-@router.get("/", response_model=List[OrderInDb])
+@router.get("/", response_model=Union[List[OrderInDb], List[OrderSummary]], response_class=FastJSONResponse)
 @handle_repo_errors
 async def list_orders(
     store_id: Optional[str] = Query(None),
@@ -55,30 +105,41 @@ async def list_orders(
     status: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    _=Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    fields: Literal["full", "summary"] = Query("full", description="summary: id, store_id, status, total and created_at only"),
+    _=Depends(get_current_principal)
 ):
     store_oid = ObjectId(store_id) if store_id else None
     user_oid = ObjectId(user_id) if user_id else None
+    raw = raw_reads()
+    summary = fields == "summary"
     
     orders = await RepositoryOrder.list_orders(
         store_id=store_oid,
         user_id=user_oid,
         status=status,
         skip=skip,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        raw=raw,
+        summary=summary
     )
-    return orders
+    next_cursor = NextCursor(orders, limit, *ORDER_SORT)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if raw:
+        return RawJSONResponse(OrderSummary if summary else OrderInDb, orders, headers=headers)
+    return negotiate(orders, headers=headers)
 
 
 class UpdateStatusRequest(BaseModel):
     status: str
 
 
-@router.patch("/{order_id}/status")
+@router.patch("/{order_id}/status", response_class=FastJSONResponse)
 @handle_repo_errors
-async def update_order_status(order_id: str, payload: UpdateStatusRequest, _=Depends(get_current_user)):
+async def update_order_status(order_id: str, payload: UpdateStatusRequest, _=Depends(get_current_user_fresh)):
     order = await RepositoryOrder.update_status(ObjectId(order_id), payload.status)
     if not order:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Order not found")
-    return {"ok": True, "order": order.model_dump(mode="json")}
+    return negotiate({"ok": True, "order": order}, by_alias=False)
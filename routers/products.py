@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List
+from typing import List, Optional
 
 from repositories.repository_product import RepositoryProduct
 from models.product import ProductRequest, ProductInDb
-from routers.users import get_current_user
+from routers.users import get_current_principal, get_current_user_fresh
 from utils.error_handler import handle_repo_errors
+from utils.util_pagination import NextCursor, QuerySortingOrder
+from utils.util_response import FastJSONResponse, RawJSONResponse, negotiate, raw_reads
 
 router = APIRouter(prefix="/products", tags=["products"])
 
@@ -12,21 +14,31 @@ router = APIRouter(prefix="/products", tags=["products"])
 # Product CRUD endpoints
 @router.post("/", response_model=ProductInDb)
 @handle_repo_errors
-async def create_product(payload: ProductRequest, _=Depends(get_current_user)):
+async def create_product(payload: ProductRequest, _=Depends(get_current_principal)):
     # For now any authenticated user can create; will gate by role later
     p = await RepositoryProduct.create_product(payload)
     return p
 
 
-@router.get("/", response_model=List[ProductInDb])
+@router.get("/", response_model=List[ProductInDb], response_class=FastJSONResponse)
 @handle_repo_errors
-async def list_products(skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100)):
-    return await RepositoryProduct.list_products(skip=skip, limit=limit)
+async def list_products(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+):
+    raw = raw_reads()
+    products = await RepositoryProduct.list_products(skip=skip, limit=limit, cursor=cursor, raw=raw)
+    next_cursor = NextCursor(products, limit, "_id", QuerySortingOrder.Ascending)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if raw:
+        return RawJSONResponse(ProductInDb, products, headers=headers)
+    return negotiate(products, headers=headers)
 
 
 @router.post("/{sku}/regenerate-sku", response_model=ProductInDb)
 @handle_repo_errors
-async def regenerate_sku(sku: str, _=Depends(get_current_user)):
+async def regenerate_sku(sku: str, _=Depends(get_current_user_fresh)):
     """
     Regenerate SKU for a product
     This will generate a new SKU while keeping all other product data unchanged
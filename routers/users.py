@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import ValidationError
 from typing import Optional
 
 from repositories.repository_user import RepositoryUser
-from models.auth import TokenPayload
+from models.auth import Principal
+from core.config import settings
 from core.security import decode_access_token
 from models.model_user import UserInDb
 from utils.error_handler import handle_repo_errors
@@ -13,20 +15,80 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDb:
+def _decode(token: str) -> dict:
     try:
         payload = decode_access_token(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
-    sub = payload.get("sub")
-    if not sub:
+    if not payload.get("sub"):
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = await RepositoryUser.get_by_id(sub)
+    return payload
+
+
+async def _load_user(sub: str, fresh: bool = False) -> UserInDb:
+    user = await (RepositoryUser.get_by_id(sub) if fresh else RepositoryUser.get_by_id_cached(sub))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
 
+def _principal_from_claims(payload: dict) -> Optional[Principal]:
+    """The token's own claims, if it is self-contained and of the current claims version."""
+    if payload.get("cv") != settings.JWT_CLAIMS_VERSION:
+        return None
+    try:
+        return Principal(id=payload["sub"], username=payload["username"], name=payload.get("name"), role=payload["role"])
+    except (KeyError, ValidationError):
+        return None
+
+
+def access_token_claims(user: UserInDb) -> Optional[dict]:
+    """Extra claims signed into access tokens when JWT_SELF_CONTAINED is on."""
+    if not settings.JWT_SELF_CONTAINED:
+        return None
+    return {"cv": settings.JWT_CLAIMS_VERSION, "username": user.username, "name": user.name, "role": user.role}
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDb:
+    return await _load_user(_decode(token)["sub"])
+
+
+async def get_current_user_fresh(token: str = Depends(oauth2_scheme)) -> UserInDb:
+    """Current user read from the database, bypassing the user cache and token claims."""
+    return await _load_user(_decode(token)["sub"], fresh=True)
+
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Current caller without a database read when the token is self-contained;
+    older or plain tokens fall back to the (cached) user lookup. Claims are
+    only as fresh as the token, so routes that must see role changes or
+    deleted users at once use get_current_user_fresh instead: reads of user
+    records and writes to existing records (order status, stock adjustments,
+    category edits, SKU regeneration). Creates and checkout trust the claims.
+    """
+    payload = _decode(token)
+    principal = _principal_from_claims(payload)
+    if principal is not None:
+        return principal
+    user = await _load_user(payload["sub"])
+    return Principal(id=user.id, username=user.username, name=user.name, role=user.role)
+
+
+def require_role(*roles: str, fresh: bool = False):
+    """
+    Dependency factory: the current principal, or 403 unless its role is one
+    of `roles`. `fresh=True` checks the role against the database on every call.
+    """
+    source = get_current_user_fresh if fresh else get_current_principal
+
+    async def dependency(user=Depends(source)):
+        if user.role not in roles:
+            raise HTTPException(status_code=403, detail="Insufficient role")
+        return user
+    return dependency
+
+
 @router.get("/me", response_model=UserInDb)
 async def me(user: UserInDb = Depends(get_current_user)):
     return user
@@ -34,6 +96,6 @@ async def me(user: UserInDb = Depends(get_current_user)):
 
 @router.get("/{user_id}", response_model=Optional[UserInDb])
 @handle_repo_errors
-async def get_user(user_id: str):
+async def get_user(user_id: str, _=Depends(get_current_user_fresh)):
     u = await RepositoryUser.get_by_id(user_id)
     return u
@@ -0,0 +1,203 @@
+"""
+Query-plan audit: seed a scratch database, apply the index registry, then
+`explain` every shape in mongodb/mongo_query_shape.py and report the winning
+plan, keys/docs examined vs returned, and per-index usage from $indexStats.
+
+Exits 1 when any shape uses a COLLSCAN, examines more than --max-ratio
+documents per document returned, or fetches documents although it is
+declared covered.
+
+Usage: MONGO_URI=mongodb://localhost:27017 python scripts/audit_query_plans.py [--max-ratio 10] [--keep]
+Runs against the `pos_audit` database, which is dropped at the end (unless --keep).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+os.environ.setdefault("MONGO_DB", "pos_audit")
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from bson.decimal128 import Decimal128 as BsonDecimal128
+
+from db.mongo import get_collection, get_database
+from helpers.helper_install import InstallHelper
+from mongodb.mongo_query_shape import ListMongoQueryShape, MongoQueryShape
+from utils.models.model_data_type import ObjectId
+
+STORES = 5
+USERS = 200
+CATEGORIES = 50
+PRODUCTS = 2_000
+ORDERS = 20_000
+RESERVATIONS = 1_000
+
+
+async def seed() -> dict[str, Any]:
+    rnd = random.Random(7)
+    now = datetime.now(timezone.utc)
+    stores = [ObjectId() for _ in range(STORES)]
+
+    users = [{"_id": ObjectId(), "username": f"user{i}", "email": f"user{i}@example.com", "role": "cashier"} for i in range(USERS)]
+    await get_collection("users").insert_many(users)
+
+    categories = [
+        {"_id": ObjectId(), "name": f"cat{i}", "display_name": f"Category {i}", "sku_prefix": f"C{i:02d}", "active": i % 5 != 0}
+        for i in range(CATEGORIES)
+    ]
+    await get_collection("categories").insert_many(categories)
+
+    products = [
+        {"_id": ObjectId(), "sku": f"SKU{i:06d}", "name": f"Product {i}", "category_id": rnd.choice(categories)["_id"]}
+        for i in range(PRODUCTS)
+    ]
+    await get_collection("products").insert_many(products)
+
+    inventory = [
+        {"_id": ObjectId(), "store_id": s, "product_id": p["_id"], "qty": BsonDecimal128("100"), "reserved_qty": BsonDecimal128("0"), "version": 1}
+        for s in stores for p in products
+    ]
+    await get_collection("inventory").insert_many(inventory)
+
+    statuses = ["created", "confirmed", "preparing", "ready", "completed"]
+    orders = [
+        {
+            "_id": ObjectId(),
+            "store_id": rnd.choice(stores),
+            "user_id": rnd.choice(users)["_id"],
+            "status": rnd.choice(statuses),
+            "idempotency_key": f"key-{i}" if i % 2 else None,
+            "created_at": now - timedelta(seconds=ORDERS - i),
+            "items": [{"product_id": rnd.choice(products)["_id"], "qty": BsonDecimal128("1"), "price": BsonDecimal128("2.00")}],
+        }
+        for i in range(ORDERS)
+    ]
+    await get_collection("orders").insert_many(orders)
+    await get_collection("idempotency").insert_many([
+        {"key": o["idempotency_key"], "state": "done", "created_at": now, "expires_at": now + timedelta(hours=24)}
+        for o in orders if o["idempotency_key"]
+    ])
+
+    reservations = [
+        {
+            "_id": ObjectId(),
+            "store_id": rnd.choice(stores),
+            "state": "held" if i % 10 == 0 else "committed",
+            "expires_at": now + timedelta(seconds=rnd.randint(-600, 600)),
+            "created_at": now,
+        }
+        for i in range(RESERVATIONS)
+    ]
+    await get_collection("reservations").insert_many(reservations)
+
+    order = orders[len(orders) // 2]
+    return {
+        "store_id": order["store_id"],
+        "user_id": order["user_id"],
+        "username": users[0]["username"],
+        "email": users[0]["email"],
+        "category_id": categories[1]["_id"],
+        "category_name": categories[1]["name"],
+        "sku": products[0]["sku"],
+        "product_id": products[0]["_id"],
+        "qty": BsonDecimal128("1"),
+        "product_ids": [i["product_id"] for i in inventory[:5]],
+        "order_id": order["_id"],
+        "order_created_at": order["created_at"],
+        "idempotency_key": "key-1",
+        "idempotency_keys": [f"key-{i}" for i in range(1, 40, 2)],
+        "reservation_id": reservations[0]["_id"],
+    }
+
+
+def _find(obj: Any, key: str) -> Any:
+    """First value under `key` anywhere in an explain document."""
+    if isinstance(obj, dict):
+        if key in obj:
+            return obj[key]
+        obj = list(obj.values())
+    if isinstance(obj, list):
+        for v in obj:
+            found = _find(v, key)
+            if found is not None:
+                return found
+    return None
+
+
+def _stages(plan: Any) -> list[str]:
+    """Stage names of a winning plan, root first, with the index for scans."""
+    out: list[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            out.append(f"{plan['stage']}({plan['indexName']})" if "indexName" in plan else plan["stage"])
+        for v in plan.values():
+            out.extend(_stages(v))
+    elif isinstance(plan, list):
+        for v in plan:
+            out.extend(_stages(v))
+    return out
+
+
+async def audit_shape(name: str, shape: MongoQueryShape, sample: dict[str, Any], max_ratio: float) -> bool:
+    db = get_database()
+    explained = db.command({"explain": shape.explain_command(sample), "verbosity": "executionStats"})
+    stages = _stages(_find(explained, "winningPlan"))
+    stats = _find(explained, "executionStats") or {}
+    docs = stats.get("totalDocsExamined", 0)
+    keys = stats.get("totalKeysExamined", 0)
+    if shape.op == "count":
+        returned = await get_collection(shape.collName.value).count_documents(shape.query(sample))
+    else:
+        returned = stats.get("nReturned", 0)
+    ratio = docs / max(returned, 1)
+
+    problems = []
+    if any(s.startswith("COLLSCAN") for s in stages):
+        problems.append("COLLSCAN")
+    if ratio > max_ratio:
+        problems.append(f"ratio>{max_ratio:g}")
+    if shape.covered and docs:
+        problems.append("not covered")
+    print(
+        f"{'FAIL' if problems else 'ok':<5} {shape.method + ' [' + name + ']':<70} "
+        f"{keys:>7} {docs:>7} {returned:>7} {ratio:>7.1f}  {' > '.join(stages)}"
+        + (f"  <- {', '.join(problems)}" if problems else "")
+    )
+    return not problems
+
+
+def index_usage() -> None:
+    print("\n$indexStats (ops since the audit built them)")
+    for coll_name in sorted(get_database().list_collection_names()):
+        for stat in get_database().get_collection(coll_name).aggregate([{"$indexStats": {}}]):
+            ops = stat["accesses"]["ops"]
+            print(f"  {coll_name + '.' + stat['name']:<50} {ops:>6}{'  (unused)' if ops == 0 and stat['name'] != '_id_' else ''}")
+
+
+async def run(max_ratio: float, keep: bool) -> int:
+    sample = await seed()
+    log = await InstallHelper.start_install()
+    if InstallHelper.has_drift(log):
+        print(f"index registry not applied cleanly: {log}")
+
+    print(f"{'':<5} {'shape':<70} {'keys':>7} {'docs':>7} {'ret':>7} {'ratio':>7}  plan")
+    ok = True
+    for group in ListMongoQueryShape:
+        for member in group:
+            ok = await audit_shape(member.name, member.value, sample, max_ratio) and ok
+    index_usage()
+
+    if not keep:
+        get_database().client.drop_database(os.environ["MONGO_DB"])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-ratio", type=float, default=10.0, help="max docs examined per doc returned")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.max_ratio, args.keep)))
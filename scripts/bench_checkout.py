@@ -0,0 +1,75 @@
+"""
+Checkout latency vs basket size: per-line update_one loop (old create_order)
+against the single ordered bulk_write in RepositoryInventory.decrement_many.
+
+Usage: MONGO_URI=mongodb://localhost:27017 python scripts/bench_checkout.py
+Runs against the `pos_bench` database, which is dropped at the end.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+os.environ.setdefault("MONGO_DB", "pos_bench")
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from bson.decimal128 import Decimal128 as BsonDecimal128
+
+from db.mongo import get_collection, get_database
+from models.order import OrderLine
+from repositories.repository_inventory import RepositoryInventory
+from utils.models.model_data_type import ObjectId
+
+BASKET_SIZES = [1, 5, 10, 30, 100]
+ROUNDS = 30
+
+
+async def legacy_decrement(store_id: ObjectId, lines: list[OrderLine]) -> None:
+    inventories = get_collection("inventory")
+    for item in lines:
+        qty_dec = Decimal(str(item.qty))
+        res = await inventories.update_one(
+            {"store_id": store_id, "product_id": item.product_id, "qty": {"$gte": BsonDecimal128(str(qty_dec))}},
+            {"$inc": {"qty": BsonDecimal128(str(-qty_dec))}},
+        )
+        if res.matched_count == 0:
+            raise ValueError(f"Insufficient stock for product {item.product_id}")
+
+
+async def seed(store_id: ObjectId, size: int) -> list[OrderLine]:
+    products = [ObjectId() for _ in range(size)]
+    await get_collection("inventory").insert_many([
+        {"store_id": store_id, "product_id": p, "qty": BsonDecimal128("1000000"), "version": 1}
+        for p in products
+    ])
+    return [OrderLine(product_id=p, qty="1", price="1.00") for p in products]
+
+
+async def measure(fn, store_id: ObjectId, lines: list[OrderLine]) -> list[float]:
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        await fn(store_id, lines)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def run():
+    await get_collection("inventory").create_index([("store_id", 1), ("product_id", 1)], unique=True)
+    print(f"{'lines':>6} {'legacy p50 ms':>14} {'bulk p50 ms':>12} {'legacy p95 ms':>14} {'bulk p95 ms':>12}")
+    for size in BASKET_SIZES:
+        store_id = ObjectId()
+        lines = await seed(store_id, size)
+        legacy = await measure(legacy_decrement, store_id, lines)
+        bulk = await measure(RepositoryInventory.decrement_many, store_id, lines)
+        print(
+            f"{size:>6} {statistics.median(legacy):>14.2f} {statistics.median(bulk):>12.2f} "
+            f"{statistics.quantiles(legacy, n=20)[18]:>14.2f} {statistics.quantiles(bulk, n=20)[18]:>12.2f}"
+        )
+    get_database().client.drop_database(os.environ["MONGO_DB"])
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+"""
+Checkout throughput and abort rate under contention on a few hot SKUs:
+plain create_order (bulk decrement + compensation) against
+create_order_in_transaction (CHECKOUT_TRANSACTIONS=true).
+
+Transactions need a replica set. A local single-node one is enough:
+
+    docker run -d --name pos-rs -p 27018:27017 mongo:6.0 --replSet rs0
+    docker exec pos-rs mongosh --eval "rs.initiate()"
+    MONGO_URI="mongodb://localhost:27018/?directConnection=true" python scripts/bench_checkout_contention.py
+
+Runs against the `pos_bench` database, which is dropped at the end.
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("MONGO_DB", "pos_bench")
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from bson.decimal128 import Decimal128 as BsonDecimal128
+
+from db import mongo
+from db.mongo import get_collection, get_database
+from models.order import OrderLine, OrderRequest
+from repositories.repository_order import RepositoryOrder
+from utils.models.model_data_type import ObjectId
+
+HOT_SKUS = 5
+LINES_PER_ORDER = 3
+WORKERS = 32
+DURATION_S = 10.0
+
+
+async def seed(store_id: ObjectId) -> list[ObjectId]:
+    products = [ObjectId() for _ in range(HOT_SKUS)]
+    await get_collection("inventory").insert_many([
+        {"store_id": store_id, "product_id": p, "qty": BsonDecimal128("100000000"), "version": 1}
+        for p in products
+    ])
+    return products
+
+
+async def worker(create, store_id: ObjectId, products: list[ObjectId], deadline: float, counts: dict) -> None:
+    while time.perf_counter() < deadline:
+        request = OrderRequest(
+            store_id=store_id,
+            user_id=ObjectId(),
+            items=[
+                OrderLine(product_id=p, qty="1", price="1.00")
+                for p in random.sample(products, LINES_PER_ORDER)
+            ],
+        )
+        try:
+            await create(request)
+            counts["ok"] += 1
+        except ValueError:
+            counts["rejected"] += 1
+        except Exception:
+            counts["errors"] += 1
+
+
+async def run_mode(name: str, create) -> None:
+    store_id = ObjectId()
+    products = await seed(store_id)
+    counts = {"ok": 0, "rejected": 0, "errors": 0}
+    before = dict(mongo.TXN_STATS)
+    deadline = time.perf_counter() + DURATION_S
+    await asyncio.gather(*[worker(create, store_id, products, deadline, counts) for _ in range(WORKERS)])
+    aborts = mongo.TXN_STATS["aborts"] - before["aborts"]
+    retries = mongo.TXN_STATS["retries"] - before["retries"]
+    attempts = counts["ok"] + counts["rejected"] + counts["errors"]
+    print(
+        f"{name:<14} {counts['ok'] / DURATION_S:>10.1f} {counts['errors']:>8} "
+        f"{retries:>8} {aborts:>8} {(aborts / attempts * 100 if attempts else 0):>8.2f}%"
+    )
+
+
+async def run():
+    await get_collection("inventory").create_index([("store_id", 1), ("product_id", 1)], unique=True)
+    print(f"{WORKERS} workers, {HOT_SKUS} hot SKUs, {LINES_PER_ORDER} lines/order, {DURATION_S:.0f}s per mode")
+    print(f"{'mode':<14} {'orders/s':>10} {'errors':>8} {'retries':>8} {'aborts':>8} {'abort %':>9}")
+    await run_mode("bulk", RepositoryOrder.create_order)
+    await run_mode("transaction", RepositoryOrder.create_order_in_transaction)
+    get_database().client.drop_database(os.environ["MONGO_DB"])
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
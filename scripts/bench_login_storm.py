@@ -0,0 +1,86 @@
+"""
+p50/p99 latency of GET /orders/ on one worker while 50 logins run concurrently:
+bcrypt inline on the event loop (PASSWORD_HASH_WORKERS=0, the old behaviour)
+against the bounded hash pool.
+
+Requests go through the ASGI app in-process, so checkout traffic and logins
+share one event loop exactly as they do inside a uvicorn worker.
+
+Usage: MONGO_URI=mongodb://localhost:27017 python scripts/bench_login_storm.py
+Runs against the `pos_bench` database, which is dropped at the end.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("MONGO_DB", "pos_bench")
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from httpx import ASGITransport, AsyncClient
+
+import main as app_main
+from core.config import settings
+from db.mongo import get_database
+
+CONCURRENT_LOGINS = 50
+STORM_ROUNDS = 3
+READERS = 4
+
+
+async def reader(client: AsyncClient, headers: dict, stop: asyncio.Event, samples: list[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        r = await client.get("/orders/", headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert r.status_code == 200
+
+
+async def storm(client: AsyncClient) -> dict:
+    codes: dict = {}
+    for _ in range(STORM_ROUNDS):
+        responses = await asyncio.gather(*[
+            client.post("/auth/login", data={"username": f"storm{i}", "password": "secret"})
+            for i in range(CONCURRENT_LOGINS)
+        ])
+        for r in responses:
+            codes[r.status_code] = codes.get(r.status_code, 0) + 1
+    return codes
+
+
+async def run_mode(client: AsyncClient, headers: dict, name: str, workers: int) -> None:
+    settings.PASSWORD_HASH_WORKERS = workers
+    samples: list[float] = []
+    stop = asyncio.Event()
+    readers = [asyncio.create_task(reader(client, headers, stop, samples)) for _ in range(READERS)]
+    start = time.perf_counter()
+    codes = await storm(client)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*readers)
+    print(
+        f"{name:<10} {statistics.median(samples):>10.2f} {statistics.quantiles(samples, n=100)[98]:>10.2f} "
+        f"{max(samples):>10.2f} {len(samples):>8} {elapsed:>8.2f}s  logins {codes}"
+    )
+
+
+async def run():
+    transport = ASGITransport(app=app_main.app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(CONCURRENT_LOGINS):
+            await client.post("/auth/register", json={
+                "name": f"Storm {i}", "email": f"storm{i}@example.com", "username": f"storm{i}", "password": "secret",
+            })
+        r = await client.post("/auth/login", data={"username": "storm0", "password": "secret"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        print(f"{CONCURRENT_LOGINS} concurrent logins x {STORM_ROUNDS}, {READERS} readers on GET /orders/")
+        print(f"{'mode':<10} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10} {'reads':>8} {'storm':>9}")
+        await run_mode(client, headers, "inline", 0)
+        await run_mode(client, headers, "pool", 2)
+    get_database().client.drop_database(os.environ["MONGO_DB"])
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+"""
+Basket totalling microbenchmark: Decimal/Decimal128 string round trips (old
+create_order) against Fixed scaled-int arithmetic. No database needed.
+
+Usage: python scripts/bench_money.py
+"""
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from bson.decimal128 import Decimal128 as BsonDecimal128
+
+from utils.models.model_data_type import Decimal128, Fixed
+
+BASKET_SIZES = [1_000, 5_000, 10_000]
+REPEAT = 20
+
+
+def legacy_total(lines: list[tuple[Decimal128, Decimal128]]) -> BsonDecimal128:
+    subtotal_dec = Decimal(0)
+    for qty, price in lines:
+        subtotal_dec += Decimal(str(qty)) * Decimal(str(price))
+    return BsonDecimal128(str(subtotal_dec))
+
+
+def fixed_total(lines: list[tuple[Fixed, Fixed]]) -> BsonDecimal128:
+    subtotal = Fixed(0)
+    for qty, price in lines:
+        subtotal += qty * price
+    return subtotal.to_bson()
+
+
+def run():
+    rnd = random.Random(42)
+    print(f"{'lines':>7} {'decimal ms':>11} {'fixed ms':>9} {'speedup':>8}")
+    for size in BASKET_SIZES:
+        raw = [(f"{rnd.randint(1, 20)}.{rnd.randint(0, 99):02d}", f"{rnd.randint(0, 500)}.{rnd.randint(0, 99):02d}") for _ in range(size)]
+        legacy_lines = [(Decimal128(q), Decimal128(p)) for q, p in raw]
+        fixed_lines = [(Fixed(q), Fixed(p)) for q, p in raw]
+        legacy = min(timeit.repeat(lambda: legacy_total(legacy_lines), number=1, repeat=REPEAT)) * 1000
+        fixed = min(timeit.repeat(lambda: fixed_total(fixed_lines), number=1, repeat=REPEAT)) * 1000
+        print(f"{size:>7} {legacy:>11.3f} {fixed:>9.3f} {legacy / fixed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
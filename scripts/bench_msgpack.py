@@ -0,0 +1,77 @@
+"""
+JSON vs MessagePack for terminal payloads: body size (raw and gzipped),
+server encode time and client parse time for an order list (100 orders x 20
+lines) and a catalog page (1000 products). No database needed.
+
+Usage: python scripts/bench_msgpack.py
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import msgpack
+from bson.decimal128 import Decimal128 as BsonDecimal128
+
+from models.order import OrderInDb
+from models.product import ProductInDb
+from utils.models.model_data_type import ObjectId
+from utils.util_msgpack import packb
+from utils.util_response import FastJSONResponse
+
+REPEAT = 10
+
+
+def orders(rnd: random.Random) -> list[OrderInDb]:
+    now = datetime.now(timezone.utc)
+    return [
+        OrderInDb.model_validate({
+            "_id": ObjectId(), "store_id": ObjectId(), "user_id": ObjectId(),
+            "items": [
+                {"product_id": ObjectId(), "qty": BsonDecimal128(str(rnd.randint(1, 5))), "price": BsonDecimal128(f"{rnd.randint(1, 99)}.{rnd.randint(0, 99):02d}")}
+                for _ in range(20)
+            ],
+            "subtotal": BsonDecimal128("100.00"), "total": BsonDecimal128("100.00"), "created_at": now,
+        })
+        for _ in range(100)
+    ]
+
+
+def catalog(rnd: random.Random) -> list[ProductInDb]:
+    now = datetime.now(timezone.utc)
+    return [
+        ProductInDb.model_validate({
+            "_id": ObjectId(), "sku": f"SKU{i:06d}", "name": f"Product {i}", "unit": "pcs",
+            "price": BsonDecimal128(f"{rnd.randint(1, 500)}.{rnd.randint(0, 99):02d}"),
+            "cost": BsonDecimal128(f"{rnd.randint(1, 400)}.{rnd.randint(0, 99):02d}"),
+            "category_id": str(ObjectId()), "created_at": now,
+        })
+        for i in range(1000)
+    ]
+
+
+def ms(fn) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT)) * 1000
+
+
+def run():
+    rnd = random.Random(42)
+    print(f"{'payload':<10} {'format':<8} {'bytes':>8} {'gzip':>8} {'encode ms':>10} {'parse ms':>9}")
+    for name, content in (("orders", orders(rnd)), ("catalog", catalog(rnd))):
+        as_json = FastJSONResponse(content).body
+        as_msgpack = packb(content)
+        rows = (
+            ("json", as_json, lambda: FastJSONResponse(content).body, lambda: json.loads(as_json)),
+            ("msgpack", as_msgpack, lambda: packb(content), lambda: msgpack.unpackb(as_msgpack, timestamp=3)),
+        )
+        for fmt, body, encode, parse in rows:
+            print(f"{name:<10} {fmt:<8} {len(body):>8} {len(gzip.compress(body)):>8} {ms(encode):>10.2f} {ms(parse):>9.2f}")
+
+
+if __name__ == "__main__":
+    run()
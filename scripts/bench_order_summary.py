@@ -0,0 +1,104 @@
+"""
+GET /orders/ for one store, fields=full vs fields=summary: repository latency
+(p50/p95), BSON bytes read from the server and JSON body bytes per page, and
+whether the page was answered from the index alone (docs examined = 0).
+
+Usage: MONGO_URI=mongodb://localhost:27017 python scripts/bench_order_summary.py
+Runs against the `pos_bench` database, which is dropped at the end.
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("MONGO_DB", "pos_bench")
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import bson
+from bson.decimal128 import Decimal128 as BsonDecimal128
+
+from db.mongo import get_collection, get_database
+from helpers.helper_install import InstallHelper
+from models.order import OrderInDb, OrderSummary
+from repositories.repository_order import RepositoryOrder
+from utils.models.model_data_type import ObjectId
+from utils.util_response import FastJSONResponse
+
+ORDERS = 20_000
+STORES = 10
+LINES = 20
+PAGE_SIZE = 20
+ROUNDS = 50
+
+
+async def seed() -> ObjectId:
+    rnd = random.Random(5)
+    orders = get_collection("orders")
+    stores = [ObjectId() for _ in range(STORES)]
+    products = [ObjectId() for _ in range(200)]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    batch = []
+    for i in range(ORDERS):
+        items = [
+            {"product_id": rnd.choice(products), "qty": BsonDecimal128(str(rnd.randint(1, 3))), "price": BsonDecimal128(f"{rnd.randint(1, 50)}.{rnd.randint(0, 99):02d}")}
+            for _ in range(LINES)
+        ]
+        batch.append({
+            "store_id": stores[i % STORES],
+            "user_id": ObjectId(),
+            "items": items,
+            "subtotal": BsonDecimal128("100.00"),
+            "total": BsonDecimal128("100.00"),
+            "status": rnd.choice(["created", "confirmed", "completed"]),
+            "created_at": start + timedelta(seconds=i),
+        })
+        if len(batch) == 5_000:
+            await orders.insert_many(batch)
+            batch = []
+    if batch:
+        await orders.insert_many(batch)
+    await InstallHelper.start_install()
+    return stores[0]
+
+
+def docs_examined(store_id: ObjectId, model: type) -> int:
+    explained = get_database().command({
+        "explain": {
+            "find": "orders", "filter": {"store_id": store_id}, "projection": model.Projection(),
+            "sort": {"created_at": -1, "_id": -1}, "limit": PAGE_SIZE,
+        },
+        "verbosity": "executionStats",
+    })
+    return explained["executionStats"]["totalDocsExamined"]
+
+
+async def measure(store_id: ObjectId, summary: bool) -> tuple[list[float], int, int]:
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        page = await RepositoryOrder.list_orders(store_id=store_id, limit=PAGE_SIZE, summary=summary)
+        body = FastJSONResponse(page).body
+        samples.append((time.perf_counter() - start) * 1000)
+        assert len(page) == PAGE_SIZE
+    raw = await RepositoryOrder.list_orders(store_id=store_id, limit=PAGE_SIZE, summary=summary, raw=True)
+    return samples, sum(len(bson.encode(d)) for d in raw), len(body)
+
+
+async def run():
+    store_id = await seed()
+    print(f"{ORDERS} orders x {LINES} lines over {STORES} stores, {PAGE_SIZE} per page")
+    print(f"{'fields':<8} {'p50 ms':>8} {'p95 ms':>8} {'bson B':>8} {'json B':>8} {'docs examined':>14}")
+    for name, summary, model in (("full", False, OrderInDb), ("summary", True, OrderSummary)):
+        samples, bson_bytes, json_bytes = await measure(store_id, summary)
+        print(
+            f"{name:<8} {statistics.median(samples):>8.2f} {statistics.quantiles(samples, n=20)[18]:>8.2f} "
+            f"{bson_bytes:>8} {json_bytes:>8} {docs_examined(store_id, model):>14}"
+        )
+    get_database().client.drop_database(os.environ["MONGO_DB"])
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
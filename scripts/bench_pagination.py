@@ -0,0 +1,88 @@
+"""
+Order listing latency at page depth 1 vs 10,000: offset mode (skip/limit)
+against keyset mode (cursor on created_at, _id) as served by GET /orders/.
+
+Usage: MONGO_URI=mongodb://localhost:27017 python scripts/bench_pagination.py
+Runs against the `pos_bench` database, which is dropped at the end.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("MONGO_DB", "pos_bench")
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from db.mongo import get_collection, get_database
+from repositories.repository_order import RepositoryOrder, ORDER_SORT
+from utils.models.model_data_type import ObjectId
+from utils.util_pagination import EncodeCursor
+
+PAGE_SIZE = 20
+DEPTHS = [1, 100, 1_000, 10_000]
+ROUNDS = 30
+
+
+async def seed(count: int) -> None:
+    orders = get_collection("orders")
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    store_id, user_id, product_id = ObjectId(), ObjectId(), ObjectId()
+    batch = []
+    for i in range(count):
+        batch.append({
+            "store_id": store_id,
+            "user_id": user_id,
+            # a few orders share a timestamp, so the _id tie-break is exercised
+            "created_at": start + timedelta(seconds=i // 3),
+            "status": "created",
+            "items": [{"product_id": product_id, "qty": "1.00", "price": "2.00"}],
+        })
+        if len(batch) == 10_000:
+            await orders.insert_many(batch)
+            batch = []
+    if batch:
+        await orders.insert_many(batch)
+    await orders.create_index([("created_at", -1), ("_id", -1)])
+
+
+async def cursor_for_depth(depth: int) -> str | None:
+    """Cursor that lands on page `depth` (what a client walking the pages would hold)."""
+    if depth == 1:
+        return None
+    skip = (depth - 1) * PAGE_SIZE - 1
+    field, order = ORDER_SORT
+    doc = await get_collection("orders").find(
+        {}, {field: 1}, sort=[(field, -1), ("_id", -1)]
+    ).skip(skip).limit(1).to_list(1)
+    return EncodeCursor(field, order, doc[0][field], doc[0]["_id"])
+
+
+async def measure(**kwargs) -> list[float]:
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        page = await RepositoryOrder.list_orders(limit=PAGE_SIZE, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert len(page) == PAGE_SIZE
+    return samples
+
+
+async def run():
+    total = max(DEPTHS) * PAGE_SIZE
+    await seed(total)
+    print(f"{total} orders, {PAGE_SIZE} per page")
+    print(f"{'page':>7} {'offset p50 ms':>14} {'keyset p50 ms':>14} {'offset p95 ms':>14} {'keyset p95 ms':>14}")
+    for depth in DEPTHS:
+        offset = await measure(skip=(depth - 1) * PAGE_SIZE)
+        keyset = await measure(cursor=await cursor_for_depth(depth))
+        print(
+            f"{depth:>7} {statistics.median(offset):>14.2f} {statistics.median(keyset):>14.2f} "
+            f"{statistics.quantiles(offset, n=20)[18]:>14.2f} {statistics.quantiles(keyset, n=20)[18]:>14.2f}"
+        )
+    get_database().client.drop_database(os.environ["MONGO_DB"])
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,124 @@
+"""
+List endpoints with RAW_LIST_RESPONSES (projection, no models) vs the model
+path, from the BSON bytes the driver receives to the response body: 100
+orders x 20 lines, 100 products and 100 categories. Reports per-page time,
+pages per second and the tracemalloc peak while building one page. No
+database needed.
+
+Usage: python scripts/bench_raw_lists.py
+"""
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import bson
+from bson import ObjectId as BsonObjectId
+from bson.decimal128 import Decimal128 as BsonDecimal128
+
+from models.category import CategoryInDb
+from models.order import OrderInDb
+from models.product import ProductInDb
+from utils.util_response import FastJSONResponse, RawJSONResponse
+
+REPEAT = 15
+NUMBER = 5
+
+
+def order_docs(rnd: random.Random) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": BsonObjectId(), "store_id": BsonObjectId(), "user_id": BsonObjectId(),
+            "items": [
+                {"product_id": BsonObjectId(), "qty": BsonDecimal128(str(rnd.randint(1, 5))), "price": BsonDecimal128(f"{rnd.randint(1, 99)}.{rnd.randint(0, 99):02d}")}
+                for _ in range(20)
+            ],
+            "subtotal": BsonDecimal128("100.00"), "total": BsonDecimal128("100.00"),
+            "status": "created", "created_at": now, "idempotency_key": None,
+        }
+        for _ in range(100)
+    ]
+
+
+def product_docs(rnd: random.Random) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": BsonObjectId(), "sku": f"SKU{i:06d}", "name": f"Product {i}", "unit": "pcs",
+            "price": BsonDecimal128(f"{rnd.randint(1, 500)}.{rnd.randint(0, 99):02d}"),
+            "cost": BsonDecimal128(f"{rnd.randint(1, 400)}.{rnd.randint(0, 99):02d}"),
+            "category_id": BsonObjectId(), "created_at": now,
+        }
+        for i in range(100)
+    ]
+
+
+def category_docs(rnd: random.Random) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {"_id": BsonObjectId(), "name": f"cat{i}", "display_name": f"Category {i}", "sku_prefix": f"C{i}", "active": True, "created_at": now}
+        for i in range(100)
+    ]
+
+
+def model_page(cls, wire: list[bytes]) -> bytes:
+    # what the repositories do today: decode to dicts, build models, serialize
+    items = []
+    for raw in wire:
+        doc = bson.decode(raw)
+        if cls is ProductInDb:
+            doc["category_id"] = str(doc["category_id"])
+        items.append(cls.FromDb(doc))
+    return FastJSONResponse(items).body
+
+
+def raw_page(cls, wire: list[bytes]) -> bytes:
+    # same driver decode, then the projection instead of the models
+    return RawJSONResponse(cls, [bson.decode(raw) for raw in wire]).body
+
+
+def ms(*fns) -> list[float]:
+    # interleaved, so a noisy neighbour slows both paths alike
+    best = [float("inf")] * len(fns)
+    for _ in range(REPEAT):
+        for i, fn in enumerate(fns):
+            best[i] = min(best[i], timeit.timeit(fn, number=NUMBER) / NUMBER * 1000)
+    return best
+
+
+def allocations(fn) -> int:
+    """tracemalloc peak while building one page, bytes."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run():
+    rnd = random.Random(42)
+    print(f"{'payload':<11} {'path':<6} {'ms/page':>8} {'pages/s':>8} {'peak KB':>8} {'same':>5}")
+    for name, cls, docs in (
+        ("orders", OrderInDb, order_docs(rnd)),
+        ("products", ProductInDb, product_docs(rnd)),
+        ("categories", CategoryInDb, category_docs(rnd)),
+    ):
+        wire = [bson.encode(d) for d in docs]
+        same = model_page(cls, wire) == raw_page(cls, wire)
+        paths = (("model", lambda: model_page(cls, wire)), ("raw", lambda: raw_page(cls, wire)))
+        times = ms(*(fn for _, fn in paths))
+        for (path, fn), t in zip(paths, times):
+            peak = allocations(fn)
+            print(f"{name:<11} {path:<6} {t:>8.2f} {1000 / t:>8.0f} {peak / 1024:>8.1f} {str(same):>5}")
+
+
+if __name__ == "__main__":
+    run()
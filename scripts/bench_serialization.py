@@ -0,0 +1,79 @@
+"""
+Response encoding microbenchmark for order lists (20 lines per order):
+
+- dump+encoder: `model_dump(mode="json")` in the handler, then FastAPI's
+  jsonable_encoder and JSONResponse's json.dumps (the old non-response_model routes)
+- response_model: FastAPI's response_model path, re-validating the list and
+  dumping it with a TypeAdapter
+- fast: FastJSONResponse, one pydantic-core pass over the models
+
+No database needed.
+
+Usage: python scripts/bench_serialization.py
+"""
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timezone
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from bson.decimal128 import Decimal128 as BsonDecimal128
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse
+
+from models.order import OrderInDb
+from utils.models.model_data_type import ObjectId
+from utils.util_response import FastJSONResponse
+
+ORDER_COUNTS = [20, 100, 500]
+LINES = 20
+REPEAT = 10
+
+
+def make_orders(n: int, rnd: random.Random) -> list[OrderInDb]:
+    now = datetime.now(timezone.utc)
+    return [
+        OrderInDb.model_validate({
+            "_id": ObjectId(),
+            "store_id": ObjectId(),
+            "user_id": ObjectId(),
+            "items": [
+                {"product_id": ObjectId(), "qty": BsonDecimal128(str(rnd.randint(1, 5))), "price": BsonDecimal128(f"{rnd.randint(1, 99)}.{rnd.randint(0, 99):02d}")}
+                for _ in range(LINES)
+            ],
+            "subtotal": BsonDecimal128("100.00"),
+            "tax": BsonDecimal128("0.00"),
+            "total": BsonDecimal128("100.00"),
+            "created_at": now,
+        })
+        for _ in range(n)
+    ]
+
+
+def run():
+    rnd = random.Random(42)
+    adapter = TypeAdapter(List[OrderInDb])
+    print(f"{'orders':>7} {'dump+encoder ms':>16} {'response_model ms':>18} {'fast ms':>8} {'KiB':>7}")
+    for n in ORDER_COUNTS:
+        orders = make_orders(n, rnd)
+
+        def dump_encoder():
+            return JSONResponse(jsonable_encoder({"ok": True, "orders": [o.model_dump(mode="json") for o in orders]})).body
+
+        def response_model():
+            return adapter.dump_json(adapter.validate_python(orders), by_alias=True)
+
+        def fast():
+            return FastJSONResponse({"ok": True, "orders": orders}, by_alias=False).body
+
+        times = [min(timeit.repeat(f, number=1, repeat=REPEAT)) * 1000 for f in (dump_encoder, response_model, fast)]
+        size = len(fast()) / 1024
+        print(f"{n:>7} {times[0]:>16.2f} {times[1]:>18.2f} {times[2]:>8.2f} {size:>7.0f}")
+
+
+if __name__ == "__main__":
+    run()
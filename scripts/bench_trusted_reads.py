@@ -0,0 +1,80 @@
+"""
+Building models from stored documents: model_validate vs BaseModel.FromDb
+(trusted construction) vs FromDb with TRUSTED_READS_VERIFY on, for an order
+list (100 orders x 20 lines) and a catalog page (1000 products). Documents
+carry the types the driver returns (bson ObjectId, Decimal128, naive datetimes).
+No database needed.
+
+Usage: python scripts/bench_trusted_reads.py
+"""
+import os
+import random
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from bson import ObjectId as BsonObjectId
+from bson.decimal128 import Decimal128 as BsonDecimal128
+
+from core.config import settings
+from models.order import OrderInDb
+from models.product import ProductInDb
+
+REPEAT = 15
+NUMBER = 5
+
+
+def order_docs(rnd: random.Random) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": BsonObjectId(), "store_id": BsonObjectId(), "user_id": BsonObjectId(),
+            "items": [
+                {"product_id": BsonObjectId(), "qty": BsonDecimal128(str(rnd.randint(1, 5))), "price": BsonDecimal128(f"{rnd.randint(1, 99)}.{rnd.randint(0, 99):02d}")}
+                for _ in range(20)
+            ],
+            "subtotal": BsonDecimal128("100.00"), "total": BsonDecimal128("100.00"),
+            "status": "created", "created_at": now, "idempotency_key": None,
+        }
+        for _ in range(100)
+    ]
+
+
+def product_docs(rnd: random.Random) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": BsonObjectId(), "sku": f"SKU{i:06d}", "name": f"Product {i}", "unit": "pcs",
+            "price": BsonDecimal128(f"{rnd.randint(1, 500)}.{rnd.randint(0, 99):02d}"),
+            "cost": BsonDecimal128(f"{rnd.randint(1, 400)}.{rnd.randint(0, 99):02d}"),
+            "category_id": str(BsonObjectId()), "created_at": now,
+        }
+        for i in range(1000)
+    ]
+
+
+def ms(fn) -> float:
+    return min(timeit.repeat(fn, number=NUMBER, repeat=REPEAT)) / NUMBER * 1000
+
+
+def run():
+    rnd = random.Random(42)
+    print(f"{'payload':<10} {'validate ms':>12} {'fromdb ms':>10} {'verify ms':>10} {'same':>5}")
+    for name, cls, docs in (("orders", OrderInDb, order_docs(rnd)), ("catalog", ProductInDb, product_docs(rnd))):
+        validated = [cls.model_validate(d) for d in docs]
+        trusted = [cls.FromDb(d) for d in docs]
+        same = [m.model_dump_json() for m in validated] == [m.model_dump_json() for m in trusted]
+        validate = ms(lambda: [cls.model_validate(d) for d in docs])
+        fromdb = ms(lambda: [cls.FromDb(d) for d in docs])
+        settings.TRUSTED_READS_VERIFY = True
+        try:
+            verify = ms(lambda: [cls.FromDb(d) for d in docs])
+        finally:
+            settings.TRUSTED_READS_VERIFY = False
+        print(f"{name:<10} {validate:>12.2f} {fromdb:>10.2f} {verify:>10.2f} {str(same):>5}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,49 @@
+"""
+Pick the bcrypt work factor for this machine: the highest one whose verify
+fits the target time. Prints the measured verify time per factor around the
+pick and the PASSWORD_HASH_ROUNDS line to put in .env.
+
+Usage: python scripts/calibrate_bcrypt.py [--target-ms 250] [--min-rounds 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import bcrypt
+
+from core.config import settings
+from core.security import calibrate_hash_rounds
+
+
+def measure(rounds: int, samples: int) -> float:
+    pw = b"calibration-password"
+    hashed = bcrypt.hashpw(pw, bcrypt.gensalt(rounds=rounds))
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.checkpw(pw, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=settings.PASSWORD_HASH_TARGET_MS)
+    parser.add_argument("--min-rounds", type=int, default=settings.PASSWORD_HASH_MIN_ROUNDS)
+    parser.add_argument("--samples", type=int, default=3, help="verifies timed per factor")
+    args = parser.parse_args()
+
+    rounds = calibrate_hash_rounds(args.target_ms, args.min_rounds, samples=args.samples)
+    print(f"{'rounds':>6} {'verify ms':>10}")
+    for r in range(max(4, rounds - 1), rounds + 2):
+        ms = measure(r, args.samples)
+        print(f"{r:>6} {ms:>10.1f}{'  <- pick' if r == rounds else ''}{'  (over target)' if ms > args.target_ms else ''}")
+    print(f"\nPASSWORD_HASH_ROUNDS={rounds}  # currently {settings.PASSWORD_HASH_ROUNDS}")
+
+
+if __name__ == "__main__":
+    main()
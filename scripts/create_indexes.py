@@ -1,21 +1,25 @@
-import asyncio
+"""
+Apply the index registry (mongodb/mongo_index.py) by hand; the app also does
+this in the background at startup.
 
-from mongodb.mongo_client import get_mgdb
-from core.config import settings
+    python scripts/create_indexes.py          # build missing indexes, report drift
+    python scripts/create_indexes.py --check  # report only; exit 1 on any drift
+"""
+import asyncio
+import json
+import os
+import sys
 
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-MGDB = get_mgdb(settings.MONGO_DB)
+from helpers.helper_install import InstallHelper
 
 
-async def create_indexes():
-    await MGDB.get_collection("users").create_index("username", unique=True)
-    await MGDB.get_collection("users").create_index("email", unique=True)
-    await MGDB.get_collection("products").create_index("sku", unique=True)
-    await MGDB.get_collection("inventory").create_index([("store_id", 1), ("product_id", 1)], unique=True)
-    await MGDB.get_collection("orders").create_index("idempotency_key", unique=False)
-    await MGDB.get_collection("idempotency").create_index("key", unique=True)
-    await MGDB.get_collection("idempotency").create_index("expires_at", expireAfterSeconds=0, background=True)
+async def create_indexes(build: bool = True) -> int:
+    log = await InstallHelper.start_install(build=build)
+    print(json.dumps(log, indent=2))
+    return 1 if InstallHelper.has_drift(log) else 0
 
 
 if __name__ == "__main__":
-    asyncio.run(create_indexes())
+    sys.exit(asyncio.run(create_indexes(build="--check" not in sys.argv[1:])))
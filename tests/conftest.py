@@ -6,12 +6,45 @@ os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
 
 import pytest
 from httpx import AsyncClient, ASGITransport
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 
 import main as app_main
 from core.config import settings
 
 
+class CommandCounter(monitoring.CommandListener):
+    """Records the name of every command the driver sends (used for round-trip budgets)."""
+
+    IGNORED = {"hello", "ismaster", "isMaster", "ping", "endSessions", "buildInfo", "getMore"}
+
+    def __init__(self):
+        self.commands: list[str] = []
+
+    def reset(self):
+        self.commands = []
+
+    def started(self, event):
+        if event.command_name not in self.IGNORED and event.database_name == settings.MONGO_DB:
+            self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Registered before any client exists so every pooled client reports to it
+command_counter_listener = CommandCounter()
+monitoring.register(command_counter_listener)
+
+
+@pytest.fixture
+def command_counter():
+    command_counter_listener.reset()
+    return command_counter_listener
+
+
 @pytest.fixture(scope="session")
 def anyio_backend():
     return "asyncio"
@@ -41,3 +41,77 @@ async def test_register_login_and_me(client: AsyncClient) -> None:
     assert udoc
     assert udoc.get("password") != "secret"
     assert udoc.get("password").startswith("$2")
+
+
+@pytest.mark.anyio
+async def test_login_sheds_load_when_hash_queue_full(client: AsyncClient, monkeypatch) -> None:
+    import asyncio
+    from core.config import settings
+
+    payload = {"name": "Storm", "email": "storm@example.com", "username": "storm", "password": "secret"}
+    r = await client.post("/auth/register", json=payload)
+    assert r.status_code == 200
+
+    # one bcrypt job at a time, nothing may wait behind it
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_QUEUE", 0)
+    responses = await asyncio.gather(*[
+        client.post("/auth/login", data={"username": "storm", "password": "secret"}) for _ in range(5)
+    ])
+    codes = [r.status_code for r in responses]
+    assert 200 in codes
+    assert 503 in codes
+    assert all(r.headers.get("retry-after") == "1" for r in responses if r.status_code == 503)
+
+
+@pytest.mark.anyio
+async def test_login_upgrades_outdated_hash(client: AsyncClient, monkeypatch) -> None:
+    import core.security as security
+
+    monkeypatch.setattr(security, "_hash_rounds", 4)
+    payload = {"name": "Rehash", "email": "rehash@example.com", "username": "rehash", "password": "secret"}
+    r = await client.post("/auth/register", json=payload)
+    assert r.status_code == 200
+    users = MGDB().get_collection("users")
+    assert security.hash_cost(users.find_one({"username": "rehash"})["password"]) == 4
+
+    # work factor raised (e.g. by calibration): the next login upgrades the stored hash
+    monkeypatch.setattr(security, "_hash_rounds", 5)
+    r = await client.post("/auth/login", data={"username": "rehash", "password": "secret"})
+    assert r.status_code == 200
+    assert security.hash_cost(users.find_one({"username": "rehash"})["password"]) == 5
+
+    r = await client.post("/auth/login", data={"username": "rehash", "password": "secret"})
+    assert r.status_code == 200
+    metrics = (await client.get("/metrics")).text
+    assert 'pos_password_verify_cpu_seconds_count{rounds="5"}' in metrics
+
+
+@pytest.mark.anyio
+async def test_privileged_routes_recheck_deleted_user(client: AsyncClient, monkeypatch) -> None:
+    from bson import ObjectId
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "JWT_SELF_CONTAINED", True)
+    await client.post("/auth/register", json={"name": "Gone", "email": "gone@example.com", "username": "gone", "password": "secret", "role": "admin"})
+    r = await client.post("/auth/login", data={"username": "gone", "password": "secret"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    user_id = MGDB().get_collection("users").find_one({"username": "gone"})["_id"]
+    r = await client.post("/categories/", json={"name": "gonecat", "display_name": "Gone", "sku_prefix": "GON"}, headers=headers)
+    category_id = r.json()["id"]
+
+    MGDB().get_collection("users").delete_one({"_id": user_id})
+
+    # creates trust the token's claims until it expires
+    r = await client.post("/categories/", json={"name": "gonecat2", "display_name": "Gone 2", "sku_prefix": "GO2"}, headers=headers)
+    assert r.status_code == 200
+    # user records and changes to existing records re-read the user
+    store_id = str(ObjectId())
+    for method, url, body in (
+        ("GET", f"/users/{user_id}", None),
+        ("DELETE", f"/categories/{category_id}", None),
+        ("POST", f"/stores/{store_id}/inventory/adjust", {"product_id": str(ObjectId()), "delta": "1"}),
+        ("PATCH", f"/orders/{ObjectId()}/status", {"status": "confirmed"}),
+    ):
+        r = await client.request(method, url, json=body, headers=headers)
+        assert r.status_code == 401, url
@@ -138,13 +138,17 @@ async def test_get_category_by_id(client):
         "sku_prefix": "ACC"
     }
     r = await client.post("/categories/", json=category_data, headers=headers)
-    category_id = r.json()["id"]
+    created = r.json()
+    category_id = created["id"]
 
     # Get category by ID
     r = await client.get(f"/categories/{category_id}", headers=headers)
     assert r.status_code == 200
     data = r.json()
     assert data["id"] == category_id
+    # timestamps read back exactly as the create returned them
+    assert data["created_at"] == created["created_at"]
+    assert data["updated_at"] == created["updated_at"]
     assert data["name"] == "accessories"
     assert data["display_name"] == "Accessories"
     assert data["sku_prefix"] == "ACC"
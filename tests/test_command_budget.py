@@ -0,0 +1,161 @@
+"""
+Round-trip budgets: how many Mongo commands each endpoint may send.
+Lower a budget when an endpoint gets cheaper; raising one needs a reason.
+"""
+from httpx import AsyncClient
+import pytest
+
+from utils.models.model_data_type import ObjectId
+
+
+async def _login(client: AsyncClient, username: str) -> dict:
+    await client.post("/auth/register", json={"name": username, "email": f"{username}@example.com", "username": username, "password": "secret", "role": "admin"})
+    r = await client.post("/auth/login", data={"username": username, "password": "secret"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _category(client: AsyncClient, headers: dict, name: str = "budget") -> str:
+    r = await client.post("/categories/", json={"name": name, "display_name": name.title(), "sku_prefix": "BDG"}, headers=headers)
+    return r.json()["id"]
+
+
+@pytest.mark.anyio
+async def test_register_budget(client: AsyncClient, command_counter) -> None:
+    r = await client.post("/auth/register", json={"name": "B", "email": "b@example.com", "username": "budget_reg", "password": "secret", "role": "admin"})
+    assert r.status_code == 200
+    # username count, email count, insert
+    assert command_counter.commands == ["aggregate", "aggregate", "insert"]
+
+
+@pytest.mark.anyio
+async def test_category_write_budget(client: AsyncClient, command_counter) -> None:
+    headers = await _login(client, "budget_cat")
+
+    command_counter.reset()
+    category_id = await _category(client, headers)
+    # user lookup (first authenticated request), name check, insert
+    assert command_counter.commands == ["find", "find", "insert"]
+
+    command_counter.reset()
+    r = await client.put(f"/categories/{category_id}", json={"name": "budget2", "display_name": "Budget 2", "sku_prefix": "BDG"}, headers=headers)
+    assert r.status_code == 200
+    # user re-read (edits bypass the cache), duplicate-name check, findAndModify
+    assert command_counter.commands == ["find", "find", "findAndModify"]
+
+
+@pytest.mark.anyio
+async def test_product_write_budget(client: AsyncClient, command_counter) -> None:
+    headers = await _login(client, "budget_prod")
+    category_id = await _category(client, headers)
+
+    command_counter.reset()
+    r = await client.post("/products/", json={"sku": "BDG-1", "name": "Budget", "price": "1.00", "category_id": category_id}, headers=headers)
+    assert r.status_code == 200
+    # category lookup, sku uniqueness count, insert (user cached by _category)
+    assert command_counter.commands == ["find", "aggregate", "insert"]
+
+    command_counter.reset()
+    r = await client.post("/products/BDG-1/regenerate-sku", headers=headers)
+    assert r.status_code == 200
+    # user re-read, existing product, prefix lookup, uniqueness probe, findAndModify
+    assert command_counter.commands == ["find", "find", "find", "find", "findAndModify"]
+
+
+@pytest.mark.anyio
+async def test_order_write_budget(client: AsyncClient, command_counter) -> None:
+    headers = await _login(client, "budget_ord")
+    store_id = str(ObjectId())
+    products = [str(ObjectId()) for _ in range(5)]
+    for p in products:
+        await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": p, "delta": "10"}, headers=headers)
+    payload = {
+        "store_id": store_id,
+        "user_id": str(ObjectId()),
+        "items": [{"product_id": p, "qty": "1", "price": "1.00"} for p in products]
+    }
+
+    command_counter.reset()
+    r = await client.post("/orders/", json=payload, headers=headers)
+    assert r.status_code == 200
+    order_id = r.json()["order"]["id"]
+    # user lookup (the adjusts read it fresh, past the cache), one bulk decrement for all 5 lines, insert
+    assert command_counter.commands == ["find", "update", "insert"]
+
+    command_counter.reset()
+    r = await client.patch(f"/orders/{order_id}/status", json={"status": "confirmed"}, headers=headers)
+    assert r.status_code == 200
+    # user re-read, findAndModify
+    assert command_counter.commands == ["find", "findAndModify"]
+
+    command_counter.reset()
+    r = await client.post("/orders/", json=payload, headers={**headers, "Idempotency-Key": "budget-1"})
+    assert r.status_code == 200
+    # claim-or-replay upsert, bulk decrement, insert, store response
+    assert command_counter.commands == ["findAndModify", "update", "insert", "update"]
+
+    command_counter.reset()
+    replay = await client.post("/orders/", json=payload, headers={**headers, "Idempotency-Key": "budget-1"})
+    assert replay.json() == r.json()
+    # served by the in-process response cache
+    assert command_counter.commands == []
+
+    from repositories.repository_idempotency import _response_cache
+    _response_cache.clear()
+    command_counter.reset()
+    replay = await client.post("/orders/", json=payload, headers={**headers, "Idempotency-Key": "budget-1"})
+    assert replay.json() == r.json()
+    # the upsert finds the stored response
+    assert command_counter.commands == ["findAndModify"]
+
+
+@pytest.mark.anyio
+async def test_authenticated_user_cache(client: AsyncClient, command_counter) -> None:
+    import asyncio
+    from repositories.repository_user import _user_cache
+    from utils.util_ttl_cache import CACHE_REQUESTS
+
+    headers = await _login(client, "budget_cache")
+    _user_cache.clear()
+    misses = CACHE_REQUESTS.value(cache="user", result="miss")
+
+    command_counter.reset()
+    responses = await asyncio.gather(*[client.get("/users/me", headers=headers) for _ in range(5)])
+    assert all(r.status_code == 200 for r in responses)
+    # five concurrent misses, one find
+    assert command_counter.commands == ["find"]
+    assert CACHE_REQUESTS.value(cache="user", result="miss") == misses + 1
+
+    command_counter.reset()
+    r = await client.get("/users/me", headers=headers)
+    assert r.status_code == 200
+    assert command_counter.commands == []
+
+    metrics = (await client.get("/metrics")).text
+    assert 'pos_cache_requests_total{cache="user",result="hit"}' in metrics
+
+
+@pytest.mark.anyio
+async def test_self_contained_token_budget(client: AsyncClient, command_counter, monkeypatch) -> None:
+    from core.config import settings
+    from repositories.repository_user import _user_cache
+
+    monkeypatch.setattr(settings, "JWT_SELF_CONTAINED", True)
+    headers = await _login(client, "budget_claims")
+    _user_cache.clear()
+
+    command_counter.reset()
+    await _category(client, headers, "claims")
+    # principal built from the token: name check, insert
+    assert command_counter.commands == ["find", "insert"]
+
+    command_counter.reset()
+    r = await client.get("/debug/slow-queries", headers=headers)
+    assert r.status_code == 200
+    # admin routes re-read the user every time
+    assert command_counter.commands == ["find"]
+
+    monkeypatch.setattr(settings, "JWT_CLAIMS_VERSION", settings.JWT_CLAIMS_VERSION + 1)
+    command_counter.reset()
+    await _category(client, headers, "claims2")
+    # outdated claims version: back to the user lookup
+    assert command_counter.commands == ["find", "find", "insert"]
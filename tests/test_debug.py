@@ -0,0 +1,108 @@
+import pytest
+
+from core.config import settings
+from mongodb.mongo_monitoring import slow_query_listener
+
+
+async def _login(client, username: str, role: str) -> dict:
+    await client.post("/auth/register", json={"name": username, "email": f"{username}@example.com", "username": username, "password": "secret", "role": role})
+    r = await client.post("/auth/login", data={"username": username, "password": "secret"})
+    return {"Authorization": f"Bearer {r.json().get('access_token')}"}
+
+
+@pytest.mark.anyio
+async def test_slow_queries_attributed_to_route_and_repository(client, monkeypatch):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.0)
+    monkeypatch.setattr(settings, "SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.0)
+    admin = await _login(client, "slowadmin", "admin")
+    cashier = await _login(client, "slowcashier", "cashier")
+    slow_query_listener.reset()
+
+    r = await client.get("/orders/", headers=admin)
+    assert r.status_code == 200
+
+    r = await client.get("/debug/slow-queries?top=50", headers=admin)
+    assert r.status_code == 200
+    items = r.json()["items"]
+    listing = [i for i in items if i["repository"] == "RepositoryOrder.list_orders"]
+    assert listing and listing[0]["route"] == "GET /orders/"
+    assert listing[0]["command"] == "find" and listing[0]["collection"] == "orders"
+    assert listing[0]["slow"] == listing[0]["count"] >= 1
+
+    r = await client.get("/debug/slow-queries", headers=cashier)
+    assert r.status_code == 403
+
+
+@pytest.mark.anyio
+async def test_metrics_export_pool_instrumentation(client):
+    headers = await _login(client, "pooladmin", "admin")
+    r = await client.get("/orders/", headers=headers)
+    assert r.status_code == 200
+
+    r = await client.get("/metrics")
+    assert r.status_code == 200
+    body = r.text
+    assert 'pos_mongo_pool_checkout_wait_seconds_count{address="' in body
+    assert 'pos_mongo_pool_connections{address="' in body
+    assert 'pos_mongo_pool_max_size{address="' in body
+    assert "# TYPE pos_mongo_server_rtt_seconds gauge" in body
+
+
+@pytest.mark.anyio
+async def test_server_timing_and_route_histogram(client):
+    headers = await _login(client, "timingadmin", "admin")
+    r = await client.get("/orders/", headers=headers)
+    assert r.status_code == 200
+    phases = dict(part.strip().split(";dur=") for part in r.headers["server-timing"].split(","))
+    assert set(phases) == {"auth", "mongo", "ser", "total"}
+    assert float(phases["mongo"]) > 0
+    # timed through dependency_overrides, not in the router
+    assert float(phases["auth"]) > 0
+    assert float(phases["total"]) >= float(phases["auth"])
+
+    body = (await client.get("/metrics")).text
+    assert 'pos_http_request_duration_seconds_count{method="GET",route="/orders/",status_class="2xx"}' in body
+
+
+@pytest.mark.anyio
+async def test_profile_endpoint(client):
+    admin = await _login(client, "profadmin", "admin")
+    cashier = await _login(client, "profcashier", "cashier")
+
+    r = await client.get("/debug/profile?seconds=0.2&hz=200", headers=admin)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    lines = r.text.splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) >= 1
+
+    r = await client.get("/debug/profile?seconds=0.2&mode=memory&top=5", headers=admin)
+    assert r.status_code == 200
+    assert len(r.json()["items"]) <= 5
+
+    r = await client.get("/debug/profile?seconds=0.2", headers=cashier)
+    assert r.status_code == 403
+
+
+def test_server_timing_counts_in_handler_rendering() -> None:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from utils.error_handler import handle_repo_errors
+    from utils.util_request_context import RequestContextMiddleware
+    from utils.util_response import negotiate
+
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/page")
+    @handle_repo_errors
+    async def page():
+        # rendered here, before handle_repo_errors marks the handler done
+        return negotiate([{"n": i, "name": "x" * 20} for i in range(20000)])
+
+    client = TestClient(app)
+    for accept in ("application/json", "application/msgpack"):
+        r = client.get("/page", headers={"accept": accept})
+        phases = dict(part.strip().split(";dur=") for part in r.headers["server-timing"].split(","))
+        assert float(phases["ser"]) > 0.1
@@ -0,0 +1,70 @@
+import pytest
+from bson.decimal128 import Decimal128 as BsonDecimal128
+from pydantic import ValidationError
+
+from models.order import OrderLine
+from utils.models.model_data_type import Fixed, ObjectId
+
+
+def test_fixed_parsing_and_boundaries() -> None:
+    product_id = ObjectId()
+    line = OrderLine.model_validate({"product_id": str(product_id), "qty": "2", "price": 3.5})
+    assert line.qty.units == 200
+    assert line.price == Fixed("3.50")
+
+    # BSON boundary: python-mode dump gives Decimal128, JSON gives a decimal string
+    assert line.model_dump()["price"] == BsonDecimal128("3.50")
+    assert line.model_dump(mode="json")["price"] == "3.50"
+    assert OrderLine.model_validate({"product_id": product_id, "qty": BsonDecimal128("2"), "price": BsonDecimal128("3.5")}) == line
+
+    # client input beyond 2 decimal places is rejected; stored values are rounded
+    with pytest.raises(ValidationError):
+        OrderLine.model_validate({"product_id": str(ObjectId()), "qty": "1.005", "price": "1"})
+    assert Fixed(BsonDecimal128("1.005")) == Fixed("1.01")
+
+
+def test_fixed_arithmetic_rounding() -> None:
+    assert Fixed("3.50") * Fixed("2") == Fixed("7.00")
+    # half away from zero on multiplication
+    assert Fixed("0.05") * Fixed("0.50") == Fixed("0.03")
+    assert Fixed("-0.05") * Fixed("0.50") == Fixed("-0.03")
+    assert Fixed("0.33") * Fixed("1.01") == Fixed("0.33")
+    assert sum([Fixed("0.10")] * 3, Fixed(0)) == Fixed("0.30")
+    assert str(Fixed("-1.5")) == "-1.50"
+    assert Fixed("2") > 1 and Fixed(0) == 0
+
+
+def test_fixed_hash_matches_eq() -> None:
+    from decimal import Decimal
+
+    assert len({Fixed(1), 1, Decimal("1.00")}) == 1
+    assert len({Fixed("-1.5"), Decimal("-1.50")}) == 1
+    assert {Fixed("0.10"): "a"}[Fixed("0.1")] == "a"
+    # no value-hashed equality with types that hash differently
+    assert Fixed(1) != "1" and Fixed("0.1") != 0.1 and Fixed(1) != BsonDecimal128("1")
+
+
+def test_trusted_reads_match_validation() -> None:
+    from bson import ObjectId as BsonObjectId
+    from datetime import datetime
+    from models.order import OrderInDb
+
+    # stored values beyond 2 places round the same way on both paths
+    for raw in ("0", "-0.00", "1.005", "-1.005", "12345.6789", "1E+3", "0.004", "999999999.99"):
+        assert Fixed.from_bson(BsonDecimal128(raw)) == Fixed.from_decimal(BsonDecimal128(raw).to_decimal(), exact=False)
+
+    doc = {
+        "_id": BsonObjectId(), "store_id": BsonObjectId(), "user_id": BsonObjectId(),
+        "items": [{"product_id": BsonObjectId(), "qty": BsonDecimal128("2"), "price": BsonDecimal128("1.505")}],
+        "subtotal": BsonDecimal128("3.01"), "total": BsonDecimal128("3.01"), "created_at": datetime.utcnow(),
+    }
+    trusted = OrderInDb.FromDb(doc)
+    validated = OrderInDb.model_validate(doc)
+    assert trusted == validated
+    assert trusted.model_fields_set == validated.model_fields_set
+    assert trusted.model_dump_json() == validated.model_dump_json()
+    assert isinstance(trusted.items[0].price, Fixed)
+
+    # not one of ours: a missing required field is still reported by validation
+    with pytest.raises(ValidationError):
+        OrderInDb.FromDb({k: v for k, v in doc.items() if k != "store_id"})
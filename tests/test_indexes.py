@@ -0,0 +1,70 @@
+import pytest
+
+from helpers.helper_install import InstallHelper
+from mongodb.mongo_index import IndexIdempotency, IndexOrder
+
+
+def test_diff_indexes_matches_by_key_pattern() -> None:
+    existing = [
+        {"name": "_id_", "key": {"_id": 1}},
+        # made by the old create_indexes script under default names
+        {"name": "idempotency_key_1", "key": {"idempotency_key": 1}},
+        {"name": "created_at_-1__id_-1", "key": {"created_at": -1.0, "_id": -1.0}, "unique": True},
+        {"name": "total_1", "key": {"total": 1}},
+    ]
+    diff = InstallHelper.diff_indexes([i.value for i in IndexOrder], existing)
+    assert diff["present"] == ["idempotency_key_1"]
+    assert [i.index_name for i in diff["missing"]] == [
+        "index_store_id_created_at_id_summary", "index_user_id_created_at_id", "index_status_created_at_id"
+    ]
+    assert diff["mismatched"] == [{
+        "name": "created_at_-1__id_-1",
+        "declared": {"name": "index_created_at_id"},
+        "actual": {"unique": True},
+    }]
+    assert diff["undeclared"] == ["total_1"]
+
+    ttl = [{"name": "expires_at_1", "key": {"expires_at": 1}, "expireAfterSeconds": 0.0, "background": True}]
+    diff = InstallHelper.diff_indexes([IndexIdempotency.expires_at.value], ttl)
+    assert diff["present"] == ["expires_at_1"] and not diff["mismatched"]
+
+    # a plain index on expires_at is not the TTL index (expireAfterSeconds=0 is falsy)
+    assert IndexIdempotency.expires_at.value.options() == {"expireAfterSeconds": 0}
+    plain = [{"name": "expires_at_1", "key": {"expires_at": 1}}]
+    diff = InstallHelper.diff_indexes([IndexIdempotency.expires_at.value], plain)
+    assert not diff["present"]
+    assert diff["mismatched"] == [{
+        "name": "expires_at_1",
+        "declared": {"name": "index_expires_at", "expireAfterSeconds": 0},
+        "actual": {},
+    }]
+
+
+@pytest.mark.anyio
+async def test_start_install_builds_then_reports_clean(client):
+    await InstallHelper.start_install()
+    log = await InstallHelper.start_install(build=False)
+    assert not InstallHelper.has_drift(log), log
+    assert "index_created_at_id" in log["setup_orders"]["present"]
+
+
+def test_query_shapes_reference_repository_methods() -> None:
+    import repositories.repository_category
+    import repositories.repository_idempotency
+    import repositories.repository_inventory
+    import repositories.repository_order
+    import repositories.repository_product
+    import repositories.repository_reservation
+    import repositories.repository_user
+    from mongodb.mongo_query_shape import ListMongoQueryShape
+
+    modules = [
+        repositories.repository_category, repositories.repository_idempotency, repositories.repository_inventory,
+        repositories.repository_order, repositories.repository_product, repositories.repository_reservation,
+        repositories.repository_user,
+    ]
+    classes = {name: obj for m in modules for name, obj in vars(m).items() if name.startswith("Repository")}
+    for group in ListMongoQueryShape:
+        for member in group:
+            cls_name, method = member.value.method.split(".")
+            assert hasattr(classes[cls_name], method), member.value.method
@@ -48,3 +48,79 @@ async def test_inventory_persistence(client: AsyncClient) -> None:
     db = get_database()
     doc = db.get_collection("inventory").find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})
     assert doc is not None
+
+
+@pytest.mark.anyio
+async def test_reserve_commit_and_release(client: AsyncClient) -> None:
+    await client.post("/auth/register", json={"name":"Res","email":"res@example.com","username":"res","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"res","password":"secret"})
+    token = r.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "5"}, headers=headers)
+
+    # Hold 3, then only 2 remain sellable
+    r = await client.post(f"/stores/{store_id}/inventory/reserve", json={"items": [{"product_id": product_id, "qty": "3"}]}, headers=headers)
+    assert r.status_code == 200
+    reservation_id = r.json()["reservation"]["id"]
+
+    r = await client.post(f"/stores/{store_id}/inventory/reserve", json={"items": [{"product_id": product_id, "qty": "3"}]}, headers=headers)
+    assert r.status_code == 400
+
+    db = get_database()
+    doc = db.get_collection("inventory").find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})
+    assert doc["qty"].to_decimal() == 2
+    assert doc["reserved_qty"].to_decimal() == 3
+
+    # Placing the order converts the hold
+    payload = {
+        "store_id": store_id,
+        "user_id": str(ObjectId()),
+        "reservation_id": reservation_id,
+        "items": [{"product_id": product_id, "qty": "3", "price": "1.00"}]
+    }
+    r = await client.post("/orders/", json=payload, headers=headers)
+    assert r.status_code == 200
+    doc = db.get_collection("inventory").find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})
+    assert doc["qty"].to_decimal() == 2
+    assert doc["reserved_qty"].to_decimal() == 0
+
+    # A committed reservation can be used only once
+    r = await client.post("/orders/", json=payload, headers=headers)
+    assert r.status_code == 400
+
+    # Releasing returns held stock
+    r = await client.post(f"/stores/{store_id}/inventory/reserve", json={"items": [{"product_id": product_id, "qty": "2"}]}, headers=headers)
+    reservation_id = r.json()["reservation"]["id"]
+    r = await client.post(f"/stores/{store_id}/inventory/reservations/{reservation_id}/release", headers=headers)
+    assert r.status_code == 200
+    doc = db.get_collection("inventory").find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})
+    assert doc["qty"].to_decimal() == 2
+    assert doc["reserved_qty"].to_decimal() == 0
+
+    r = await client.post(f"/stores/{store_id}/inventory/reservations/{reservation_id}/release", headers=headers)
+    assert r.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_non_positive_quantities_rejected(client: AsyncClient) -> None:
+    await client.post("/auth/register", json={"name":"Neg","email":"neg@example.com","username":"neg","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"neg","password":"secret"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "5"}, headers=headers)
+
+    # a negative hold would pass the stock guard and add stock
+    for qty in ("-5", "0"):
+        r = await client.post(f"/stores/{store_id}/inventory/reserve", json={"items": [{"product_id": product_id, "qty": qty}]}, headers=headers)
+        assert r.status_code == 422
+        payload = {"store_id": store_id, "user_id": str(ObjectId()), "items": [{"product_id": product_id, "qty": qty, "price": "1.00"}]}
+        r = await client.post("/orders/", json=payload, headers=headers)
+        assert r.status_code == 422
+
+    doc = get_database().get_collection("inventory").find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})
+    assert doc["qty"].to_decimal() == 5
+    assert not doc.get("holds")
@@ -48,6 +48,64 @@ async def test_create_order_idempotency(client):
     assert float(qty_val) == 3.0
 
 
+@pytest.mark.anyio
+async def test_idempotency_claim_lease(client):
+    from datetime import datetime, timedelta, timezone
+
+    await client.post("/auth/register", json={"name":"Lease","email":"lease@example.com","username":"lease","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"lease","password":"secret"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "5"}, headers=headers)
+    payload = {"store_id": store_id, "user_id": str(ObjectId()), "items": [{"product_id": product_id, "qty": "1", "price": "1.00"}]}
+
+    now = datetime.now(timezone.utc)
+    idem = get_database().get_collection("idempotency")
+    idem.insert_many([
+        {"key": "lease-live", "state": "processing", "claim": ObjectId(), "lease_until": now + timedelta(minutes=5)},
+        {"key": "lease-dead", "state": "processing", "claim": ObjectId(), "lease_until": now - timedelta(seconds=1)},
+    ])
+
+    # a live claim belongs to someone else
+    r = await client.post("/orders/", json=payload, headers={**headers, "Idempotency-Key": "lease-live"})
+    assert r.status_code == 409
+
+    # an expired claim is taken over and completed with the full response
+    r = await client.post("/orders/", json=payload, headers={**headers, "Idempotency-Key": "lease-dead"})
+    assert r.status_code == 200
+    doc = idem.find_one({"key": "lease-dead"})
+    assert doc["state"] == "done"
+    assert doc["response"] == r.json()
+
+    # a failed order drops its claim so the client can retry straight away
+    short = {**payload, "items": [{"product_id": product_id, "qty": "100", "price": "1.00"}]}
+    r = await client.post("/orders/", json=short, headers={**headers, "Idempotency-Key": "lease-fail"})
+    assert r.status_code == 400
+    assert idem.find_one({"key": "lease-fail"}) is None
+
+    # the owner placed its order but never stored the response (cancelled, or
+    # set_response failed); once its lease lapses the retry replays that order
+    r = await client.post("/orders/", json=payload, headers={**headers, "Idempotency-Key": "lease-orphan"})
+    assert r.status_code == 200
+    first = r.json()["order"]
+    idem.update_one(
+        {"key": "lease-orphan"},
+        {"$set": {"state": "processing", "lease_until": now - timedelta(seconds=1)}, "$unset": {"response": ""}},
+    )
+    from repositories.repository_idempotency import _response_cache
+    _response_cache.clear()
+    r = await client.post("/orders/", json=payload, headers={**headers, "Idempotency-Key": "lease-orphan"})
+    assert r.status_code == 200
+    assert r.json()["order"]["id"] == first["id"]
+    assert get_database().get_collection("orders").count_documents({"idempotency_key": "lease-orphan"}) == 1
+    assert idem.find_one({"key": "lease-orphan"})["state"] == "done"
+    # stock went down once for it: 5 - lease-dead - lease-orphan
+    from bson.decimal128 import Decimal128
+    inv = get_database().get_collection("inventory").find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})
+    assert inv["qty"].to_decimal() == Decimal128("3").to_decimal()
+
+
 @pytest.mark.anyio
 async def test_get_order_by_id(client):
     # Register user and login
@@ -131,6 +189,44 @@ async def test_list_orders(client):
     assert len(orders) == 2
 
 
+@pytest.mark.anyio
+async def test_list_orders_keyset(client):
+    await client.post("/auth/register", json={"name":"Keyset","email":"keyset@example.com","username":"keysetuser","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"keysetuser","password":"secret"})
+    token = r.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "20"}, headers=headers)
+    for _ in range(5):
+        payload = {"store_id": store_id, "user_id": str(ObjectId()), "items": [{"product_id": product_id, "qty": "1", "price": "2.00"}]}
+        await client.post("/orders/", json=payload, headers=headers)
+
+    r = await client.get("/orders/?limit=5", headers=headers)
+    expected = [o["id"] for o in r.json()]
+
+    # walk the same listing two at a time through X-Next-Cursor
+    seen = []
+    r = await client.get("/orders/?limit=2", headers=headers)
+    while True:
+        assert r.status_code == 200
+        seen.extend(o["id"] for o in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        r = await client.get(f"/orders/?limit=2&cursor={cursor}", headers=headers)
+    assert seen == expected
+
+    r = await client.get("/orders/?cursor=not-a-cursor", headers=headers)
+    assert r.status_code == 400
+
+    # an offset on top of a cursor would silently drop rows after it
+    cursor = (await client.get("/orders/?limit=2", headers=headers)).headers["X-Next-Cursor"]
+    r = await client.get("/orders/", params={"limit": 2, "cursor": cursor, "skip": 1}, headers=headers)
+    assert r.status_code == 400
+
+
 @pytest.mark.anyio
 async def test_update_order_status(client):
     # Register user and login
@@ -215,3 +311,395 @@ async def test_update_status_flow(client):
     r = await client.patch(f"/orders/{order_id2}/status", json={"status": "cancelled"}, headers=headers)
     assert r.status_code == 200
     assert r.json()["order"]["status"] == "cancelled"
+
+
+@pytest.mark.anyio
+async def test_create_order_insufficient_stock_rolls_back(client):
+    await client.post("/auth/register", json={"name":"Roll","email":"roll@example.com","username":"rolluser","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"rolluser","password":"secret"})
+    token = r.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    store_id = str(ObjectId())
+    product_a = str(ObjectId())
+    product_b = str(ObjectId())
+    product_missing = str(ObjectId())
+
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_a, "delta": "10"}, headers=headers)
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_b, "delta": "1"}, headers=headers)
+
+    # second line exceeds stock: first line must be put back
+    payload = {
+        "store_id": store_id,
+        "user_id": str(ObjectId()),
+        "items": [
+            {"product_id": product_a, "qty": "4", "price": "1.00"},
+            {"product_id": product_b, "qty": "2", "price": "1.00"},
+        ]
+    }
+    r = await client.post("/orders/", json=payload, headers=headers)
+    assert r.status_code == 400
+
+    # line for a product with no inventory doc at all
+    payload["items"] = [
+        {"product_id": product_a, "qty": "4", "price": "1.00"},
+        {"product_id": product_missing, "qty": "1", "price": "1.00"},
+    ]
+    r = await client.post("/orders/", json=payload, headers=headers)
+    assert r.status_code == 400
+
+    # unstocked product between two lines that do apply: both are put back
+    payload["items"] = [
+        {"product_id": product_a, "qty": "4", "price": "1.00"},
+        {"product_id": product_missing, "qty": "1", "price": "1.00"},
+        {"product_id": product_b, "qty": "1", "price": "1.00"},
+    ]
+    r = await client.post("/orders/", json=payload, headers=headers)
+    assert r.status_code == 400
+
+    db = get_database()
+    inv = db.get_collection("inventory")
+    # no placeholder docs are ever written for a missing product
+    assert inv.count_documents({"store_id": ObjectId(store_id)}) == 2
+    assert inv.find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_a)})["qty"].to_decimal() == 10
+    assert inv.find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_b)})["qty"].to_decimal() == 1
+    assert inv.find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_missing)}) is None
+    assert db.get_collection("orders").count_documents({}) == 0
+
+
+@pytest.mark.anyio
+async def test_create_orders_batch(client):
+    await client.post("/auth/register", json={"name":"Batch","email":"batch@example.com","username":"batchuser","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"batchuser","password":"secret"})
+    token = r.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "5"}, headers=headers)
+
+    def entry(key, qty):
+        return {
+            "store_id": store_id,
+            "user_id": str(ObjectId()),
+            "idempotency_key": key,
+            "items": [{"product_id": product_id, "qty": qty, "price": "1.00"}]
+        }
+
+    # 2 + 2 fit, the third (2) does not; the repeated key replays the first entry
+    batch = {"orders": [entry("t1-1", "2"), entry("t1-2", "2"), entry("t1-3", "2"), entry("t1-1", "2")]}
+    r = await client.post("/orders/batch", json=batch, headers=headers)
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["status"] for x in results] == ["created", "created", "failed", "duplicate"]
+    assert results[3]["order"]["id"] == results[0]["order"]["id"]
+
+    db = get_database()
+    doc = db.get_collection("inventory").find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})
+    assert doc["qty"].to_decimal() == 1
+    assert db.get_collection("orders").count_documents({}) == 2
+
+    # Replaying the whole batch creates nothing new; the failed key can be retried
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "1"}, headers=headers)
+    r = await client.post("/orders/batch", json=batch, headers=headers)
+    results = r.json()["results"]
+    assert [x["status"] for x in results] == ["duplicate", "duplicate", "created", "duplicate"]
+    assert db.get_collection("orders").count_documents({}) == 3
+
+
+@pytest.mark.anyio
+async def test_orders_batch_failure_releases_claims(client, monkeypatch):
+    from pymongo.errors import AutoReconnect
+    from repositories.repository_idempotency import RepositoryIdempotency
+
+    await client.post("/auth/register", json={"name":"BFail","email":"bfail@example.com","username":"bfail","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"bfail","password":"secret"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "5"}, headers=headers)
+    batch = {"orders": [
+        {"store_id": store_id, "user_id": str(ObjectId()), "idempotency_key": key, "items": [{"product_id": product_id, "qty": "1", "price": "1.00"}]}
+        for key in ("bf-1", "bf-2")
+    ]}
+
+    async def lost(*args, **kwargs):
+        raise AutoReconnect("connection reset")
+
+    # the orders are placed but their responses cannot be stored
+    monkeypatch.setattr(RepositoryIdempotency, "set_response_many", staticmethod(lost))
+    r = await client.post("/orders/batch", json=batch, headers=headers)
+    assert r.status_code == 500
+    db = get_database()
+    assert db.get_collection("idempotency").count_documents({"key": {"$in": ["bf-1", "bf-2"]}}) == 0
+    monkeypatch.undo()
+
+    # no key is stuck in processing: the retry replays the placed orders
+    r = await client.post("/orders/batch", json=batch, headers=headers)
+    assert [x["status"] for x in r.json()["results"]] == ["duplicate", "duplicate"]
+    assert db.get_collection("orders").count_documents({}) == 2
+    inv = db.get_collection("inventory").find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})
+    assert inv["qty"].to_decimal() == 3
+
+
+@pytest.mark.anyio
+async def test_orders_batch_claim_lease(client):
+    from datetime import datetime, timedelta, timezone
+    from repositories.repository_idempotency import RepositoryIdempotency
+
+    await client.post("/auth/register", json={"name":"BLease","email":"blease@example.com","username":"blease","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"blease","password":"secret"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "5"}, headers=headers)
+
+    def entry(key):
+        return {"store_id": store_id, "user_id": str(ObjectId()), "idempotency_key": key, "items": [{"product_id": product_id, "qty": "1", "price": "1.00"}]}
+
+    now = datetime.now(timezone.utc)
+    idem = get_database().get_collection("idempotency")
+    live = ObjectId()
+    idem.insert_many([
+        {"key": "b-live", "state": "processing", "claim": live, "lease_until": now + timedelta(minutes=5)},
+        {"key": "b-dead", "state": "processing", "claim": ObjectId(), "lease_until": now - timedelta(seconds=1)},
+    ])
+
+    # a dead owner's key is taken over at once; a live one is left alone
+    r = await client.post("/orders/batch", json={"orders": [entry("b-live"), entry("b-dead")]}, headers=headers)
+    assert [x["status"] for x in r.json()["results"]] == ["failed", "created"]
+    assert idem.find_one({"key": "b-live"})["claim"] == live
+    assert idem.find_one({"key": "b-dead"})["state"] == "done"
+
+    # completing or releasing a claim that was taken over touches nothing
+    claims = await RepositoryIdempotency.claim_many(["b-fenced-1", "b-fenced-2"], "/orders/batch", "u")
+    assert set(claims) == {"b-fenced-1", "b-fenced-2"}
+    idem.update_many({"key": {"$in": ["b-fenced-1", "b-fenced-2"]}}, {"$set": {"claim": live}})
+    await RepositoryIdempotency.set_response_many({"b-fenced-1": {"ok": True}}, claims)
+    await RepositoryIdempotency.release_many({"b-fenced-2": claims["b-fenced-2"]})
+    for key in ("b-fenced-1", "b-fenced-2"):
+        doc = idem.find_one({"key": key})
+        assert doc["state"] == "processing" and doc["claim"] == live
+
+
+@pytest.mark.anyio
+async def test_create_order_group_commit(client, monkeypatch):
+    import asyncio
+    from core.config import settings
+    from utils.util_group_commit import GROUP_COMMIT_BATCH_SIZE
+
+    monkeypatch.setattr(settings, "ORDER_GROUP_COMMIT", True)
+    monkeypatch.setattr(settings, "ORDER_GROUP_COMMIT_MAX_LINGER_MS", 20.0)
+
+    await client.post("/auth/register", json={"name":"Group","email":"group@example.com","username":"groupuser","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"groupuser","password":"secret"})
+    token = r.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "4"}, headers=headers)
+
+    payload = {
+        "store_id": store_id,
+        "user_id": str(ObjectId()),
+        "items": [{"product_id": product_id, "qty": "1", "price": "1.00"}]
+    }
+    flushes_before = GROUP_COMMIT_BATCH_SIZE.count(queue="orders")
+    responses = await asyncio.gather(*[client.post("/orders/", json=payload, headers=headers) for _ in range(5)])
+
+    # stock covers 4 of the 5 concurrent orders
+    assert sorted(r.status_code for r in responses) == [200, 200, 200, 200, 400]
+    assert GROUP_COMMIT_BATCH_SIZE.count(queue="orders") > flushes_before
+
+    db = get_database()
+    doc = db.get_collection("inventory").find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})
+    assert doc["qty"].to_decimal() == 0
+    assert db.get_collection("orders").count_documents({}) == 4
+
+
+@pytest.mark.anyio
+async def test_group_commit_unexpected_error_restores_stock(client, monkeypatch):
+    from pymongo.errors import AutoReconnect
+    from models.order import OrderRequest
+    from repositories import repository_order
+    from repositories.repository_inventory import RepositoryInventory
+    from repositories.repository_order import RepositoryOrder
+
+    await client.post("/auth/register", json={"name":"Leak","email":"leak@example.com","username":"leakuser","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"leakuser","password":"secret"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    stores = [str(ObjectId()), str(ObjectId())]
+    product_id = str(ObjectId())
+    for store_id in stores:
+        await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "5"}, headers=headers)
+    entries = [
+        (OrderRequest(store_id=store_id, user_id=ObjectId(), items=[{"product_id": product_id, "qty": "2", "price": "1.00"}]), None)
+        for store_id in stores
+    ]
+
+    # the second store's decrement fails with something other than a stock miss
+    decrement = RepositoryInventory.decrement_many
+    calls = []
+
+    async def flaky_decrement(store_id, lines, session=None, hold=None):
+        calls.append(store_id)
+        if len(calls) == 2:
+            raise AutoReconnect("connection reset")
+        return await decrement(store_id, lines, session=session, hold=hold)
+
+    monkeypatch.setattr(RepositoryInventory, "decrement_many", staticmethod(flaky_decrement))
+    with pytest.raises(AutoReconnect):
+        await RepositoryOrder._commit_group(entries)
+    monkeypatch.setattr(RepositoryInventory, "decrement_many", staticmethod(decrement))
+
+    # every store decremented, then the order insert fails
+    real_get_collection = repository_order.get_collection
+
+    class FailingOrders:
+        async def insert_many(self, *args, **kwargs):
+            raise AutoReconnect("connection reset")
+
+    monkeypatch.setattr(repository_order, "get_collection", lambda name: FailingOrders() if name == "orders" else real_get_collection(name))
+    with pytest.raises(AutoReconnect):
+        await RepositoryOrder._commit_group(entries)
+
+    inv = get_database().get_collection("inventory")
+    for store_id in stores:
+        assert inv.find_one({"store_id": ObjectId(store_id), "product_id": ObjectId(product_id)})["qty"].to_decimal() == 5
+    assert get_database().get_collection("orders").count_documents({}) == 0
+
+
+def test_msgpack_bytes_only_become_ids_in_objectid_fields():
+    from models.order import OrderLine
+    from models.product import ProductRequest
+    from utils.util_msgpack import from_wire
+
+    oid = ObjectId()
+    line = from_wire(OrderLine, {"product_id": oid.binary, "qty": 100, "price": 250})
+    assert line["product_id"] == oid
+    # 12 bytes sent for a plain string field are left for validation, not rewritten to hex
+    product = from_wire(ProductRequest, {"name": b"twelve bytes", "category_id": str(oid)})
+    assert product["name"] == b"twelve bytes"
+
+
+@pytest.mark.anyio
+async def test_order_msgpack(client):
+    import msgpack
+
+    await client.post("/auth/register", json={"name":"Pack","email":"pack@example.com","username":"pack","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"pack","password":"secret"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    store_id = ObjectId()
+    product_id = ObjectId()
+
+    # ids as 12 raw bytes, decimals as cents
+    r = await client.post(
+        f"/stores/{store_id}/inventory/adjust",
+        content=msgpack.packb({"product_id": product_id.binary, "delta": 500}),
+        headers={**headers, "Content-Type": "application/msgpack"},
+    )
+    assert r.status_code == 200
+    assert r.json()["item"]["qty"] == "5.00"
+
+    payload = {"store_id": store_id.binary, "user_id": ObjectId().binary, "items": [{"product_id": product_id.binary, "qty": 200, "price": 350}]}
+    r = await client.post(
+        "/orders/",
+        content=msgpack.packb(payload),
+        headers={**headers, "Content-Type": "application/msgpack", "Accept": "application/msgpack"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/msgpack"
+    order = msgpack.unpackb(r.content, timestamp=3)["order"]
+    assert order["store_id"] == store_id.binary
+    assert order["items"][0]["qty"] == 200
+    assert order["total"] == 700
+
+    r = await client.get(f"/orders/{ObjectId(order['id'])}", headers=headers)
+    assert r.json()["total"] == "7.00"
+
+
+@pytest.mark.anyio
+async def test_raw_list_responses(client, monkeypatch):
+    from core.config import settings
+
+    await client.post("/auth/register", json={"name":"Raw","email":"raw@example.com","username":"rawuser","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"rawuser","password":"secret"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "20"}, headers=headers)
+    for _ in range(3):
+        payload = {"store_id": store_id, "user_id": str(ObjectId()), "items": [{"product_id": product_id, "qty": "1", "price": "2.50"}]}
+        await client.post("/orders/", json=payload, headers=headers)
+    r = await client.post("/categories/", json={"name": "raw", "display_name": "Raw", "sku_prefix": "RAW"}, headers=headers)
+    await client.post("/products/", json={"name": "Tea", "price": "1.50", "category_id": r.json()["id"]}, headers=headers)
+
+    # same bytes and cursors from the stored documents as from the models
+    for url in ("/orders/?limit=2", "/products/?limit=1", "/categories/?limit=1"):
+        monkeypatch.setattr(settings, "RAW_LIST_RESPONSES", False)
+        expected = await client.get(url, headers=headers)
+        monkeypatch.setattr(settings, "RAW_LIST_RESPONSES", True)
+        r = await client.get(url, headers=headers)
+        assert r.status_code == 200
+        assert r.content == expected.content
+        assert r.headers["X-Next-Cursor"] == expected.headers["X-Next-Cursor"]
+
+    # msgpack clients keep the model path
+    r = await client.get("/orders/?limit=2", headers={**headers, "Accept": "application/msgpack"})
+    assert r.headers["content-type"] == "application/msgpack"
+
+
+@pytest.mark.anyio
+async def test_list_orders_summary(client):
+    await client.post("/auth/register", json={"name":"Lean","email":"lean@example.com","username":"leanuser","password":"secret","role":"admin"})
+    r = await client.post("/auth/login", data={"username":"leanuser","password":"secret"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    store_id = str(ObjectId())
+    product_id = str(ObjectId())
+    await client.post(f"/stores/{store_id}/inventory/adjust", json={"product_id": product_id, "delta": "20"}, headers=headers)
+    for _ in range(3):
+        payload = {"store_id": store_id, "user_id": str(ObjectId()), "items": [{"product_id": product_id, "qty": "2", "price": "1.25"}]}
+        await client.post("/orders/", json=payload, headers=headers)
+
+    full = (await client.get(f"/orders/?store_id={store_id}", headers=headers)).json()
+    r = await client.get(f"/orders/?store_id={store_id}&fields=summary&limit=2", headers=headers)
+    assert r.status_code == 200
+    summary = r.json()
+    assert set(summary[0]) == {"id", "store_id", "status", "total", "created_at"}
+    assert summary[0]["total"] == "2.50"
+    assert [o["id"] for o in summary] == [o["id"] for o in full[:2]]
+
+    # the cursor continues the summary listing
+    r = await client.get(f"/orders/?store_id={store_id}&fields=summary&limit=2&cursor={r.headers['X-Next-Cursor']}", headers=headers)
+    assert [o["id"] for o in r.json()] == [full[2]["id"]]
+
+    r = await client.get("/orders/?fields=everything", headers=headers)
+    assert r.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_group_commit_close_fails_pending():
+    import asyncio
+    from utils.util_group_commit import GroupCommitQueue
+
+    started = asyncio.Event()
+
+    async def flush(items):
+        started.set()
+        await asyncio.sleep(3600)
+        return items
+
+    queue = GroupCommitQueue("test", flush, max_batch=1, max_linger_ms=0)
+    # the first item is mid-flush when the queue closes, the second still queued
+    first = asyncio.ensure_future(queue.submit(1))
+    await started.wait()
+    second = asyncio.ensure_future(queue.submit(2))
+    await asyncio.sleep(0)
+    await queue.close()
+    for fut in (first, second):
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(fut, 1)
+    with pytest.raises(RuntimeError):
+        await queue.submit(3)
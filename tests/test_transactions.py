@@ -0,0 +1,106 @@
+import pytest
+from pymongo.errors import OperationFailure, PyMongoError
+
+from db import mongo
+
+
+def labelled(label: str) -> PyMongoError:
+    err = OperationFailure("boom")
+    err._add_error_label(label)
+    return err
+
+
+class FakeSession:
+    """Just enough of a client session for run_in_transaction; `commit_errors` are raised in order."""
+
+    def __init__(self, commit_errors=()):
+        self.commit_errors = list(commit_errors)
+        self.in_transaction = False
+        self.started = self.aborted = self.committed = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def start_transaction(self, **kwargs):
+        self.in_transaction = True
+        self.started += 1
+
+    async def abort_transaction(self):
+        self.in_transaction = False
+        self.aborted += 1
+
+    async def commit_transaction(self):
+        if self.commit_errors:
+            raise self.commit_errors.pop(0)
+        self.in_transaction = False
+        self.committed += 1
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    def install(**kwargs):
+        session = FakeSession(**kwargs)
+
+        async def start_session():
+            return session
+
+        monkeypatch.setattr(mongo, "start_session", start_session)
+        monkeypatch.setattr(mongo, "TXN_STATS", {"commits": 0, "aborts": 0, "retries": 0})
+        return session
+
+    return install
+
+
+def failing(*errors):
+    """Callback raising `errors` in turn, then returning "ok"."""
+    pending = list(errors)
+
+    async def callback(session):
+        if pending:
+            raise pending.pop(0)
+        return "ok"
+
+    return callback
+
+
+@pytest.mark.anyio
+async def test_transient_error_is_retried_without_counting_an_abort(fake_session):
+    session = fake_session()
+    assert await mongo.run_in_transaction(failing(labelled("TransientTransactionError")), max_attempts=3) == "ok"
+    assert session.started == 2 and session.aborted == 1 and session.committed == 1
+    assert mongo.TXN_STATS == {"commits": 1, "aborts": 0, "retries": 1}
+
+
+@pytest.mark.anyio
+async def test_unknown_commit_result_retries_the_commit(fake_session):
+    session = fake_session(commit_errors=[labelled("UnknownTransactionCommitResult")] * 2)
+    assert await mongo.run_in_transaction(failing(), max_attempts=3) == "ok"
+    assert session.started == 1 and session.committed == 1
+    assert mongo.TXN_STATS == {"commits": 1, "aborts": 0, "retries": 2}
+
+
+@pytest.mark.anyio
+async def test_gives_up_after_max_attempts_with_one_abort(fake_session):
+    session = fake_session()
+    errors = [labelled("TransientTransactionError") for _ in range(3)]
+    with pytest.raises(OperationFailure):
+        await mongo.run_in_transaction(failing(*errors), max_attempts=3)
+    assert session.started == 3 and session.aborted == 3 and session.committed == 0
+    assert mongo.TXN_STATS == {"commits": 0, "aborts": 1, "retries": 2}
+
+    session = fake_session(commit_errors=[labelled("UnknownTransactionCommitResult")] * 3)
+    with pytest.raises(OperationFailure):
+        await mongo.run_in_transaction(failing(), max_attempts=3)
+    assert mongo.TXN_STATS == {"commits": 0, "aborts": 1, "retries": 2}
+
+
+@pytest.mark.anyio
+async def test_other_errors_abort_once_without_retry(fake_session):
+    session = fake_session()
+    with pytest.raises(ValueError):
+        await mongo.run_in_transaction(failing(ValueError("bad")), max_attempts=3)
+    assert session.started == 1 and session.aborted == 1
+    assert mongo.TXN_STATS == {"commits": 0, "aborts": 1, "retries": 0}
@@ -9,12 +9,15 @@ from functools import wraps
 from fastapi import HTTPException
 from loguru import logger
 
+from utils.util_request_context import mark_handler_done
+
 
 def handle_repo_errors(func):
     """
     Decorator to catch repository exceptions and convert them to HTTP exceptions.
     
     Error mappings:
+    - HTTPException: re-raised unchanged (the handler chose the status)
     - ValueError: 400 Bad Request (client error)
     - KeyError: 404 Not Found (resource not found)
     - Exception: 500 Internal Server Error (unexpected errors)
@@ -28,7 +31,13 @@ def handle_repo_errors(func):
     @wraps(func)
     async def wrapper(*args, **kwargs):
         try:
-            return await func(*args, **kwargs)
+            result = await func(*args, **kwargs)
+            # what follows (response_model validation, encoding) is Server-Timing `ser`
+            mark_handler_done()
+            return result
+        except HTTPException:
+            # raised deliberately by the handler (404, 409, 503...): pass through as is
+            raise
         except ValueError as e:
             # Business logic error - client should fix their request
             logger.warning(f"ValueError in {func.__name__}: {str(e)}")
@@ -1,7 +1,10 @@
-from decimal import Decimal
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP
 import json
-from functools import lru_cache
-from typing import Any, TypeVar
+import struct
+from functools import lru_cache, total_ordering
+from types import UnionType
+from typing import Any, Callable, List, TypeVar, Union, get_args, get_origin
 from bson.regex import Regex as BsonRegex
 from bson.objectid import ObjectId as BsonObjectId
 from bson.timestamp import Timestamp as BsonTimestamp
@@ -11,6 +14,9 @@ from pydantic import BaseModel as _BaseModel, ConfigDict, Field, GetJsonSchemaHa
 from pydantic_core import core_schema
 from pydantic.json_schema import JsonSchemaValue
 from base64 import standard_b64encode
+from loguru import logger
+
+from core.config import settings
 
 class ObjectId(BsonObjectId):
 
@@ -48,12 +54,6 @@ class ObjectId(BsonObjectId):
             ]
         )
 
-        def serialize(value: Any, info: core_schema.SerializationInfo) -> str | ObjectId:
-            if info.mode == 'json':
-                return str(value)
-            else:
-                return ObjectId(value)
-
         return core_schema.json_or_python_schema(
             json_schema=from_str_schema,
             python_schema=core_schema.union_schema(
@@ -65,11 +65,9 @@ class ObjectId(BsonObjectId):
                 custom_error_message="Bukan object Id",
                 custom_error_type=ObjectId.invalid_object_id
             ),
-            serialization=core_schema.plain_serializer_function_ser_schema(
-                serialize,
-                info_arg=True,
-                when_used='always',
-            ),
+            # str() in JSON mode without a Python callback (hot in every response);
+            # python mode keeps the validated ObjectId for BSON
+            serialization=core_schema.to_string_ser_schema(when_used='json'),
             ref="ObjectId"
         )
     
@@ -126,8 +124,9 @@ class Decimal128(BsonDecimal128):
                 custom_error_type="InvalidDecimal"
             ),
             serialization=core_schema.plain_serializer_function_ser_schema(
-                lambda instance: Decimal128.decimal_encoder(instance),
-                when_used="json"
+                Decimal128.serialize,
+                info_arg=True,
+                when_used="always"
             )
         )
 
@@ -144,12 +143,20 @@ class Decimal128(BsonDecimal128):
         )
         return json_schema
     
+    @staticmethod
+    def serialize(value: Any, info: core_schema.SerializationInfo) -> Any:
+        if info.mode == 'json':
+            return Decimal128.decimal_encoder(value)
+        if info.context is MSGPACK_CONTEXT:
+            return MsgpackDecimalEncode(value)
+        return value
+
     @staticmethod
     def decimal_encoder(val: 'Decimal128 | BsonDecimal128 | int | float | Decimal') -> Decimal:
         """Encode Decimal128/BsonDecimal128 or numeric types to Decimal for JSON serialization."""
         try:
-            # BsonDecimal128 and Decimal128 have to_decimal()
-            if hasattr(val, "to_decimal"):
+            # BsonDecimal128, Decimal128 and Fixed have to_decimal()
+            if isinstance(val, (BsonDecimal128, Fixed)):
                 return val.to_decimal()
             # Decimal or numeric types
             if isinstance(val, Decimal):
@@ -162,6 +169,214 @@ class Decimal128(BsonDecimal128):
             # As a last resort, raise a clear error
             raise TypeError(f"Cannot encode value {val!r} as Decimal: {err}")
 
+_UNPACK_BID = struct.Struct("<QQ").unpack
+
+# model_dump context of utils/util_msgpack.packb
+MSGPACK_CONTEXT: dict[str, Any] = {"wire": "msgpack"}
+
+@total_ordering
+class Fixed:
+    """
+    Exact fixed-point number with 2 decimal places held as an int of minor units
+    (Fixed("1.50").units == 150). Used for money and quantities on hot paths so
+    arithmetic is plain int math; it becomes Decimal128 only at the BSON boundary
+    (python-mode dump) and a decimal string at the JSON boundary.
+
+    Rounding rules:
+    - client input with more than 2 decimal places is rejected, like Decimal128 (16:2)
+    - values read from BSON with more than 2 places are rounded half away from zero
+    - Fixed * Fixed (qty * price) is rounded half away from zero to 2 places
+    """
+
+    __slots__ = ("units",)
+    SCALE = 2
+    FACTOR = 100
+    MAX_UNITS = 10 ** 18
+
+    def __init__(self, value: 'Fixed | Decimal | BsonDecimal128 | int | float | str' = 0) -> None:
+        if isinstance(value, Fixed):
+            self.units = value.units
+        else:
+            self.units = Fixed.parse(value).units
+
+    @classmethod
+    def from_units(cls, units: int) -> 'Fixed':
+        obj = cls.__new__(cls)
+        obj.units = units
+        return obj
+
+    @classmethod
+    def from_decimal(cls, value: Decimal, exact: bool = True) -> 'Fixed':
+        if not value.is_finite():
+            raise ValueError("Value must be finite")
+        scaled = value.scaleb(cls.SCALE)
+        units = int(scaled)
+        if units != scaled:
+            if exact:
+                raise ValueError(f"At most {cls.SCALE} decimal places allowed")
+            units = int(scaled.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        if abs(units) >= cls.MAX_UNITS:
+            raise ValueError("Value exceeds 18 digits")
+        return cls.from_units(units)
+
+    @classmethod
+    def from_bson(cls, value: BsonDecimal128) -> 'Fixed':
+        """
+        Stored Decimal128 read straight from its BID bits, without building a
+        Decimal; same result as from_decimal(value.to_decimal(), exact=False).
+        """
+        low, high = _UNPACK_BID(value.bid)
+        if (high >> 61) & 3 == 3:
+            # NaN, infinity or the large-coefficient form: never written by us
+            return cls.from_decimal(value.to_decimal(), exact=False)
+        coefficient = ((high & 0x1FFFFFFFFFFFF) << 64) | low
+        shift = ((high >> 49) & 0x3FFF) - 6176 + cls.SCALE
+        if coefficient == 0:
+            return cls.from_units(0)
+        if shift >= 0:
+            if shift > 18:
+                raise ValueError("Value exceeds 18 digits")
+            units = coefficient * 10 ** shift
+        elif shift < -40:
+            units = 0
+        else:
+            divisor = 10 ** -shift
+            units, rem = divmod(coefficient, divisor)
+            if rem * 2 >= divisor:
+                units += 1
+        if units >= cls.MAX_UNITS:
+            raise ValueError("Value exceeds 18 digits")
+        return cls.from_units(-units if high >> 63 else units)
+
+    @classmethod
+    def parse(cls, value: Any) -> 'Fixed':
+        if isinstance(value, Fixed):
+            return value
+        if isinstance(value, bool):
+            raise TypeError("Boolean is not a number")
+        if isinstance(value, int):
+            return cls.from_decimal(Decimal(value))
+        if isinstance(value, BsonDecimal128):
+            return cls.from_bson(value)
+        if isinstance(value, Decimal):
+            return cls.from_decimal(value)
+        if isinstance(value, float):
+            return cls.from_decimal(Decimal(repr(value)))
+        if isinstance(value, str):
+            return cls.from_decimal(Decimal(value.strip()))
+        raise TypeError(f"Cannot convert {type(value).__name__} to Fixed")
+
+    @staticmethod
+    def _units_of(other: Any) -> int:
+        if isinstance(other, Fixed):
+            return other.units
+        if isinstance(other, int) and not isinstance(other, bool):
+            return other * Fixed.FACTOR
+        return Fixed.parse(other).units
+
+    def __add__(self, other: Any) -> 'Fixed':
+        return Fixed.from_units(self.units + Fixed._units_of(other))
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Any) -> 'Fixed':
+        return Fixed.from_units(self.units - Fixed._units_of(other))
+
+    def __rsub__(self, other: Any) -> 'Fixed':
+        return Fixed.from_units(Fixed._units_of(other) - self.units)
+
+    def __neg__(self) -> 'Fixed':
+        return Fixed.from_units(-self.units)
+
+    def __abs__(self) -> 'Fixed':
+        return Fixed.from_units(abs(self.units))
+
+    def __mul__(self, other: Any) -> 'Fixed':
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Fixed.from_units(self.units * other)
+        product = self.units * Fixed._units_of(other)
+        q, r = divmod(abs(product), Fixed.FACTOR)
+        if r * 2 >= Fixed.FACTOR:
+            q += 1
+        return Fixed.from_units(q if product >= 0 else -q)
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other: Any) -> bool:
+        # only numbers that hash by value like __hash__ does (not str, float or
+        # bson Decimal128), so equal objects share a hash in dicts and sets
+        if isinstance(other, Fixed):
+            return self.units == other.units
+        if isinstance(other, (int, Decimal)) and not isinstance(other, bool):
+            return self.to_decimal() == other
+        return NotImplemented
+
+    def __lt__(self, other: Any) -> bool:
+        return self.units < Fixed._units_of(other)
+
+    def __hash__(self) -> int:
+        # the numeric hash, same as the equal int or Decimal
+        q, r = divmod(self.units, Fixed.FACTOR)
+        return hash(q) if r == 0 else hash(self.to_decimal())
+
+    def __bool__(self) -> bool:
+        return self.units != 0
+
+    def __str__(self) -> str:
+        q, r = divmod(abs(self.units), Fixed.FACTOR)
+        return f"{'-' if self.units < 0 else ''}{q}.{r:02d}"
+
+    def __repr__(self) -> str:
+        return f"Fixed('{self}')"
+
+    def __float__(self) -> float:
+        return self.units / Fixed.FACTOR
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.units).scaleb(-Fixed.SCALE)
+
+    def to_bson(self) -> BsonDecimal128:
+        return BsonDecimal128(self.to_decimal())
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, *args, **kwargs
+    ) -> core_schema.CoreSchema:
+
+        def validate(v: Any) -> Fixed:
+            try:
+                return Fixed.parse(v)
+            except (TypeError, ValueError, ArithmeticError):
+                raise ValueError("Format angka tidak didukung (16:2)")
+
+        def serialize(value: 'Fixed', info: core_schema.SerializationInfo) -> str | int | BsonDecimal128:
+            if info.mode == 'json':
+                return str(value)
+            if info.context is MSGPACK_CONTEXT:
+                # skip the Decimal128 round trip; msgpack wants scaled ints anyway
+                return value.units
+            return value.to_bson()
+
+        return core_schema.no_info_plain_validator_function(
+            validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                serialize,
+                info_arg=True,
+                when_used='always',
+            ),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(
+        cls, _core_schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler
+    ) -> JsonSchemaValue:
+        return {
+            "type": "string",
+            "description": "Decimal String 16:2",
+            "examples": ["123456.45"],
+            "example": "123456.45",
+        }
+
 class BaseModel(_BaseModel):
     model_config = ConfigDict(
         populate_by_name=True,
@@ -174,36 +389,22 @@ class BaseModel(_BaseModel):
         return {s if m.alias is None else m.alias: 1 for s, m in cls.model_fields.items()}
     
     @classmethod
-    def model_validate(
-        cls,
-        obj: Any,
-        *,
-        strict: bool | None = None,
-        from_attributes: bool | None = None,
-        context: dict[str, Any] | None = None,
-    ) -> 'BaseModel':
-        try:
-            ret = super().model_validate(obj, strict=strict, from_attributes=from_attributes, context=context)
-            return ret
-        except Exception as err:
-            print("model_validate error:", err)
-            raise err
-        
-    @classmethod
-    def model_validate_json(
-        cls,
-        json_data: str | bytes | bytearray,
-        *,
-        strict: bool | None = None,
-        context: dict[str, Any] | None = None,
-    ) -> 'BaseModel':
-        try:
-            ret = super().model_validate_json(json_data, strict=strict, context=context)
-            return ret
-        except Exception as err:
-            print("model_validate_json error:", err)
-            raise err
-        
+    def FromDb(cls, doc: dict[str, Any]) -> Any:
+        """
+        Trusted construction for documents read from our own collections: fields
+        are looked up by alias or name and only converted where the stored type
+        differs from the model's (Decimal128 -> Fixed, nested models, lists);
+        validators do not run. Documents missing a required field, models with
+        nothing to convert in Python, and every document while
+        TRUSTED_READS_VERIFY is on, go through model_validate.
+        """
+        plan = _trusted_plan(cls)
+        if plan is None:
+            return cls.model_validate(doc)
+        if settings.TRUSTED_READS_VERIFY:
+            return _verified(cls, doc, plan)
+        return _construct(cls, doc, plan)
+
     def MsJsonString(self) -> str:
         d = self.model_dump(mode="json")
         return json.dumps(
@@ -213,6 +414,113 @@ class BaseModel(_BaseModel):
             separators=None
         )
 
+_REQUIRED = object()
+_object_setattr = object.__setattr__
+
+
+def _to_object_id(v: Any) -> Any:
+    # a stored bson ObjectId is used as is (it serializes the same); None gets a
+    # fresh id exactly like the validator gives it
+    return ObjectId() if v is None else v
+
+
+def _to_fixed(v: Any) -> Fixed:
+    return Fixed.from_bson(v) if type(v) is BsonDecimal128 else Fixed.parse(v)
+
+
+def _trusted_converter(tp: Any) -> Callable[[Any], Any] | None:
+    """Conversion from the stored BSON value to the field type; None when it is used as is."""
+    origin = get_origin(tp)
+    if origin in (Union, UnionType):
+        args = [a for a in get_args(tp) if a is not type(None)]
+        inner = _trusted_converter(args[0]) if len(args) == 1 else None
+        if inner is None:
+            return None
+        return lambda v: None if v is None else inner(v)
+    if origin in (list, List):
+        args = get_args(tp)
+        inner = _trusted_converter(args[0]) if args else None
+        if inner is None:
+            return None
+        return lambda v: [x if x is None else inner(x) for x in v]
+    if tp is Fixed:
+        return _to_fixed
+    if tp is ObjectId:
+        return _to_object_id
+    if isinstance(tp, type) and issubclass(tp, BaseModel):
+        plan = _trusted_plan(tp)
+        if plan is None:
+            return tp.model_validate
+        return lambda v: _construct(tp, v, plan)
+    if isinstance(tp, type) and issubclass(tp, _BaseModel):
+        return tp.model_validate
+    return None
+
+
+@lru_cache(maxsize=None)
+def _trusted_plan(cls: type) -> tuple | None:
+    """Per field: (name, keys to look up, converter, default factory or _REQUIRED); None if unsupported."""
+    if cls.model_config.get("extra") == "allow" or cls.__pydantic_decorators__.model_validators or cls.__private_attributes__:
+        # extra fields, private attributes and model validators (which may
+        # reshape the input) need the real thing
+        return None
+    plan = []
+    for name, field in cls.model_fields.items():
+        keys = tuple(dict.fromkeys(k for k in (field.validation_alias, field.alias, name) if isinstance(k, str)))
+        if field.is_required():
+            default = _REQUIRED
+        else:
+            default = (lambda f: lambda: f.get_default(call_default_factory=True))(field)
+        plan.append((name, keys, _trusted_converter(field.annotation), default))
+    if all(convert is None or convert is _to_object_id for _, _, convert, _ in plan):
+        # nothing converted in Python: pydantic-core builds plain fields faster
+        # than a Python loop does
+        return None
+    return tuple(plan)
+
+
+def _construct(cls: Any, doc: dict[str, Any], plan: tuple) -> Any:
+    values: dict[str, Any] = {}
+    defaulted = None
+    get = doc.get
+    for name, keys, convert, default in plan:
+        for key in keys:
+            v = get(key, _REQUIRED)
+            if v is not _REQUIRED:
+                values[name] = v if convert is None else convert(v)
+                break
+        else:
+            if default is _REQUIRED:
+                # not one of ours after all: let validation report it
+                return cls.model_validate(doc)
+            values[name] = default()
+            defaulted = defaulted or []
+            defaulted.append(name)
+    fields_set = set(values)
+    if defaulted:
+        fields_set.difference_update(defaulted)
+    # what model_construct does, minus its second pass over the fields
+    model = cls.__new__(cls)
+    _object_setattr(model, "__dict__", values)
+    _object_setattr(model, "__pydantic_fields_set__", fields_set)
+    _object_setattr(model, "__pydantic_extra__", None)
+    _object_setattr(model, "__pydantic_private__", None)
+    return model
+
+
+def _verified(cls: Any, doc: dict[str, Any], plan: tuple) -> Any:
+    """TRUSTED_READS_VERIFY: full validation, logging any difference from the trusted build."""
+    model = cls.model_validate(doc)
+    try:
+        trusted = _construct(cls, doc, plan)
+        mismatch = trusted.model_dump() != model.model_dump()
+    except Exception as err:
+        mismatch = err
+    if mismatch:
+        logger.warning(f"{cls.__name__}.FromDb differs from model_validate: {mismatch}")
+    return model
+
+
 class BaseModelObjectId(BaseModel):
     id: ObjectId = Field(
         default=...,
@@ -246,6 +554,45 @@ ENCODERS_BY_TYPE[BsonRegex] = BsonRegexEncode
 ENCODERS_BY_TYPE[bytes] = Byte_Encode
 ENCODERS_BY_TYPE[Decimal128] = Decimal128.decimal_encoder
 ENCODERS_BY_TYPE[BsonDecimal128] = Decimal128.decimal_encoder
+ENCODERS_BY_TYPE[Fixed] = str
+
+def MsgpackObjectIdEncode(o: BsonObjectId) -> bytes:
+    return o.binary
+
+def MsgpackDecimalEncode(d: 'Fixed | BsonDecimal128 | Decimal') -> int:
+    if isinstance(d, Fixed):
+        return d.units
+    return Fixed.from_decimal(Decimal128.decimal_encoder(d), exact=False).units
+
+def MsgpackDatetimeEncode(dt: datetime) -> datetime:
+    # Mongo hands back naive UTC datetimes; msgpack's timestamp needs them aware
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+def MsgpackObjectIdDecode(v: Any) -> Any:
+    return ObjectId(v) if isinstance(v, bytes) else v
+
+def MsgpackDecimalDecode(v: Any) -> Any:
+    # the decimal string a JSON client would have sent
+    return str(Fixed.from_units(v)) if isinstance(v, int) and not isinstance(v, bool) else v
+
+# MessagePack wire forms (utils/util_msgpack.py): ObjectIds as their 12 raw
+# bytes, decimals as ints scaled by Fixed.FACTOR. Types missing here fall back
+# to ENCODERS_BY_TYPE.
+MSGPACK_ENCODERS_BY_TYPE: dict[type, Callable[[Any], Any]] = {
+    ObjectId: MsgpackObjectIdEncode,
+    BsonObjectId: MsgpackObjectIdEncode,
+    Fixed: MsgpackDecimalEncode,
+    Decimal128: MsgpackDecimalEncode,
+    BsonDecimal128: MsgpackDecimalEncode,
+    Decimal: MsgpackDecimalEncode,
+    datetime: MsgpackDatetimeEncode,
+}
+# and back, keyed by the annotated type of the request body field
+MSGPACK_DECODERS_BY_TYPE: dict[type, Callable[[Any], Any]] = {
+    ObjectId: MsgpackObjectIdDecode,
+    Fixed: MsgpackDecimalDecode,
+    Decimal128: MsgpackDecimalDecode,
+}
 
 TBaseModelObjectId = TypeVar("TBaseModelObjectId", bound=BaseModelObjectId)
 TGenericBaseModel = TypeVar("TGenericBaseModel", bound=BaseModel)
@@ -119,6 +119,57 @@ class Pagination2(BaseModel):
             page=page
         )
     
+class KeysetPagination(BaseModel):
+    sortby: str = Field(
+        default="_id",
+        max_length=50,
+        examples=["_id"]
+    )
+    size: int = Field(
+        default=100,
+        ge=1,
+        le=100,
+        description="Jumlah item per halaman"
+    )
+    order: QuerySortingOrder = Field(
+        default=QuerySortingOrder.Ascending,
+        description="Urutan"
+    )
+    cursor: str | None = Field(
+        default=None,
+        description="Cursor dari halaman sebelumnya (`next_cursor`); kosong untuk halaman pertama"
+    )
+
+    @classmethod
+    def QueryParam(
+        cls,
+        size: int = Query(
+            default=10,
+            ge=1,
+            le=100,
+            description="Jumlah item per halaman"
+        ),
+        sortby: str = Query(
+            default="_id",
+            max_length=50,
+            description="Urutkan berdasarkan nama kolom"
+        ),
+        order: QuerySortingOrder = Query(
+            default=QuerySortingOrder.Ascending,
+            description="Urutan"
+        ),
+        cursor: str | None = Query(
+            default=None,
+            description="Cursor dari halaman sebelumnya"
+        )
+    ):
+        return cls(
+            size=size,
+            sortby=sortby,
+            order=order,
+            cursor=cursor
+        )
+
 TGenericPaginationModel = TypeVar("TGenericPaginationModel", bound=BaseModel) # must derived from BaseModel
     
 class PaginationResult(BaseModel, Generic[TGenericPaginationModel]):
@@ -180,3 +231,28 @@ class PaginationResult2(BaseModel, Generic[TGenericPaginationModel]):
         description="Daftar item"
     )
 
+class KeysetPaginationResult(BaseModel, Generic[TGenericPaginationModel]):
+
+    size: int = Field(
+        default=...,
+        description="Jumlah item per halaman",
+        examples=[100]
+    )
+    sortby: str = Field(
+        default="_id",
+        description="Urutkan berdasarkan nama kolom",
+        examples=["_id"]
+    )
+    order: QuerySortingOrder = Field(
+        default=QuerySortingOrder.Ascending,
+        description="Urutan",
+        examples=[QuerySortingOrder.Ascending]
+    )
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Cursor untuk halaman berikutnya. `null` jika tidak ada halaman lagi"
+    )
+    items: List[TGenericPaginationModel] = Field(
+        default=...,
+        description="Daftar item"
+    )
@@ -0,0 +1,124 @@
+"""
+Group commit: callers submit items one at a time, a single worker task
+collects everything that arrives within `max_linger_ms` (up to `max_batch`)
+and hands the group to one `flush` call. Each caller's future is resolved
+with its own entry of the flush result (a value, or an exception to raise).
+"""
+import asyncio
+import contextvars
+import time
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Tuple, TypeVar
+
+from loguru import logger
+
+from utils.util_metrics import Histogram
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+GROUP_COMMIT_BATCH_SIZE = Histogram(
+    "pos_group_commit_batch_size",
+    "Items committed per group-commit flush",
+    ["queue"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+GROUP_COMMIT_QUEUE_WAIT = Histogram(
+    "pos_group_commit_queue_wait_seconds",
+    "Time an item waited in the group-commit queue before its flush started",
+    ["queue"],
+)
+GROUP_COMMIT_FLUSH = Histogram(
+    "pos_group_commit_flush_seconds",
+    "Duration of a group-commit flush",
+    ["queue"],
+)
+
+
+class GroupCommitQueue(Generic[T, R]):
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[List[T]], Awaitable[List[Any]]],
+        max_batch: int,
+        max_linger_ms: float,
+    ) -> None:
+        self.name = name
+        self._flush = flush
+        self.max_batch = max(1, max_batch)
+        self.max_linger = max(0.0, max_linger_ms) / 1000
+        self._queue: "asyncio.Queue[Tuple[T, asyncio.Future, float]]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def submit(self, item: T) -> R:
+        if self._closed:
+            raise RuntimeError(f"Group commit queue {self.name} is closed")
+        if self._worker is None or self._worker.done():
+            # fresh context: the worker outlives the request that happened to start it
+            self._worker = contextvars.Context().run(asyncio.create_task, self._run())
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut, time.perf_counter()))
+        return await fut
+
+    async def _collect(self, batch: List[Tuple[T, asyncio.Future, float]]) -> None:
+        # fills the caller's list, so items already taken are not lost if cancelled here
+        batch.append(await self._queue.get())
+        deadline = time.perf_counter() + self.max_linger
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # take whatever is already waiting without lingering further
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    @staticmethod
+    def _resolve(batch: List[Tuple[T, asyncio.Future, float]], results: List[Any]) -> None:
+        for (_, fut, _), result in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(result, BaseException):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    async def _run(self) -> None:
+        while True:
+            batch: List[Tuple[T, asyncio.Future, float]] = []
+            try:
+                await self._collect(batch)
+                started = time.perf_counter()
+                GROUP_COMMIT_BATCH_SIZE.observe(len(batch), queue=self.name)
+                for _, _, enqueued in batch:
+                    GROUP_COMMIT_QUEUE_WAIT.observe(started - enqueued, queue=self.name)
+                try:
+                    results = await self._flush([item for item, _, _ in batch])
+                except Exception as err:
+                    logger.error(f"Group commit flush failed for {self.name}: {err}")
+                    results = [err] * len(batch)
+                GROUP_COMMIT_FLUSH.observe(time.perf_counter() - started, queue=self.name)
+            except BaseException:
+                # cancelled mid-collect or mid-flush: the outcome of a started
+                # flush is unknown, so callers get an error rather than hanging
+                self._resolve(batch, [RuntimeError(f"Group commit queue {self.name} was cancelled")] * len(batch))
+                raise
+            self._resolve(batch, results)
+
+    async def close(self) -> None:
+        """Stop the worker and fail every item still queued or mid-flush; later submits raise."""
+        self._closed = True
+        worker, self._worker = self._worker, None
+        if worker is not None and not worker.done():
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._resolve(pending, [RuntimeError(f"Group commit queue {self.name} is closed")] * len(pending))
@@ -1,3 +1,4 @@
+from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Any
 
 from pymongo import AsyncMongoClient
@@ -26,4 +27,12 @@ else:
     TMongoCursor = AsyncCursor
     TMongoCommandCursor = AsyncCommandCursor
     TMongoChangeStream = AsyncChangeStream
-    TMongoClientEncryption = AsyncClientEncryption
\ No newline at end of file
+    TMongoClientEncryption = AsyncClientEncryption
+
+def mongo_now() -> datetime:
+    """
+    Current UTC time as the client reads it back (tz_aware=False): naive, truncated
+    to milliseconds. Stamps returned straight from a create then match a later GET.
+    """
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000, tzinfo=None)
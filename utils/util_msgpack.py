@@ -0,0 +1,141 @@
+"""
+MessagePack for POS terminals: responses for `Accept: application/msgpack`
+(see util_response.negotiate) and request bodies sent with
+`Content-Type: application/msgpack` (MsgpackRoute).
+
+Wire forms come from MSGPACK_ENCODERS_BY_TYPE / MSGPACK_DECODERS_BY_TYPE in
+utils/models/model_data_type.py: ObjectIds travel as 12 raw bytes, decimals as
+integers scaled by 100 (cents), datetimes as msgpack timestamps. Only fields
+annotated ObjectId take the raw bytes; ids kept as plain `str` fields
+(ProductRequest.category_id) are sent as hex strings, as in JSON.
+"""
+import types
+from typing import Any, Callable, Optional, Union, get_args, get_origin
+
+import msgpack
+from fastapi.encoders import ENCODERS_BY_TYPE
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic import BaseModel as _BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from utils.models.model_data_type import MSGPACK_CONTEXT, MSGPACK_DECODERS_BY_TYPE, MSGPACK_ENCODERS_BY_TYPE
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _media_types(header: Optional[str]) -> list[str]:
+    """Media ranges of a Content-Type/Accept header, without params and q=0 entries."""
+    out = []
+    for part in (header or "").split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        q = next((p.split("=", 1)[1] for p in params if p.replace(" ", "").startswith("q=")), "1")
+        try:
+            if float(q) <= 0:
+                continue
+        except ValueError:
+            pass
+        out.append(media.lower())
+    return out
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    return any(m in _MSGPACK_TYPES for m in _media_types(content_type))
+
+
+def _default(value: Any) -> Any:
+    for cls in type(value).__mro__:
+        encoder = MSGPACK_ENCODERS_BY_TYPE.get(cls) or ENCODERS_BY_TYPE.get(cls)
+        if encoder is not None:
+            return encoder(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not msgpack serializable")
+
+
+def _plain(content: Any, by_alias: bool) -> Any:
+    # python-mode dumps keep ObjectId/Decimal128/datetime for _default to encode
+    if isinstance(content, _BaseModel):
+        return content.model_dump(by_alias=by_alias, context=MSGPACK_CONTEXT)
+    if isinstance(content, dict):
+        return {k: _plain(v, by_alias) for k, v in content.items()}
+    if isinstance(content, (list, tuple)):
+        return [_plain(v, by_alias) for v in content]
+    return content
+
+
+def packb(content: Any, by_alias: bool = True) -> bytes:
+    """Encode `content` (pydantic models at any depth) in the msgpack wire forms."""
+    return msgpack.packb(_plain(content, by_alias), default=_default, datetime=True, use_bin_type=True)
+
+
+def from_wire(annotation: Any, value: Any) -> Any:
+    """
+    Turn decoded msgpack into what a JSON client would have sent for
+    `annotation`: 12-byte ids in ObjectId fields become ObjectIds, scaled ints in
+    decimal fields become decimal strings. Walks models, lists and Optionals.
+    """
+    if value is None:
+        return None
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        return from_wire(args[0], value) if len(args) == 1 else value
+    if origin in (list, tuple, set) and isinstance(value, list):
+        args = get_args(annotation)
+        return [from_wire(args[0] if args else Any, v) for v in value]
+    if isinstance(annotation, type) and issubclass(annotation, _BaseModel) and isinstance(value, dict):
+        out = dict(value)
+        for name, field in annotation.model_fields.items():
+            for key in (field.alias, name):
+                if key and key in out:
+                    out[key] = from_wire(field.annotation, out[key])
+                    break
+        return out
+    decoder: Optional[Callable[[Any], Any]] = MSGPACK_DECODERS_BY_TYPE.get(annotation)
+    return decoder(value) if decoder is not None else value
+
+
+class _DecodedRequest(Request):
+    """The request as FastAPI should see it: a JSON body already parsed."""
+
+    def __init__(self, request: Request, raw: bytes, data: Any) -> None:
+        headers = [(k, v) for k, v in request.scope["headers"] if k != b"content-type"]
+        headers.append((b"content-type", b"application/json"))
+        super().__init__({**request.scope, "headers": headers}, request.receive)
+        self._raw = raw
+        self._data = data
+
+    async def body(self) -> bytes:
+        return self._raw
+
+    async def json(self) -> Any:
+        return self._data
+
+
+class MsgpackRoute(APIRoute):
+    """
+    Route class accepting msgpack request bodies next to JSON. The body is
+    decoded, mapped to its JSON shape by from_wire and validated by FastAPI as
+    usual, so handlers and error responses are the same for both encodings.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        body_type = self.body_field.field_info.annotation if self.body_field is not None else None
+        if body_type is None:
+            return handler
+
+        async def route_handler(request: Request) -> Response:
+            if is_msgpack(request.headers.get("content-type")):
+                raw = await request.body()
+                try:
+                    data = msgpack.unpackb(raw, raw=False, timestamp=3)
+                except (ValueError, TypeError):
+                    raise RequestValidationError(
+                        [{"type": "msgpack_invalid", "loc": ("body",), "msg": "Invalid msgpack body", "input": None}]
+                    )
+                request = _DecodedRequest(request, raw, from_wire(body_type, data))
+            return await handler(request)
+
+        return route_handler
@@ -1,11 +1,22 @@
+import base64
+import binascii
 import json
 from fastapi.encoders import jsonable_encoder
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+import bson
+from bson.errors import BSONError
 from loguru import logger
 import pymongo
 
-from utils.models.model_pagination import Pagination, PaginationResult, TGenericPaginationModel, QuerySortingOrder
+from utils.models.model_pagination import (
+    Pagination,
+    PaginationResult,
+    KeysetPagination,
+    KeysetPaginationResult,
+    TGenericPaginationModel,
+    QuerySortingOrder,
+)
 from utils.util_mongodb import TMongoClientSession, TMongoCollection
 
 
@@ -113,4 +124,115 @@ async def Paginate2(
         order=params.order,
         total=total,
         items=[resultItemsClass(**item) for item in items]
-    )
\ No newline at end of file
+    )
+
+
+def EncodeCursor(sortby: str, order: QuerySortingOrder, value: Any, _id: Any) -> str:
+    """
+    Opaque keyset cursor for the position after (`value`, `_id`). BSON-encoded so
+    datetimes, ObjectIds and decimals survive the round trip exactly.
+    """
+    raw = bson.encode({"f": sortby, "o": QuerySortingOrder(order).value, "v": value, "i": _id})
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def DecodeCursor(cursor: str, sortby: str, order: QuerySortingOrder) -> Tuple[Any, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = bson.decode(raw)
+    except (binascii.Error, BSONError, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if data.get("f") != sortby or data.get("o") != QuerySortingOrder(order).value or "i" not in data:
+        raise ValueError("Cursor does not match the requested sort")
+    return data.get("v"), data["i"]
+
+
+def KeysetQuery(
+    query_filter: dict[str, Any],
+    sortby: str,
+    order: QuerySortingOrder,
+    cursor: str | None = None,
+    skip: int = 0,
+) -> Tuple[dict[str, Any], List[Tuple[str, int]]]:
+    """
+    Build the filter and sort for a keyset page on (`sortby`, `_id`). The sort is
+    always tie-broken on `_id` so pages are stable; with a cursor the filter only
+    matches documents strictly after it in that order. `skip` is the offset the
+    caller will apply: a cursor page must start right after the cursor, so the
+    two together are rejected (ValueError).
+    """
+    if cursor and skip:
+        raise ValueError("skip cannot be combined with cursor")
+    direction = pymongo.ASCENDING if order == QuerySortingOrder.Ascending else pymongo.DESCENDING
+    sort = [("_id", direction)] if sortby == "_id" else [(sortby, direction), ("_id", direction)]
+    if not cursor:
+        return query_filter, sort
+
+    value, _id = DecodeCursor(cursor, sortby, order)
+    op = "$gt" if direction == pymongo.ASCENDING else "$lt"
+    if sortby == "_id":
+        after: dict[str, Any] = {"_id": {op: _id}}
+    else:
+        after = {"$or": [{sortby: {op: value}}, {sortby: value, "_id": {op: _id}}]}
+    if not query_filter:
+        return after, sort
+    return {"$and": [query_filter, after]}, sort
+
+
+def NextCursor(items: List[Any], limit: int, sortby: str, order: QuerySortingOrder) -> Optional[str]:
+    """
+    Cursor after the last model (models expose `_id` as `id`) or stored document
+    of a full page; None when the page came back short, i.e. there is nothing
+    after it.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if isinstance(last, Mapping):
+        return EncodeCursor(sortby, order, last.get(sortby), last["_id"])
+    value = last.id if sortby == "_id" else getattr(last, sortby)
+    return EncodeCursor(sortby, order, value, last.id)
+
+
+async def PaginateKeyset(
+    collection: TMongoCollection,
+    query_filter: dict[str, Any],
+    params: KeysetPagination,
+    resultItemsClass: type[TGenericPaginationModel],
+    session: TMongoClientSession | None = None,
+    hint: str | None = None,
+    filterItem: bool = True,
+    **kwargs: Any
+) -> KeysetPaginationResult[TGenericPaginationModel]:
+    """
+    - Http method GET
+    - Keyset (cursor) pagination on (`sortby`, `_id`); cost does not grow with page depth
+    - Pass `next_cursor` from the previous result as `cursor` to get the next page
+    """
+    query, sort = KeysetQuery(query_filter, params.sortby, params.order, params.cursor)
+    projection = resultItemsClass.Projection() if filterItem else None
+    if projection is not None:
+        projection = {**projection, "_id": 1, params.sortby: 1}
+    cursor = collection.find(
+        query,
+        projection,
+        sort=sort,
+        limit=params.size,
+        session=session,
+        hint=hint,
+        **kwargs
+    )
+    items: list[dict[str, Any]] = await cursor.to_list(length=params.size) # type: ignore
+
+    next_cursor = None
+    if len(items) == params.size:
+        last = items[-1]
+        next_cursor = EncodeCursor(params.sortby, params.order, last.get(params.sortby), last["_id"])
+
+    return KeysetPaginationResult[resultItemsClass](
+        sortby=params.sortby,
+        size=params.size,
+        order=params.order,
+        next_cursor=next_cursor,
+        items=[resultItemsClass(**item) for item in items]
+    )
@@ -0,0 +1,117 @@
+"""
+On-demand profiling for live workers (served by /debug/profile).
+
+`sample_stacks` samples every thread's stack, the event loop's included, from
+a helper thread via sys._current_frames() and returns collapsed stacks
+(`frame;frame;frame count`) ready for flamegraph.pl / speedscope.
+`memory_diff` diffs two tracemalloc snapshots taken `seconds` apart.
+
+Nothing runs between requests: no hooks, no tracing, and tracemalloc is
+stopped again if the diff started it.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    path = code.co_filename
+    # trim to package-relative paths so stacks from different installs collapse together
+    for marker in (os.sep + "site-packages" + os.sep, os.getcwd() + os.sep):
+        idx = path.find(marker)
+        if idx >= 0:
+            path = path[idx + len(marker):]
+            break
+    return f"{name} ({path}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _collapse(frame: Optional[FrameType]) -> List[str]:
+    stack: List[str] = []
+    while frame is not None:
+        stack.append(_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _sample(seconds: float, hz: int) -> Counter:
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    counts: Counter = Counter()
+    interval = 1.0 / hz
+    deadline = time.perf_counter() + seconds
+    next_tick = time.perf_counter()
+    while next_tick < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = names.get(ident)
+            if thread is None:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                thread = names.get(ident, str(ident))
+            counts[";".join([thread.replace(";", ","), *_collapse(frame)])] += 1
+        next_tick += interval
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return counts
+
+
+async def sample_stacks(seconds: float, hz: int) -> str:
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        counts = await asyncio.to_thread(_sample, seconds, hz)
+    finally:
+        _busy.release()
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+async def memory_diff(seconds: float, top: int = 50, frames: int = 10) -> Dict[str, Any]:
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(frames)
+        before = tracemalloc.take_snapshot()
+        await asyncio.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        traced, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _busy.release()
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "traceback")
+    return {
+        "seconds": seconds,
+        "traced_bytes": traced,
+        "peak_bytes": peak,
+        # allocations made during the window and still alive at its end, largest growth first
+        "items": [
+            {
+                "size_diff": s.size_diff,
+                "count_diff": s.count_diff,
+                "size": s.size,
+                "count": s.count,
+                "traceback": [f"{f.filename}:{f.lineno}" for f in s.traceback],
+            }
+            for s in stats[:top]
+        ],
+    }
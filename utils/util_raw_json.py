@@ -0,0 +1,91 @@
+"""
+JSON straight from stored documents, without building models. List endpoints
+read their page as plain dicts like any other query, and `project` maps each
+document onto the response model's fields for util_response.RawJSONResponse,
+which encodes the page with pydantic-core in one call. The BSON decode is the
+driver's as usual; what is skipped is model construction and validation.
+On scripts/bench_raw_lists.py that is about 20% of a page of 100 orders x 20
+lines, 10% of 100 products and 35% of 100 categories; peak memory is no
+lower (higher on orders).
+
+The output is byte for byte what FastJSONResponse gives for the models the
+repository would have built: same keys and key order, defaults for fields the
+document lacks, ObjectIds as hex strings, Decimal128 as decimal strings and
+Fixed fields formatted to 2 places. A document missing a required field goes
+through model_validate, so it fails the same way too.
+"""
+from functools import lru_cache
+from types import UnionType
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Union, get_args, get_origin
+
+from bson.decimal128 import Decimal128 as BsonDecimal128
+from pydantic import BaseModel as _BaseModel
+
+from utils.models.model_data_type import Decimal128, Fixed, ObjectId
+
+_MISSING = object()
+
+
+def _fixed_str(v: Any) -> str:
+    return str(Fixed.from_bson(v) if type(v) is BsonDecimal128 else Fixed.parse(v))
+
+
+def _converter(tp: Any, by_alias: bool) -> Optional[Callable[[Any], Any]]:
+    """Stored value -> what to_json encodes like the model field would; None when it already does."""
+    origin = get_origin(tp)
+    if origin in (Union, UnionType):
+        args = [a for a in get_args(tp) if a is not type(None)]
+        inner = _converter(args[0], by_alias) if len(args) == 1 else None
+        if inner is None:
+            return None
+        return lambda v: None if v is None else inner(v)
+    if origin in (list, List):
+        args = get_args(tp)
+        inner = _converter(args[0], by_alias) if args else None
+        if inner is None:
+            return None
+        return lambda v: [x if x is None else inner(x) for x in v]
+    if tp is Fixed:
+        return _fixed_str
+    if tp is ObjectId:
+        return str
+    if tp is Decimal128:
+        return Decimal128.decimal_encoder
+    if isinstance(tp, type) and issubclass(tp, _BaseModel):
+        plan = _plan(tp, by_alias)
+        return lambda v: _project_one(tp, v, plan)
+    return None
+
+
+@lru_cache(maxsize=None)
+def _plan(cls: type, by_alias: bool) -> tuple:
+    """Per field: (output key, stored keys, converter, default or _MISSING)."""
+    plan = []
+    for name, field in cls.model_fields.items():
+        out = (field.serialization_alias or field.alias or name) if by_alias else name
+        keys = tuple(dict.fromkeys(k for k in (field.validation_alias, field.alias, name) if isinstance(k, str)))
+        default = _MISSING if field.is_required() else field.get_default(call_default_factory=True)
+        plan.append((out, keys, _converter(field.annotation, by_alias), default))
+    return tuple(plan)
+
+
+def _project_one(cls: Any, doc: Mapping[str, Any], plan: tuple) -> Any:
+    out: dict[str, Any] = {}
+    get = doc.get
+    for key_out, keys, convert, default in plan:
+        for key in keys:
+            v = get(key, _MISSING)
+            if v is not _MISSING:
+                out[key_out] = v if convert is None or v is None else convert(v)
+                break
+        else:
+            if default is _MISSING:
+                return cls.model_validate(dict(doc))
+            out[key_out] = default
+    return out
+
+
+def project(cls: type, docs: Iterable[Mapping[str, Any]], by_alias: bool = True) -> list[Any]:
+    """`docs` as `cls` models would serialize them, ready for to_json (ObjectId/Decimal128 via its fallback)."""
+    plan = _plan(cls, by_alias)
+    return [_project_one(cls, doc, plan) for doc in docs]
@@ -0,0 +1,183 @@
+"""
+Request-scoped context for instrumentation: which route is being served,
+which repository method is running and where the request's time went. All
+travel in contextvars, so they are visible to driver event listeners (motor
+copies the context into its executor threads).
+"""
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from utils.util_metrics import Histogram
+
+_request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+_repository_method: ContextVar[Optional[str]] = ContextVar("repository_method", default=None)
+_request_timings: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "pos_http_request_duration_seconds",
+    "Time from receiving a request to sending the last body chunk",
+    ["method", "route", "status_class"],
+)
+
+
+class RequestTimings:
+    """
+    Per-request time split reported in the Server-Timing header (seconds).
+    `ser` is the time from the handler's return (mark_handler_done, done by
+    handle_repo_errors) to the response start, plus rendering done inside the
+    handler by the util_response classes (add_serialization). A request with
+    neither omits `ser`.
+    """
+    __slots__ = ("started", "auth", "mongo", "ser", "handler_done")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.auth = 0.0
+        self.mongo = 0.0
+        self.ser = 0.0
+        self.handler_done: Optional[float] = None
+
+    def server_timing(self, response_start: float) -> str:
+        parts = [f"auth;dur={self.auth * 1000:.2f}", f"mongo;dur={self.mongo * 1000:.2f}"]
+        if self.handler_done is not None or self.ser:
+            # response_model validation, encoding and rendering happen after the handler
+            # returns, unless the handler rendered its own response (already in self.ser)
+            after = response_start - self.handler_done if self.handler_done is not None else 0.0
+            parts.append(f"ser;dur={(self.ser + after) * 1000:.2f}")
+        parts.append(f"total;dur={(response_start - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _request_timings.get()
+
+
+def mark_handler_done() -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.handler_done = time.perf_counter()
+
+
+def add_serialization(seconds: float) -> None:
+    """Count response rendering that happens inside the handler as Server-Timing `ser`."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.ser += seconds
+
+
+def timed_auth(func: Any) -> Any:
+    """Wrap an auth dependency so its run time is reported as `auth`; the signature FastAPI resolves is kept."""
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            timings = _request_timings.get()
+            if timings is not None:
+                timings.auth += time.perf_counter() - started
+    return wrapper
+
+
+def time_auth_dependencies(app: Any, *dependencies: Any) -> None:
+    """
+    Report the run time of the auth `dependencies` as Server-Timing `auth`.
+    Installed as app.dependency_overrides, so routes keep depending on the
+    plain functions and nested uses (require_role) are timed too.
+    """
+    for dependency in dependencies:
+        app.dependency_overrides[dependency] = timed_auth(dependency)
+
+
+def current_route() -> Optional[str]:
+    """`METHOD /path/template` of the request being served, None outside requests."""
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    # the router stores the matched route in the (shared) scope once routing is done
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+def current_request_header(name: str) -> Optional[str]:
+    """Header `name` (lower-case) of the request being served, None if absent or outside requests."""
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    key = name.encode("latin-1")
+    for k, v in scope.get("headers", ()):
+        if k == key:
+            return v.decode("latin-1")
+    return None
+
+
+def current_repository_method() -> Optional[str]:
+    return _repository_method.get()
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware that publishes the request scope to `current_route`,
+    adds a Server-Timing header (auth, mongo, ser when marked, total) and records
+    pos_http_request_duration_seconds per route template and status class.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = RequestTimings()
+        status = 500
+
+        async def send_with_timing(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing(time.perf_counter()).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        scope_token = _request_scope.set(scope)
+        timings_token = _request_timings.set(timings)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(timings_token)
+            _request_scope.reset(scope_token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - timings.started,
+                method=scope.get("method", ""),
+                route=route,
+                status_class=f"{status // 100}xx",
+            )
+
+
+def track_repository(cls: type) -> type:
+    """
+    Class decorator for repositories: every async static method records
+    `ClassName.method` as the current repository method while it runs.
+    """
+    for name, attr in list(vars(cls).items()):
+        if not isinstance(attr, staticmethod) or not inspect.iscoroutinefunction(attr.__func__):
+            continue
+        setattr(cls, name, staticmethod(_tracked(f"{cls.__name__}.{name}", attr.__func__)))
+    return cls
+
+
+def _tracked(label: str, func: Any) -> Any:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _repository_method.set(label)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _repository_method.reset(token)
+    return wrapper
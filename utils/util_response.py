@@ -0,0 +1,130 @@
+"""
+One-pass JSON (and MessagePack) responses. FastAPI's default path turns a handler's result into
+plain Python with jsonable_encoder (after a `model_dump(mode="json")` in the
+handler, or a response_model validation) and then json.dumps it. FastJSONResponse
+hands the models themselves to pydantic-core, which writes the bytes directly
+through each model's own serializers.
+
+Handlers opt in by returning the response (declare `response_class=FastJSONResponse`
+on the route so the OpenAPI media type matches), or `negotiate(...)` to also
+answer `Accept: application/msgpack`. Returning a Response skips
+response_model validation, so only return models the repositories built.
+"""
+import time
+from typing import Any, Mapping, Optional
+
+from fastapi.encoders import ENCODERS_BY_TYPE
+from pydantic_core import to_json
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, Response
+
+from core.config import settings
+from utils.util_msgpack import MSGPACK_MEDIA_TYPE, is_msgpack, packb
+from utils.util_raw_json import project
+from utils.util_request_context import add_serialization, current_request_header
+
+# ObjectId, Decimal128, Fixed ... outside a model field: the same registrations
+# jsonable_encoder uses (utils/models/model_data_type.py)
+import utils.models.model_data_type  # noqa: F401
+
+
+def _fallback(value: Any) -> Any:
+    for cls in type(value).__mro__:
+        encoder = ENCODERS_BY_TYPE.get(cls)
+        if encoder is not None:
+            return encoder(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered by pydantic-core. `content` may hold pydantic models at
+    any depth. `by_alias` matches FastAPI's response_model output (True) or
+    `model_dump(mode="json")` (False).
+    """
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        by_alias: bool = True,
+    ) -> None:
+        # render() runs inside JSONResponse.__init__
+        self.by_alias = by_alias
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        try:
+            return to_json(content, by_alias=self.by_alias, fallback=_fallback)
+        finally:
+            add_serialization(time.perf_counter() - started)
+
+
+class RawJSONResponse(FastJSONResponse):
+    """
+    FastJSONResponse for a page of stored documents rendered as `model` would
+    be, without building the models (util_raw_json).
+    """
+
+    def __init__(
+        self,
+        model: type,
+        docs: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        by_alias: bool = True,
+    ) -> None:
+        started = time.perf_counter()
+        content = project(model, docs, by_alias)
+        add_serialization(time.perf_counter() - started)
+        super().__init__(content, status_code, headers, by_alias=by_alias)
+        self.headers["Vary"] = "Accept"
+
+
+class MsgpackResponse(Response):
+    """MessagePack counterpart of FastJSONResponse (wire forms in utils/util_msgpack.py)."""
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        by_alias: bool = True,
+    ) -> None:
+        self.by_alias = by_alias
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        try:
+            return packb(content, by_alias=self.by_alias)
+        finally:
+            add_serialization(time.perf_counter() - started)
+
+
+def negotiate(
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+    by_alias: bool = True,
+) -> Response:
+    """MsgpackResponse when the current request accepts msgpack, else FastJSONResponse."""
+    response_class = MsgpackResponse if is_msgpack(current_request_header("accept")) else FastJSONResponse
+    response = response_class(content, status_code, headers, by_alias=by_alias)
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+def raw_reads() -> bool:
+    """
+    Whether a list endpoint should answer with RawJSONResponse from the stored
+    documents: RAW_LIST_RESPONSES is on and the client takes JSON.
+    """
+    return settings.RAW_LIST_RESPONSES and not is_msgpack(current_request_header("accept"))
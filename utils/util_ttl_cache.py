@@ -0,0 +1,110 @@
+"""
+Bounded in-process cache with per-entry TTL, LRU eviction and single-flight
+loading: concurrent misses for one key share a single loader call.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from utils.util_metrics import Counter, Gauge
+
+V = TypeVar("V")
+
+CACHE_REQUESTS = Counter("pos_cache_requests_total", "In-process cache lookups", ["cache", "result"])
+CACHE_EVICTIONS = Counter("pos_cache_evictions_total", "Entries dropped for size or by invalidation", ["cache", "reason"])
+_caches: Dict[str, "TTLCache"] = {}
+CACHE_SIZE = Gauge(
+    "pos_cache_entries", "Entries currently held", ["cache"], fn=lambda: {(n,): len(c) for n, c in _caches.items()}
+)
+
+
+class TTLCache(Generic[V]):
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # bumped by invalidate so a load that started before it isn't stored after it
+        self._generation: Dict[Hashable, int] = {}
+        _caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            CACHE_EVICTIONS.inc(cache=self.name, reason="size")
+
+    def invalidate(self, key: Hashable) -> None:
+        if key in self._inflight:
+            # a load that started before this must not store its (stale) result
+            self._generation[key] = self._generation.get(key, 0) + 1
+        if self._data.pop(key, None) is not None:
+            CACHE_EVICTIONS.inc(cache=self.name, reason="invalidated")
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Optional[V]]]) -> Optional[V]:
+        """
+        Cached value for `key`, else the result of `loader()`; None results are
+        not cached. Callers missing the same key at the same time await one load.
+        """
+        value = self.get(key)
+        if value is not None:
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return value
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is loop:
+            CACHE_REQUESTS.inc(cache=self.name, result="shared")
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # the leading request was cancelled mid-load; load for ourselves
+
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        fut = loop.create_future()
+        self._inflight[key] = fut
+        generation = self._generation.get(key, 0)
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as err:
+            fut.set_exception(err)
+            # retrieve it so an unshared failure isn't logged as never retrieved
+            fut.exception()
+            raise
+        else:
+            fut.set_result(value)
+            if value is not None and self._generation.get(key, 0) == generation:
+                self.set(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+                self._generation.pop(key, None)